@@ -1,9 +1,12 @@
+import asyncio
 import concurrent.futures
+import datetime
 import functools
 import os
 import sqlite3
+import threading
 from asyncio.events import AbstractEventLoop
-from typing import Optional
+from typing import AsyncIterator, Callable, List, Optional, Sequence, Set, Tuple, TypeVar
 
 from redbot.core.bot import Red
 from redbot.core.data_manager import cog_data_path
@@ -22,11 +25,40 @@ try:
 except ImportError:
     raise RuntimeError("Pandas must be installed for this driver to work.")
 
+T = TypeVar("T")
+
+# appends up to this many rows are turned into plain rows straight away instead of copying the
+# dataframe for the executor, which is the common case of adding one row per loop
+SMALL_APPEND_ROWS = 1000
+
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+def _sql_time(dt: datetime.datetime) -> str:
+    """Format a datetime the same way pandas' to_sql stores the index."""
+    return pandas.Timestamp(dt).to_pydatetime().isoformat(sep=" ")
+
 
 class PandasSQLiteDriver:
-    """An asynchronous SQLite driver for Pandas dataframes."""
+    """An asynchronous SQLite driver for Pandas dataframes, indexed by time.
+
+    Each executor thread keeps its own connection open, in WAL mode so reads don't block writes.
+    Writes and appends go through a single thread so they are applied in order, and reads
+    through a small pool of threads.
+    """
 
-    def __init__(self, bot: Red, cog_name: str, filename: str, table: str = "main_df") -> None:
+    def __init__(
+        self,
+        bot: Red,
+        cog_name: str,
+        filename: str,
+        table: str = "main_df",
+        read_threads: int = 2,
+    ) -> None:
         """Get a driver object for interacting with a table in the given cog's datapath.
 
         Parameters
@@ -39,60 +71,235 @@ class PandasSQLiteDriver:
             The full file name to use for the database, for example `timeseries.db`
         table : str, optional
             The SQLite table to use, by default "main_df"
+        read_threads : int, optional
+            How many reads can run at once, by default 2
         """
         self.bot = bot
         self.table = table
 
         self.sql_executor = concurrent.futures.ThreadPoolExecutor(1, f"{cog_name.lower()}_sql")
+        self.read_executor = concurrent.futures.ThreadPoolExecutor(
+            read_threads, f"{cog_name.lower()}_sql_read"
+        )
         self.sql_path = str(cog_data_path(raw_name=cog_name) / filename)
 
-    def _write(self, df: pandas.DataFrame, table: Optional[str] = None) -> None:
-        connection = sqlite3.connect(self.sql_path)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._tables: Set[str] = set()  # tables known to exist, only used by the write thread
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it if needed."""
+        connection: Optional[sqlite3.Connection] = getattr(self._local, "connection", None)
+        if connection is None:
+            # only ever used from this thread, but closed from another in close()
+            connection = sqlite3.connect(self.sql_path, check_same_thread=False)
+            for pragma in CONNECTION_PRAGMAS:
+                connection.execute(pragma)
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _in_transaction(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        connection = self._connection()
         try:
-            df.to_sql(table or self.table, con=connection, if_exists="replace")  # type:ignore
+            ret = func(connection)
             connection.commit()
-        finally:
-            connection.close()
+            return ret
+        except Exception:
+            connection.rollback()
+            self._tables.clear()
+            raise
+
+    def _write(self, df: pandas.DataFrame, table: Optional[str] = None) -> None:
+        table = table or self.table
+
+        def write(connection: sqlite3.Connection) -> None:
+            df.to_sql(table, con=connection, if_exists="replace")  # type:ignore
+
+        self._in_transaction(write)
+        self._tables.add(table)
 
     def _append(self, df: pandas.DataFrame, table: Optional[str] = None) -> None:
-        connection = sqlite3.connect(self.sql_path)
-        try:
-            df.to_sql(table or self.table, con=connection, if_exists="append")  # type:ignore
-            connection.commit()
-        finally:
-            connection.close()
+        table = table or self.table
 
-    def _read(self, table: Optional[str] = None) -> pandas.DataFrame:
-        connection = sqlite3.connect(self.sql_path)
-        try:
-            df = pandas.read_sql(
-                f"SELECT * FROM {table or self.table}",
-                connection,
-                index_col="index",
-                parse_dates=["index"],
-            )
-            return df
-        finally:
-            connection.close()
+        def append(connection: sqlite3.Connection) -> None:
+            df.to_sql(table, con=connection, if_exists="append")  # type:ignore
+
+        self._in_transaction(append)
+        self._tables.add(table)
+
+    def _append_rows(
+        self, table: str, columns: Sequence[str], rows: List[tuple], schema: Callable[[], str]
+    ) -> None:
+        def append(connection: sqlite3.Connection) -> None:
+            if table not in self._tables:
+                exists = connection.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+                ).fetchone()
+                if not exists:  # same as what to_sql would create
+                    connection.execute(schema())
+                    connection.execute(f'CREATE INDEX "ix_{table}_index" ON "{table}" ("index")')
+            cols = ",".join(f'"{c}"' for c in columns)
+            params = ",".join("?" * len(columns))
+            connection.executemany(f'INSERT INTO "{table}" ({cols}) VALUES ({params})', rows)
+
+        self._in_transaction(append)
+        self._tables.add(table)
+
+    def _select(
+        self,
+        table: Optional[str],
+        columns: Optional[Sequence[str]],
+        start: Optional[datetime.datetime],
+        end: Optional[datetime.datetime],
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str, int]] = None,
+    ) -> Tuple[str, list]:
+        cols = "*" if columns is None else ",".join(['"index"'] + [f'"{c}"' for c in columns])
+        where, params = [], []
+        if start is not None:
+            where.append('"index" >= ?')
+            params.append(_sql_time(start))
+        if end is not None:
+            where.append('"index" < ?')
+            params.append(_sql_time(end))
+        if after is not None:  # rowid breaks ties if there are duplicate times
+            where.append('("index", rowid) > (?, ?)')
+            params.extend(after)
+        if limit is not None:
+            cols = f'rowid AS _rowid, "index" AS _key, {cols}'
+        query = f'SELECT {cols} FROM "{table or self.table}"'
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        if limit is not None:
+            query += f' ORDER BY "index", rowid LIMIT {int(limit)}'
+        return query, params
+
+    def _read(
+        self,
+        table: Optional[str] = None,
+        columns: Optional[Sequence[str]] = None,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+    ) -> pandas.DataFrame:
+        query, params = self._select(table, columns, start, end)
+        return pandas.read_sql(
+            query, self._connection(), params=params, index_col="index", parse_dates=["index"]
+        )
+
+    def _read_chunk(
+        self,
+        table: Optional[str],
+        columns: Optional[Sequence[str]],
+        start: Optional[datetime.datetime],
+        end: Optional[datetime.datetime],
+        limit: int,
+        after: Optional[Tuple[str, int]],
+    ) -> Tuple[pandas.DataFrame, Optional[Tuple[str, int]]]:
+        query, params = self._select(table, columns, start, end, limit, after)
+        df = pandas.read_sql(
+            query, self._connection(), params=params, index_col="index", parse_dates=["index"]
+        )
+        last = None if df.empty else (df["_key"].iloc[-1], int(df["_rowid"].iloc[-1]))
+        return df.drop(columns=["_rowid", "_key"]), last
+
+    async def _run(self, executor: concurrent.futures.Executor, func: Callable[[], T]) -> T:
+        assert isinstance(self.bot.loop, AbstractEventLoop)
+        return await self.bot.loop.run_in_executor(executor, func)
 
     async def write(self, df: pandas.DataFrame, table: Optional[str] = None) -> None:
         """Write a dataframe to the database. Replaces and old data."""
-        assert isinstance(self.bot.loop, AbstractEventLoop)
         func = functools.partial(self._write, df.copy(True), table)
-        await self.bot.loop.run_in_executor(self.sql_executor, func)
+        await self._run(self.sql_executor, func)
 
     async def append(self, df: pandas.DataFrame, table: Optional[str] = None) -> None:
-        """Append a dataframe to the database."""
-        assert isinstance(self.bot.loop, AbstractEventLoop)
-        func = functools.partial(self._append, df.copy(True), table)
-        await self.bot.loop.run_in_executor(self.sql_executor, func)
+        """Append a dataframe to the database.
 
-    async def read(self, table: Optional[str] = None) -> pandas.DataFrame:
-        """Read the database, returning as a pandas dataframe."""
-        assert isinstance(self.bot.loop, AbstractEventLoop)
-        func = functools.partial(self._read, table)
-        return await self.bot.loop.run_in_executor(self.sql_executor, func)
+        Small dataframes are converted to rows before returning control, so the dataframe can
+        be changed straight after without it being copied first.
+        """
+        table = table or self.table
+        if len(df) > SMALL_APPEND_ROWS:
+            func = functools.partial(self._append, df.copy(True), table)
+            await self._run(self.sql_executor, func)
+            return
+
+        columns = ["index"] + [str(c) for c in df.columns]
+        index = [_sql_time(i) for i in df.index]
+        values = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        rows = [(i, *row) for i, row in zip(index, values)]
+        schema = functools.partial(
+            pandas.io.sql.get_schema, df.rename_axis("index").reset_index(), table
+        )
+        func = functools.partial(self._append_rows, table, columns, rows, schema)
+        await self._run(self.sql_executor, func)
+
+    async def read(
+        self,
+        table: Optional[str] = None,
+        *,
+        columns: Optional[Sequence[str]] = None,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+    ) -> pandas.DataFrame:
+        """Read the database, returning as a pandas dataframe.
+
+        Parameters
+        ----------
+        table : str, optional
+            The table to read, by default the driver's table
+        columns : Sequence[str], optional
+            Only read these columns, by default all
+        start : datetime.datetime, optional
+            Only read rows from this time onwards
+        end : datetime.datetime, optional
+            Only read rows from before this time
+        """
+        func = functools.partial(self._read, table, columns, start, end)
+        return await self._run(self.read_executor, func)
+
+    async def iter_read(
+        self,
+        chunk_size: int = 10_000,
+        table: Optional[str] = None,
+        *,
+        columns: Optional[Sequence[str]] = None,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+    ) -> AsyncIterator[pandas.DataFrame]:
+        """Read the database in time order, ``chunk_size`` rows at a time, so a large table
+        doesn't need to be in memory at once. Takes the same arguments as ``read``."""
+        after: Optional[Tuple[str, int]] = None
+        while True:
+            func = functools.partial(
+                self._read_chunk, table, columns, start, end, chunk_size, after
+            )
+            df, after = await self._run(self.read_executor, func)
+            if df.empty:
+                return
+            yield df
+            if len(df) < chunk_size:
+                return
 
     def storage_usage(self) -> int:
-        """Return the size of the database file in bytes."""
-        return os.path.getsize(self.sql_path)
+        """Return the size of the database file in bytes, including the write-ahead log."""
+        size = os.path.getsize(self.sql_path)
+        wal = self.sql_path + "-wal"
+        if os.path.exists(wal):
+            size += os.path.getsize(wal)
+        return size
+
+    async def close(self) -> None:
+        """Close all connections and stop the executors. The driver can't be used after."""
+
+        def close() -> None:
+            self.sql_executor.shutdown(wait=True)
+            self.read_executor.shutdown(wait=True)
+            with self._connections_lock:
+                for connection in self._connections:
+                    connection.close()
+                self._connections.clear()
+
+        await asyncio.get_running_loop().run_in_executor(None, close)
@@ -0,0 +1,304 @@
+import asyncio
+import heapq
+import itertools
+import sys
+import time
+from logging import getLogger
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .loop import DurationHistogram
+
+try:
+    import kaleido
+    from choreographer.errors import BrowserClosedError, BrowserFailedError, ChannelClosedError
+
+    # the browser has gone, so it needs starting again
+    BROWSER_GONE: Tuple[type, ...] = (BrowserClosedError, BrowserFailedError, ChannelClosedError)
+except ImportError:
+    kaleido = None
+    BROWSER_GONE = ()
+
+log = getLogger("red.vex-utils")
+
+RENDER_POOL_FORMAT = 2  # change this if RenderPool's data or methods change
+
+RENDER_TABS = 2  # renders that can happen at once, each is a tab in the same browser
+RENDER_TIMEOUT = 60.0  # seconds, including time spent queued
+RENDER_IDLE_CLOSE = 15 * 60  # seconds without a render before the browser is closed
+
+# lower goes first
+PRIORITY_HIGH = 0  # someone is waiting on a command
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10  # background tasks, for example the end of a poll
+
+
+class RenderPool:
+    """
+    Renders Plotly figures to images with one long-running Kaleido (Chromium) browser, shared
+    by every cog.
+
+    ``fig.to_image`` starts a browser for each call, so a few cogs rendering at once could mean a
+    few browsers. This keeps one open with ``tabs`` tabs ready, starting it on the first render
+    and closing it after ``RENDER_IDLE_CLOSE`` without one. Renders beyond the number of tabs
+    wait in a queue, ordered by priority and then by when they were queued.
+
+    Get the shared one with `get_render_pool`. Cogs using it should call `add_render_pool_user`
+    when they load and `release_render_pool` when they unload, so the browser is closed once
+    nothing is using it.
+    """
+
+    format = RENDER_POOL_FORMAT
+
+    def __init__(self, tabs: int = RENDER_TABS) -> None:
+        self.tabs = tabs
+
+        self.render_latency = DurationHistogram()  # time in the browser
+        self.wait_latency = DurationHistogram()  # time in the queue
+        self.renders = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.browser_starts = 0
+        self.users: Set[str] = set()  # names of the cogs using this, see add_render_pool_user
+
+        self._kaleido: Any = None
+        self._open_lock: Optional[asyncio.Lock] = None
+        self._in_use = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []  # heap
+        self._seq = itertools.count()
+        self._idle_handle: Optional[asyncio.TimerHandle] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"<RenderPool tabs={self.tabs} rendering={self.rendering} queued={self.queued} "
+            f"renders={self.renders} open={self._kaleido is not None}>"
+        )
+
+    @property
+    def rendering(self) -> int:
+        """How many renders are happening now."""
+        return self._in_use
+
+    @property
+    def queued(self) -> int:
+        """How many renders are waiting for a tab."""
+        return sum(not f.done() for _, _, f in self._waiters)
+
+    async def render(
+        self,
+        fig: Any,
+        *,
+        width: int = 800,
+        height: int = 500,
+        scale: float = 1,
+        format: str = "png",
+        priority: int = PRIORITY_NORMAL,
+        timeout: float = RENDER_TIMEOUT,
+    ) -> bytes:
+        """Render a figure to an image.
+
+        Parameters
+        ----------
+        fig : Any
+            A Plotly figure, or its dict from ``fig.to_dict()``. Making that dict is a bit of
+            work for large figures, so it's best to do that in an executor with the rest of
+            making the figure.
+        width : int, optional
+            Width in pixels, by default 800
+        height : int, optional
+            Height in pixels, by default 500
+        scale : float, optional
+            Scale factor, by default 1
+        format : str, optional
+            Image format, by default "png"
+        priority : int, optional
+            Where to go in the queue, lower first, by default ``PRIORITY_NORMAL``
+        timeout : float, optional
+            Seconds before giving up, including time in the queue, by default 60
+
+        Returns
+        -------
+        bytes
+            The image
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            If the render didn't finish in time
+        RuntimeError
+            If Kaleido isn't installed
+        """
+        if kaleido is None:
+            raise RuntimeError("Kaleido must be installed to render figures.")
+        opts = {"format": format, "width": width, "height": height, "scale": scale}
+        try:
+            return await asyncio.wait_for(self._render(fig, opts, priority), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            log.warning(
+                "A figure took more than %s seconds to render (%s rendering, %s queued).",
+                timeout,
+                self.rendering,
+                self.queued,
+            )
+            raise
+
+    async def _render(self, fig: Any, opts: Dict[str, Any], priority: int) -> bytes:
+        queued_at = time.monotonic()
+        await self._acquire(priority)
+        try:
+            self.wait_latency.record(time.monotonic() - queued_at)
+            browser = await self._get_browser()
+
+            start = time.monotonic()
+            try:
+                image = await browser.calc_fig(fig, opts=opts)
+            except BROWSER_GONE:
+                self.failures += 1
+                await self._discard_browser(browser)
+                raise
+            except Exception:
+                self.failures += 1
+                raise
+            self.render_latency.record(time.monotonic() - start)
+            self.renders += 1
+            return image
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int) -> None:
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+
+        if self._in_use < self.tabs and not self.queued:
+            self._in_use += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future  # _release hands over its tab, so _in_use stays the same
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():  # given a tab after being cancelled
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():  # those which timed out while queued are already cancelled
+                future.set_result(None)
+                return
+        self._in_use -= 1
+
+        if self._in_use == 0 and self._kaleido is not None:
+            self._idle_handle = asyncio.get_running_loop().call_later(
+                RENDER_IDLE_CLOSE, lambda: asyncio.ensure_future(self._close_if_idle())
+            )
+
+    async def _get_browser(self) -> Any:
+        if self._open_lock is None:
+            self._open_lock = asyncio.Lock()
+        async with self._open_lock:
+            if self._kaleido is None:
+                start = time.monotonic()
+                browser = kaleido.Kaleido(n=self.tabs)
+                await browser.open()
+                self._kaleido = browser
+                self.browser_starts += 1
+                log.debug(
+                    "Started Kaleido browser with %s tabs in %.2fs",
+                    self.tabs,
+                    time.monotonic() - start,
+                )
+            return self._kaleido
+
+    async def _discard_browser(self, browser: Any) -> None:
+        if self._kaleido is browser:
+            self._kaleido = None
+        try:
+            await browser.close()
+        except Exception:
+            log.debug("Unable to close Kaleido browser.", exc_info=True)
+
+    async def _close_if_idle(self) -> None:
+        if self._in_use == 0 and self._kaleido is not None:
+            log.debug("Closing Kaleido browser as it hasn't been used for a while.")
+            await self._discard_browser(self._kaleido)
+
+    async def close(self) -> None:
+        """Close the browser. It'll be started again if anything else is rendered."""
+        if self._kaleido is not None:
+            await self._discard_browser(self._kaleido)
+
+    async def shutdown(self) -> None:
+        """Cancel everything queued and the idle timer, and close the browser."""
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            future.cancel()
+        await self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Everything recorded about the pool, as plain types. Latencies are in seconds, with
+        the keys from `DurationHistogram.to_dict`."""
+        return {
+            "tabs": self.tabs,
+            "rendering": self.rendering,
+            "queued": self.queued,
+            "renders": self.renders,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "browser_starts": self.browser_starts,
+            "browser_open": self._kaleido is not None,
+            "render_latency": self.render_latency.to_dict(),
+            "wait_latency": self.wait_latency.to_dict(),
+        }
+
+    def summary(self) -> str:
+        """A one line summary, for info commands."""
+        text = f"{self.renders} renders, {self.rendering} rendering, {self.queued} queued"
+        if self.render_latency.count:
+            text += (
+                f", p50 {self.render_latency.percentile(50):.2f}s, "
+                f"p95 {self.render_latency.percentile(95):.2f}s"
+            )
+        return text
+
+
+_render_pool: Optional[RenderPool] = None
+
+
+def get_render_pool() -> RenderPool:
+    """Get the render pool, using the same one as other loaded copies of vexutils if they have
+    one."""
+    global _render_pool
+    if _render_pool is not None:
+        return _render_pool
+
+    for name, module in list(sys.modules.items()):
+        if not name.endswith(".vexutils.render"):
+            continue
+        other = getattr(module, "_render_pool", None)
+        if getattr(other, "format", None) == RENDER_POOL_FORMAT:
+            _render_pool = other
+            return other
+
+    _render_pool = RenderPool()
+    return _render_pool
+
+
+def add_render_pool_user(cog_name: str) -> None:
+    """Record the cog as using the render pool. Call `release_render_pool` when it unloads."""
+    get_render_pool().users.add(cog_name)
+
+
+async def release_render_pool(cog_name: str) -> None:
+    """Record the cog as no longer using the render pool, shutting it down if nothing else
+    is."""
+    pool = get_render_pool()
+    pool.users.discard(cog_name)
+    if not pool.users:
+        await pool.shutdown()
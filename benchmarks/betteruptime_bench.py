@@ -0,0 +1,140 @@
+"""Benchmarks for BetterUptime's data handling, at a few amounts of history.
+
+This covers reading the store, building ``UptimeData`` and the per-day data used by the
+uptimegraph and downtime commands. Run from the repo root:
+
+    python -m benchmarks.betteruptime_bench
+    python -m benchmarks.betteruptime_bench --days 30 365 --json before.json
+
+See ``benchmarks.common`` for how each case is measured.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import (  # must be before the cog
+    Result,
+    add_common_args,
+    measure,
+    print_header,
+    write_json,
+)
+from betteruptime.consts import SECONDS_IN_DAY
+from betteruptime.store import UptimeStore
+from betteruptime.utils import Utils
+
+OUTAGES_PER_DAY = 0.5
+
+
+class FakeCog:
+    """Just enough of BetterUptime for ``get_data``."""
+
+    get_data = Utils.get_data
+
+    def __init__(self, store: UptimeStore, days: int) -> None:
+        self.store = store
+        self.ready = asyncio.Event()
+        self.ready.set()
+        self.main_loop_meta = None
+        self.first_load = time.time() - days * SECONDS_IN_DAY
+        self.cog_loaded_cache = pd.Series(dtype="float64")
+        self.connected_cache = pd.Series(dtype="float64")
+
+
+async def fill_store(store: UptimeStore, days: int, seed: int = 0) -> None:
+    """Synthetic history: mostly full days, with some random outages."""
+    rng = np.random.default_rng(seed)
+    now = time.time()
+    start = now - days * SECONDS_IN_DAY
+
+    count = int(days * OUTAGES_PER_DAY)
+    started = np.sort(rng.uniform(start, now, count))
+    ended = np.minimum(started + rng.exponential(600, count), np.append(started[1:], now))
+    kinds = rng.choice(["network", "unloaded"], count)
+    for kind, s, e in zip(kinds, started, ended):
+        await store.add_outage(str(kind), float(s), float(e))
+
+    index = pd.date_range(end=datetime.datetime.utcnow(), periods=days, freq="D", normalize=True)
+    cog_loaded = pd.Series(SECONDS_IN_DAY - rng.exponential(60, days), index=index)
+    connected = cog_loaded - rng.exponential(60, days)
+    await store.write(cog_loaded.clip(lower=0), connected.clip(lower=0))
+
+
+async def bench_days(days: int, repeat: int, max_seconds: float) -> list[Result]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UptimeStore(str(Path(tmp) / "uptime.db"))
+        try:
+            await fill_store(store, days)
+            cog = FakeCog(store, days)
+            cog.cog_loaded_cache, cog.connected_cache = await store.read()
+            label = f"{days}d"
+
+            async def read() -> None:
+                await store.read()
+
+            async def get_data() -> None:
+                await cog.get_data(9999)
+
+            data = await cog.get_data(9999)
+
+            async def percentages() -> None:
+                dataclasses.replace(data).daily_connected_percentages()
+
+            async def downtime() -> None:
+                fresh = dataclasses.replace(data)
+                fresh.downtime_dates()
+                fresh.outages_by_date()
+
+            async def add() -> None:
+                await store.add(datetime.datetime.utcnow(), 60.0, 60.0)
+
+            results.append(await measure(f"store read {label}", read, repeat, max_seconds))
+            results.append(
+                await measure(f"get_data all time {label}", get_data, repeat, max_seconds)
+            )
+            results.append(
+                await measure(f"daily percentages {label}", percentages, repeat, max_seconds)
+            )
+            results.append(await measure(f"downtime dates {label}", downtime, repeat, max_seconds))
+            results.append(await measure(f"store add {label}", add, repeat, max_seconds))
+        finally:
+            await store.close()
+    return results
+
+
+async def main(args: argparse.Namespace) -> None:
+    print_header()
+    results: list[Result] = []
+    for days in args.days:
+        results += await bench_days(days, args.repeat, args.max_seconds)
+
+    if args.json:
+        write_json(results, args.json)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark BetterUptime.")
+    parser.add_argument(
+        "--days",
+        type=int,
+        nargs="*",
+        default=[30, 365, 1825],
+        help="amounts of history, in days",
+    )
+    add_common_args(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,94 @@
+"""Shared helpers for the benchmarks.
+
+Each case is run a few times after a warmup run, reporting latency percentiles. Peak memory is
+measured with tracemalloc on one extra run, so doesn't slow down the timed runs.
+
+Importing this also sets up logging like Red does on startup, which the cogs' loggers need, so
+it must be imported before any cog.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Awaitable, Callable, NamedTuple
+
+import numpy as np
+from red_commons.logging import maybe_update_logger_class
+
+maybe_update_logger_class()
+
+
+class Result(NamedTuple):
+    name: str
+    times: list[float]  # seconds
+    peak_memory: int  # bytes
+
+    def summary(self) -> dict[str, float | int | str]:
+        times = np.array(self.times) * 1000
+        return {
+            "name": self.name,
+            "runs": len(times),
+            "p50_ms": float(np.percentile(times, 50)),
+            "p95_ms": float(np.percentile(times, 95)),
+            "p99_ms": float(np.percentile(times, 99)),
+            "max_ms": float(times.max()),
+            "peak_mib": self.peak_memory / 1024 / 1024,
+        }
+
+
+async def measure(
+    name: str, func: Callable[[], Awaitable[object]], repeat: int, max_seconds: float
+) -> Result:
+    """Time ``func``, stopping early (after at least 3 runs) if it goes over ``max_seconds``."""
+    await func()  # warmup
+
+    times = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        times.append(time.perf_counter() - start)
+        if len(times) >= 3 and time.perf_counter() - started > max_seconds:
+            break
+
+    tracemalloc.start()
+    try:
+        await func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result = Result(name, times, peak)
+    print_row(result.summary())
+    return result
+
+
+def print_row(row: dict[str, float | int | str]) -> None:
+    print(
+        f"{row['name']:<40} {row['runs']:>5} {row['p50_ms']:>10.2f} {row['p95_ms']:>10.2f} "
+        f"{row['p99_ms']:>10.2f} {row['max_ms']:>10.2f} {row['peak_mib']:>10.1f}"
+    )
+
+
+def print_header() -> None:
+    print(
+        f"{'case':<40} {'runs':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10} "
+        f"{'peak MiB':>10}"
+    )
+
+
+def add_common_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per case")
+    parser.add_argument(
+        "--max-seconds", type=float, default=30.0, help="stop repeating a case after this long"
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+
+
+def write_json(results: list[Result], path: str) -> None:
+    with open(path, "w") as fp:
+        json.dump([r.summary() for r in results], fp, indent=4)
+    print(f"Results written to {path}")
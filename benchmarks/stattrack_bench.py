@@ -0,0 +1,287 @@
+"""Benchmarks for StatTrack's collection loop, SQLite driver and graph data preparation.
+
+Everything runs offline against a fake bot and a temporary database, so this can be used to
+compare two versions of the cog before deploying to a large bot. Run from the repo root:
+
+    python -m benchmarks.stattrack_bench
+    python -m benchmarks.stattrack_bench --members 1000 --days 1 30 --json before.json
+
+See ``benchmarks.common`` for how each case is measured.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import datetime
+import random
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import AsyncIterator, Awaitable, Callable
+from unittest import mock
+
+import discord
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import (  # must be before the cog
+    Result,
+    add_common_args,
+    measure,
+    print_header,
+    write_json,
+)
+from stattrack import stattrack as stattrack_module
+from stattrack.buffer import SampleBuffer
+from stattrack.commands import StatTrackCommands
+from stattrack.counters import STATUSES, GuildCounter
+from stattrack.driver import StatTrackSQLiteDriver
+from stattrack.stattrack import BUFFER_DAYS, StatTrack
+from stattrack.vexutils.loop import VexLoop
+
+GUILD_SIZE = 1000
+CHANNELS_PER_GUILD = 20
+METRICS = [
+    "ping",
+    "loop_time_s",
+    "guilds",
+    "sys_mem",
+    "sys_cpu",
+    "command_count",
+    "message_count",
+    "users_total",
+    "users_unique",
+    "users_humans",
+    "users_bots",
+    "channels_total",
+    "channels_text",
+    "channels_voice",
+    "channels_cat",
+    "channels_stage",
+] + [f"status_{status}" for status in STATUSES]
+
+
+# fake bot
+
+
+class FakeMember:
+    __slots__ = ("id", "bot", "raw_status")
+
+    def __init__(self, id: int, bot: bool, raw_status: str) -> None:
+        self.id = id
+        self.bot = bot
+        self.raw_status = raw_status
+
+
+class FakeGuild:
+    def __init__(self, members: list[FakeMember], channels: list) -> None:
+        self.members = members
+        self.channels = channels
+
+
+def _fake_channels(count: int) -> list:
+    kinds = [discord.TextChannel] * 12 + [discord.VoiceChannel] * 4 + [discord.CategoryChannel] * 3
+    kinds.append(discord.StageChannel)
+    # the counter only looks at the type, so these don't need to be set up
+    return [kinds[i % len(kinds)].__new__(kinds[i % len(kinds)]) for i in range(count)]
+
+
+def make_bot(members: int, seed: int = 0) -> SimpleNamespace:
+    """A fake bot with ``members`` members spread over guilds of ``GUILD_SIZE``. Around a fifth
+    of users are in more than one guild, like on a real bot."""
+    rng = random.Random(seed)
+    unique = max(int(members * 0.8), 1)
+    users = [FakeMember(i, rng.random() < 0.05, rng.choice(STATUSES)) for i in range(unique)]
+    order = list(range(unique)) + [rng.randrange(unique) for _ in range(members - unique)]
+    rng.shuffle(order)
+
+    guilds = []
+    for i in range(0, members, GUILD_SIZE):
+        # a user can't be in the same guild twice
+        ids = dict.fromkeys(order[i : i + GUILD_SIZE])
+        guilds.append(FakeGuild([users[u] for u in ids], _fake_channels(CHANNELS_PER_GUILD)))
+    return SimpleNamespace(guilds=guilds, latency=0.05)
+
+
+class FakeCog:
+    """Just enough of StatTrack for ``update_stats`` and ``prepare_plot_data``."""
+
+    update_stats = StatTrack.update_stats
+    prepare_plot_data = StatTrackCommands.prepare_plot_data
+
+    def __init__(self, bot: SimpleNamespace, driver: StatTrackSQLiteDriver) -> None:
+        self.bot = bot
+        self.driver = driver
+        self.counter = GuildCounter()
+        self.loop_meta = VexLoop("StatTrack loop", 60.0)
+        self.buffer = SampleBuffer(BUFFER_DAYS * 1440)
+        self.config = SimpleNamespace(maxpoints=_async_return(25_000))
+        self.cmd_count = 0
+        self.msg_count = 0
+        self.last_loop_raw = None
+        self.last_loop_time = ""
+
+    async def load_buffer(self) -> None:
+        await StatTrack.load_buffer(self)  # type:ignore
+
+
+def _async_return(value: object) -> Callable[[], Awaitable[object]]:
+    async def func() -> object:
+        return value
+
+    return func
+
+
+async def _no_sleep(*_, **__) -> None:
+    return
+
+
+class FakeClock:
+    """Stands in for ``snapped_utcnow`` so every run of ``update_stats`` is a new minute."""
+
+    def __init__(self) -> None:
+        self.now = datetime.datetime.utcnow().replace(microsecond=0, second=0)
+
+    def __call__(self) -> datetime.datetime:
+        return self.now
+
+    def tick(self) -> None:
+        self.now += datetime.timedelta(minutes=1)
+
+
+def make_data(days: int, seed: int = 0) -> pd.DataFrame:
+    """Synthetic minute data for all of the usual metrics, ending at the current minute."""
+    rng = np.random.default_rng(seed)
+    end = datetime.datetime.utcnow().replace(microsecond=0, second=0)
+    index = pd.date_range(end=end, periods=days * 1440, freq="min", name="index")
+    data = {}
+    for metric in METRICS:
+        if metric in ("sys_mem", "sys_cpu", "loop_time_s"):
+            data[metric] = rng.random(len(index)) * 100
+        else:
+            data[metric] = rng.integers(0, 100_000, len(index))
+    return pd.DataFrame(data, index=index)
+
+
+@contextlib.asynccontextmanager
+async def temp_driver() -> AsyncIterator[StatTrackSQLiteDriver]:
+    with tempfile.TemporaryDirectory() as tmp:
+        driver = StatTrackSQLiteDriver(sql_path=str(Path(tmp) / "timeseries.db"))
+        try:
+            yield driver
+        finally:  # the executor threads would stop the process exiting
+            await driver.close()
+
+
+# cases
+
+
+async def bench_update_stats(members: int, repeat: int, max_seconds: float) -> list[Result]:
+    async with temp_driver() as driver:
+        await driver.write(pd.DataFrame())
+        cog = FakeCog(make_bot(members), driver)
+        clock = FakeClock()
+
+        async def reconcile() -> None:
+            await cog.counter.reconcile(cog.bot.guilds)
+
+        async def update_stats() -> None:
+            clock.tick()
+            await cog.update_stats()
+
+        results = [await measure(f"reconcile {members:,} members", reconcile, repeat, max_seconds)]
+        with mock.patch.object(stattrack_module, "snapped_utcnow", clock), mock.patch.object(
+            stattrack_module, "asyncio", SimpleNamespace(sleep=_no_sleep)
+        ):
+            results.append(
+                await measure(
+                    f"update_stats {members:,} members", update_stats, repeat, max_seconds
+                )
+            )
+    return results
+
+
+async def bench_driver(days: int, repeat: int, max_seconds: float) -> list[Result]:
+    results = []
+    async with temp_driver() as driver:
+        df = make_data(days)
+
+        start = time.perf_counter()
+        await driver.write(df)
+        await driver.rollup()
+        print(f"(loaded {len(df):,} rows in {time.perf_counter() - start:.1f}s)")
+
+        cog = FakeCog(make_bot(1), driver)
+        await cog.load_buffer()
+        delta = datetime.timedelta(days=days)
+        label = f"{days}d"
+
+        async def read_partial() -> None:
+            await driver.read_partial(["ping"], delta)
+
+        async def read_all() -> None:
+            await driver.read_all()
+
+        async def prepare_one() -> None:
+            await cog.prepare_plot_data(["ping"], delta, show_total=True)
+
+        async def prepare_many() -> None:
+            await cog.prepare_plot_data([f"status_{s}" for s in STATUSES], delta)
+
+        results.append(await measure(f"read_partial {label}", read_partial, repeat, max_seconds))
+        results.append(await measure(f"read_all {label}", read_all, repeat, max_seconds))
+        results.append(
+            await measure(f"all_in_one prep, 1 metric {label}", prepare_one, repeat, max_seconds)
+        )
+        results.append(
+            await measure(f"all_in_one prep, 4 metrics {label}", prepare_many, repeat, max_seconds)
+        )
+
+        last = df.index[-1]
+
+        async def append() -> None:
+            nonlocal last
+            last += datetime.timedelta(minutes=1)
+            await driver.append(pd.DataFrame(df.iloc[-1:].to_dict("list"), index=[last]))
+
+        results.append(await measure(f"append {label}", append, repeat, max_seconds))
+    return results
+
+
+async def main(args: argparse.Namespace) -> None:
+    print_header()
+    results: list[Result] = []
+    for members in args.members:
+        results += await bench_update_stats(members, args.repeat, args.max_seconds)
+    for days in args.days:
+        results += await bench_driver(days, args.repeat, args.max_seconds)
+
+    if args.json:
+        write_json(results, args.json)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark StatTrack.")
+    parser.add_argument(
+        "--members",
+        type=int,
+        nargs="*",
+        default=[1_000, 100_000, 1_000_000],
+        help="member counts for the fake bot",
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        nargs="*",
+        default=[1, 30, 730],
+        help="amounts of data for the driver benchmarks, in days",
+    )
+    add_common_args(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
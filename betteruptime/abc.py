@@ -1,6 +1,6 @@
 import asyncio
 from abc import ABC, ABCMeta, abstractmethod
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 import pandas
 from redbot.core import commands
@@ -10,6 +10,8 @@ from redbot.core.config import Config
 from .vexutils.loop import VexLoop
 
 if TYPE_CHECKING:
+    from betteruptime.plot import Plotter
+    from betteruptime.store import UptimeStore
     from betteruptime.utils import UptimeData
 
 
@@ -36,6 +38,11 @@ class MixinMeta(ABC):
 
     cog_loaded_cache: pandas.Series
     connected_cache: pandas.Series
+    store: "UptimeStore"
+    disconnected_since: Optional[float]
+    history_updated: float
+
+    plotter: "Plotter"
 
     ready: asyncio.Event
 
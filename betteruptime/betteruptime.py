@@ -1,6 +1,7 @@
 import asyncio
-import os
 import sys
+import time
+from typing import Optional
 
 import pandas
 from redbot.core import Config, commands
@@ -11,11 +12,15 @@ from redbot.core.utils.chat_formatting import pagify
 from .abc import CompositeMetaClass
 from .commands import BUCommands
 from .loop import BULoop
+from .plot import Plotter
 from .slash import BUSlash
+from .store import UptimeStore
 from .utils import Utils
 from .vexutils import format_help, format_info, get_vex_logger
 from .vexutils.chat import humanize_bytes
+from .vexutils.loop import add_loop_stats_dev_value, remove_loop_stats_dev_value
 from .vexutils.meta import out_of_date_check
+from .vexutils.watchdog import add_watchdog_tools, remove_watchdog_tools
 
 old_uptime = None
 log = get_vex_logger(__name__)
@@ -78,7 +83,11 @@ class BetterUptime(commands.Cog, BUCommands, BUSlash, BULoop, Utils, metaclass=C
 
         self.cog_loaded_cache = pandas.Series(dtype="float64")
         self.connected_cache = pandas.Series(dtype="float64")
-        self.unload_write = True
+        self.store = UptimeStore(str(cog_data_path(self) / "uptime.db"))
+        self.disconnected_since: Optional[float] = None
+        self.history_updated = 0.0
+
+        self.plotter = Plotter()
 
         self.ready = asyncio.Event()
         self.conf_ready = asyncio.Event()
@@ -87,6 +96,8 @@ class BetterUptime(commands.Cog, BUCommands, BUSlash, BULoop, Utils, metaclass=C
             self.bot.add_dev_env_value("bu", lambda _: self)
         except Exception:
             pass
+        add_loop_stats_dev_value(self.bot, "BetterUptime")
+        add_watchdog_tools(self.bot, "BetterUptime")
 
         self.plot_backend_ready = matplotlib_setup()
 
@@ -107,6 +118,12 @@ class BetterUptime(commands.Cog, BUCommands, BUSlash, BULoop, Utils, metaclass=C
         if self.main_loop:
             self.main_loop.cancel()
 
+        if self.ready.is_set():  # the gap until the next load is counted from here
+            await self.store.end_outages(time.time())
+            await self.store.mark_seen(time.time())
+        await self.store.close()
+        self.plotter.close()
+
         global old_uptime  # noqa: F824
         if old_uptime:
             try:
@@ -119,11 +136,13 @@ class BetterUptime(commands.Cog, BUCommands, BUSlash, BULoop, Utils, metaclass=C
             self.bot.remove_dev_env_value("bu")
         except Exception:
             pass
+        remove_watchdog_tools(self.bot, "BetterUptime")
+        remove_loop_stats_dev_value(self.bot, "BetterUptime")
 
     @commands.command(hidden=True)
     async def betteruptimeinfo(self, ctx: commands.Context):
         loops = [self.main_loop_meta] if self.main_loop_meta else []
-        disk_usage = os.path.getsize(cog_data_path(self) / "settings.json")
+        disk_usage = self.store.storage_usage()
         memory_usage = sys.getsizeof(self.connected_cache) + sys.getsizeof(self.cog_loaded_cache)
 
         await ctx.send(
@@ -7,8 +7,8 @@ from redbot.core import commands
 from redbot.core.utils.chat_formatting import humanize_timedelta, inline, pagify, text_to_file
 
 from .abc import MixinMeta
-from .consts import SECONDS_IN_DAY, WARN
-from .plot import plot
+from .consts import WARN
+from .utils import humanize_seconds
 from .vexutils import get_vex_logger
 from .vexutils.chat import datetime_to_timestamp
 
@@ -116,16 +116,18 @@ class BUCommands(MixinMeta):
                 "today._"
             )
         msg = ""
-        date: pandas.Timestamp
-        for date in data.expected_index:
-            if date == midnight:
-                continue
-            if SECONDS_IN_DAY - data.daily_connected_data[date] > 60:
-                date_fmted = date.strftime("%Y-%m-%d")
-                msg += (
-                    f"\n**{date_fmted}**: `{data.date_downtime(date)}`, of which "
-                    f"`{data.date_net_downtime(date)}` was due to network issues."
-                )
+        outages = data.outages_by_date()
+        for date, row in data.downtime_dates().iterrows():
+            msg += (
+                f"\n**{date:%Y-%m-%d}**: `{humanize_seconds(row.downtime)}`, of which "
+                f"`{humanize_seconds(row.net_downtime)}` was due to network issues."
+            )
+            if date in outages.index:
+                for outage in outages.loc[[date]].itertuples():
+                    start = datetime.datetime.utcfromtimestamp(outage.started)
+                    end = datetime.datetime.utcfromtimestamp(outage.ended)
+                    reason = "network" if outage.kind == "network" else "not running"
+                    msg += f"\n- {start:%H:%M} to {end:%H:%M} ({reason})"
 
         if not msg:
             await ctx.send(
@@ -173,8 +175,10 @@ class BUCommands(MixinMeta):
         if len(sr) < 2 or sr is None:
             return await ctx.send("Give me a few more days to collect data!")
 
+        # today is excluded from the graph so it only changes with the date
+        cache_key = (num_days, data.expected_index[-1], self.history_updated)
         async with ctx.typing():
-            graph, labelled_pc = await plot(sr)
+            graph, labelled_pc = await self.plotter.plot(sr, cache_key)
 
         embed = discord.Embed(
             title="Daily uptime data for the last " + str(num_days) + " days",
@@ -226,6 +230,7 @@ class BUCommands(MixinMeta):
             self.main_loop.cancel()
 
         await self.config.clear()
+        await self.store.clear()
 
         self.ready.clear()
 
@@ -1,4 +1,3 @@
-import asyncio
 import datetime
 import json
 from io import StringIO
@@ -10,7 +9,7 @@ import pandas
 from .abc import MixinMeta
 from .consts import INF, SECONDS_IN_DAY
 from .vexutils import get_vex_logger
-from .vexutils.loop import VexLoop
+from .vexutils.loop import VexLoop, get_runner
 
 log = get_vex_logger(__name__)
 
@@ -23,26 +22,39 @@ class BULoop(MixinMeta):
             await self.config.first_load.set(time())
             self.first_load = time()
 
-        if await self.config.version() == 1:
+        version = await self.config.version()
+        if version == 1:
             log.info("Migrating BetterUptime config to new format (1 -> 3)...")
             await self.migrate_v1_to_v3()
-            await self.config.version.set(3)
-        elif await self.config.version() == 2:
+        elif version == 2:
             log.info("Migrating BetterUptime config to new format (2 -> 3)...")
             await self.migate_v2_to_v3()
-            await self.config.version.set(3)
-        else:
+        elif version == 3:
             with StringIO(json.dumps(await self.config.cog_loaded())) as s:
                 self.cog_loaded_cache = pandas.Series(pandas.read_json(s, typ="series"))
-            log.trace("pd obj for cog loaded cache:\n%s", self.cog_loaded_cache)
-
             with StringIO(json.dumps(await self.config.connected())) as s:
                 self.connected_cache = pandas.Series(pandas.read_json(s, typ="series"))
-            log.trace("pd obj for connected cache:\n%s", self.connected_cache)
+
+        if version < 4:
+            log.info("Moving BetterUptime data from config to SQLite (3 -> 4)...")
+            await self.migrate_v3_to_v4()
+            await self.config.version.set(4)
+        else:
+            self.cog_loaded_cache, self.connected_cache = await self.store.read()
+        log.trace("pd obj for cog loaded cache:\n%s", self.cog_loaded_cache)
+        log.trace("pd obj for connected cache:\n%s", self.connected_cache)
+        # past days only change here, today's data is never plotted
+        self.history_updated = time()
+
+        await self.record_unloaded_gap()
 
         log.debug("Config setup finished, waiting to start loops")
 
-        self.main_loop = self.bot.loop.create_task(self.betteruptime_main_loop())
+        # on the minute, but not at the same time as every other loop on the bot
+        self.main_loop_meta = VexLoop("BetterUptime Main Loop", 60.0, jitter=15.0)
+        self.main_loop = get_runner().register(
+            self.main_loop_meta, self.betteruptime_iteration, wait_for=self.before_main_loop
+        )
 
     async def migrate_v1_to_v3(self):
         old_cog_loaded = await self.config.cog_loaded()
@@ -58,8 +70,6 @@ class BULoop(MixinMeta):
         }
         self.connected_cache = pandas.Series(data=partially_converted, dtype=float)
 
-        await self.write_to_config()
-
     async def migate_v2_to_v3(self):
         # i had bad code when making v2 so config was a mixtre of v1 and v2 format.... congrats me
         old_cog_loaded = await self.config.cog_loaded()
@@ -83,55 +93,39 @@ class BULoop(MixinMeta):
         self.cog_loaded_cache = convert(old_cog_loaded)
         self.connected_cache = convert(old_connected)
 
-        await self.write_to_config()
-
-    async def betteruptime_main_loop(self):
+    async def migrate_v3_to_v4(self):
+        # config was rewritten in full every minute, now each day is a row in SQLite
+        await self.store.write(self.cog_loaded_cache, self.connected_cache)
+        await self.config.cog_loaded.clear()
+        await self.config.connected.clear()
+
+    async def record_unloaded_gap(self) -> None:
+        """Log the time since the loop last ran as an outage, if it was more than a loop."""
+        last_seen = await self.store.last_seen()
+        now = time()
+        # anything still going can't have been seen past the last loop
+        await self.store.end_outages(last_seen or now)
+        if last_seen is not None and now - last_seen > 90:
+            log.debug("Recording %s seconds of downtime while unloaded", now - last_seen)
+            await self.store.add_outage("unloaded", last_seen, now)
+        await self.store.mark_seen(now)
+
+    async def before_main_loop(self) -> None:
         await self.bot.wait_until_red_ready()
 
         self.last_known_ping = self.bot.latency
         self.last_ping_change = time()
 
-        await asyncio.sleep(1)
-
-        # making the loop run on the minute every time means i don't need to worry about seconds
-        # well, on the minute - 5 sec. it's to make stuff easier in the loop code
-        while (round(time() + 5) % 60) != 0:
-            await asyncio.sleep(0.1)
-
-        self.main_loop_meta = VexLoop("BetterUptime Main Loop", 60.0)
-
         log.debug("[BU SETUP] Starting loop")
-        log.debug("[BU SETUP] BetterUptime is now fully initialised. Setup complete.")
 
-        self.ready.set()
+    async def betteruptime_iteration(self) -> None:
+        if not self.ready.is_set():
+            log.debug("[BU SETUP] BetterUptime is now fully initialised. Setup complete.")
+            self.ready.set()
 
-        while True:
-            log.verbose("Loop has started next iteration")
-            try:
-                self.main_loop_meta.iter_start()
-                await self.update_uptime()
-                self.main_loop_meta.iter_finish()
-                log.verbose("Loop has finished")
-            except Exception as e:
-                self.main_loop_meta.iter_error(e)
-                log.exception(
-                    "Something went wrong in the main BetterUptime loop. The loop will try again "
-                    "in 60 seconds. Please report this and the below information to Vexed.",
-                    exc_info=e,
-                )
-
-            await self.main_loop_meta.sleep_until_next()
-
-    async def write_to_config(self) -> None:
-        log.trace("write to config called")
-        if not self.cog_loaded_cache.empty:
-            data = json.loads(self.cog_loaded_cache.to_json())  # type: ignore
-            await self.config.cog_loaded.set(data)
-            log.trace("written cog loaded cache to config")
-        if not self.connected_cache.empty:
-            data = json.loads(self.connected_cache.to_json())  # type: ignore
-            await self.config.connected.set(data)
-            log.trace("written connected cache to config")
+        log.verbose("Loop has started next iteration")
+        await self.update_uptime()
+        log.verbose("Loop has finished")
 
     async def update_uptime(self):
         utcdatetoday = datetime.datetime.utcnow().replace(
@@ -139,6 +133,7 @@ class BULoop(MixinMeta):
         )
 
         # === COG LOADED ===
+        cog_loaded = 60.0
         try:
             self.cog_loaded_cache[utcdatetoday] += 60
         except KeyError:
@@ -149,10 +144,23 @@ class BULoop(MixinMeta):
         # fails (so bot is unable to connect) the latency is infinity (float("inf"))
         # heartbeats are around every 42 seconds as of the time i write this
         # and it's a float for compatibility with old versions
+        connected = 0.0
         if self.bot.latency != INF:
+            connected = 60.0
             try:
                 self.connected_cache[utcdatetoday] += 60.0
             except KeyError:
                 self.connected_cache[utcdatetoday] = 60.0
 
-        await self.write_to_config()
+        await self.store.add(utcdatetoday, cog_loaded, connected)
+
+        # === OUTAGES ===
+        # only to the resolution of the loop, but that's enough to say when it happened
+        now = time()
+        if connected and self.disconnected_since is not None:
+            await self.store.end_outages(now, "network")
+            self.disconnected_since = None
+        elif not connected and self.disconnected_since is None:
+            await self.store.start_outage("network", now - 60)
+            self.disconnected_since = now - 60
+        await self.store.mark_seen(now)
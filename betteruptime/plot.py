@@ -1,71 +1,116 @@
 import asyncio
 import io
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from heapq import nsmallest  # this is standard library
-from typing import Dict, Optional, Tuple
+from typing import Dict, Hashable, Optional, Tuple
 
 import discord
 import pandas as pd
 
+PLOT_CACHE_SIZE = 16  # graphs are ~50KB each
 
-async def plot(sr: pd.Series) -> Tuple[discord.File, Optional[float]]:
-    """Plot the series using Matplotlib and return a Discord file and optional labelled threshold.
+_style: Optional[dict] = None  # only touched from the plot thread
 
-    This offloads the blocking work to a thread pool to avoid blocking the event loop.
+
+def _setup() -> None:
+    """Import matplotlib and load the style once, so the first graph isn't slow."""
+    global _style
+    import matplotlib.style
+
+    _style = dict(matplotlib.style.library["dark_background"])
+
+
+class Plotter:
+    """Renders uptime graphs on a dedicated thread, keeping the most recent ones in memory.
+
+    Only the object-oriented Figure API is used, not pyplot, and everything runs on a single
+    thread so nothing here is shared between threads.
     """
-    loop = asyncio.get_event_loop()
-    return await asyncio.wait_for(loop.run_in_executor(None, _plot, sr), timeout=60.0)
 
+    def __init__(self, cache_size: int = PLOT_CACHE_SIZE) -> None:
+        self.executor = ThreadPoolExecutor(1, "betteruptime_plot")
+        self.executor.submit(_setup)
+
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Hashable, Tuple[bytes, Optional[float]]]" = OrderedDict()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+
+    async def plot(
+        self, sr: pd.Series, cache_key: Optional[Hashable] = None
+    ) -> Tuple[discord.File, Optional[float]]:
+        """Plot the series and return a Discord file and optional labelled threshold.
+
+        If ``cache_key`` is given and a graph with the same key was made recently, that graph
+        is returned without plotting again.
+        """
+        cached = self._cache.get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            image, labelled_pc = cached
+        else:
+            loop = asyncio.get_running_loop()
+            image, labelled_pc = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, _plot, sr), timeout=60.0
+            )
+            if cache_key is not None:
+                self._cache[cache_key] = (image, labelled_pc)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return discord.File(io.BytesIO(image), filename="plot.png"), labelled_pc
 
-def _plot(sr: pd.Series) -> Tuple[discord.File, Optional[float]]:
+
+def _plot(sr: pd.Series) -> Tuple[bytes, Optional[float]]:
     import matplotlib
+    from matplotlib.figure import Figure
+
+    if _style is None:
+        _setup()
+
+    with matplotlib.rc_context(_style):
+        fig = Figure(figsize=(8, 5), dpi=100)
+        ax = fig.subplots()
+
+        x = sr.index
+        y = sr.values.astype(float)
+
+        ax.plot(x, y, color="#1f77b4", linewidth=2)
+        ax.fill_between(x, y, 0, color="#1f77b4", alpha=0.08)
+
+        ax.set_ylabel("Percentage uptime")
+        ax.set_xlabel("Date")
+        fig.autofmt_xdate()
+        ax.set_ylim(bottom=0)
+        ax.set_title("Daily uptime")
+        ax.tick_params(labelsize=10)
+
+        # annotate low values (<99.7)
+        low_values: Dict[pd.Timestamp, float] = {}
+        for i, value in enumerate(y):
+            if value < 99.7:
+                date = x[i]
+                low_values[date] = float(value)
+
+        values_to_annotate = nsmallest(5, low_values.values())
+        for val in values_to_annotate:
+            # find the corresponding date for this value (first match)
+            date = next(k for k, v in low_values.items() if v == val)
+            ax.annotate(
+                f"{val}%\n{date.strftime('%d %b')}",
+                xy=(date, val),
+                xytext=(0, 8),
+                textcoords="offset points",
+                ha="center",
+                fontsize=9,
+            )
+
+        labelled_pc = max(low_values.values()) if low_values else None
 
-    matplotlib.use("Agg")
-    import matplotlib.pyplot as plt
-
-    # Prepare figure
-    plt.style.use("dark_background")
-    fig, ax = plt.subplots(figsize=(8, 5), dpi=100)
-
-    x = sr.index
-    y = sr.values.astype(float)
-
-    ax.plot(x, y, color="#1f77b4", linewidth=2)
-    ax.fill_between(x, y, 0, color="#1f77b4", alpha=0.08)
-
-    ax.set_ylabel("Percentage uptime")
-    ax.set_xlabel("Date")
-    fig.autofmt_xdate()
-    ax.set_ylim(bottom=0)
-    ax.set_title("Daily uptime")
-    ax.tick_params(labelsize=10)
-
-    # annotate low values (<99.7)
-    low_values: Dict[pd.Timestamp, float] = {}
-    for i, value in enumerate(y):
-        if value < 99.7:
-            date = x[i]
-            low_values[date] = float(value)
-
-    values_to_annotate = nsmallest(5, low_values.values())
-    for val in values_to_annotate:
-        # find the corresponding date for this value (first match)
-        date = next(k for k, v in low_values.items() if v == val)
-        ax.annotate(
-            f"{val}%\n{date.strftime('%d %b')}",
-            xy=(date, val),
-            xytext=(0, 8),
-            textcoords="offset points",
-            ha="center",
-            fontsize=9,
-        )
-
-    labelled_pc = max(low_values.values()) if low_values else None
-
-    # Render to PNG in memory
-    buf = io.BytesIO()
-    fig.tight_layout()
-    fig.savefig(buf, format="png")
-    plt.close(fig)
-    buf.seek(0)
-    file = discord.File(buf, filename="plot.png")
-    return file, labelled_pc
+        # Render to PNG in memory
+        buf = io.BytesIO()
+        fig.tight_layout()
+        fig.savefig(buf, format="png")
+    return buf.getvalue(), labelled_pc
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import datetime
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+import pandas as pd
+
+T = TypeVar("T")
+
+# network: the cog was loaded but not connected to Discord. unloaded: the cog wasn't running
+OUTAGE_KINDS = ("network", "unloaded")
+
+
+def to_epoch_day(dt: datetime.datetime) -> int:
+    """Days since the Unix epoch, treating naive datetimes as UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return int(dt.timestamp()) // 86400
+
+
+class UptimeStore:
+    """Daily uptime totals in SQLite, one row per day, and a log of outages.
+
+    Each loop only adds to today's row, so the cost of a write doesn't grow with the amount of
+    history like rewriting it all to Config did. Everything runs on one long-lived connection
+    on a single thread executor.
+
+    Outages are intervals in Unix seconds, of one of ``OUTAGE_KINDS``. Those of the same kind
+    never overlap so ordering by end is the same as ordering by start, which lets range queries
+    use the index on ``ended`` alone. An outage which is still going has no end.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.executor = ThreadPoolExecutor(1, "betteruptime_sql")
+        self._conn: sqlite3.Connection | None = None  # only touched from the executor
+
+    def storage_usage(self) -> int:
+        """Return the size of the database in bytes, including the write-ahead log."""
+        size = 0
+        for suffix in ("", "-wal"):
+            with contextlib.suppress(FileNotFoundError):
+                size += os.path.getsize(self.path + suffix)
+        return size
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS daily "
+                "(day INTEGER PRIMARY KEY, cog_loaded REAL NOT NULL, connected REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS outages "
+                "(id INTEGER PRIMARY KEY, kind TEXT NOT NULL, started REAL NOT NULL, ended REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS outages_ended ON outages (ended)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        def _func() -> T:
+            conn = self._get_conn()
+            try:
+                return func(conn)
+            except Exception:
+                conn.rollback()
+                raise
+
+        return await asyncio.get_running_loop().run_in_executor(self.executor, _func)
+
+    async def read(self) -> tuple[pd.Series, pd.Series]:
+        """Read all days.
+
+        Returns
+        -------
+        tuple[pd.Series, pd.Series]
+            Seconds the cog was loaded and seconds connected each day, indexed by the date
+            at midnight.
+        """
+
+        def _read(conn: sqlite3.Connection) -> list[tuple[int, float, float]]:
+            return conn.execute(
+                "SELECT day, cog_loaded, connected FROM daily ORDER BY day"
+            ).fetchall()
+
+        rows = await self._run(_read)
+        index = pd.to_datetime([r[0] for r in rows], unit="D")
+        cog_loaded = pd.Series([r[1] for r in rows], index=index, dtype="float64")
+        connected = pd.Series([r[2] for r in rows], index=index, dtype="float64")
+        return cog_loaded, connected
+
+    async def add(self, day: datetime.datetime, cog_loaded: float, connected: float) -> None:
+        """Add seconds to the totals for a day, creating it if needed."""
+
+        def _add(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "INSERT INTO daily (day, cog_loaded, connected) VALUES (?, ?, ?) "
+                "ON CONFLICT(day) DO UPDATE SET cog_loaded = cog_loaded + excluded.cog_loaded, "
+                "connected = connected + excluded.connected",
+                (to_epoch_day(day), cog_loaded, connected),
+            )
+            conn.commit()
+
+        await self._run(_add)
+
+    async def write(self, cog_loaded: pd.Series, connected: pd.Series) -> None:
+        """Replace everything with the given daily totals. Only for migrations."""
+        df = pd.concat([cog_loaded, connected], axis=1).fillna(0.0)
+        rows = [
+            (to_epoch_day(day.to_pydatetime()), float(row.iloc[0]), float(row.iloc[1]))
+            for day, row in df.iterrows()
+        ]
+
+        def _write(conn: sqlite3.Connection) -> None:
+            conn.execute("DELETE FROM daily")
+            conn.executemany(
+                "INSERT INTO daily (day, cog_loaded, connected) VALUES (?, ?, ?)", rows
+            )
+            conn.commit()
+
+        await self._run(_write)
+
+    async def last_seen(self) -> float | None:
+        """When the loop last ran, in Unix seconds, or None if it never has."""
+
+        def _last_seen(conn: sqlite3.Connection) -> float | None:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'last_seen'").fetchone()
+            return None if row is None else row[0]
+
+        return await self._run(_last_seen)
+
+    async def mark_seen(self, now: float) -> None:
+        def _mark_seen(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_seen', ?)", (now,)
+            )
+            conn.commit()
+
+        await self._run(_mark_seen)
+
+    async def start_outage(self, kind: str, started: float) -> None:
+        """Start an outage, unless one of the same kind is already going."""
+
+        def _start(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "INSERT INTO outages (kind, started) SELECT ?, ? WHERE NOT EXISTS "
+                "(SELECT 1 FROM outages WHERE kind = ? AND ended IS NULL)",
+                (kind, started, kind),
+            )
+            conn.commit()
+
+        await self._run(_start)
+
+    async def end_outages(self, ended: float, kind: str | None = None) -> None:
+        """End any outages which are still going, optionally only of one kind."""
+
+        def _end(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "UPDATE outages SET ended = MAX(started, ?) "
+                "WHERE ended IS NULL AND (? IS NULL OR kind = ?)",
+                (ended, kind, kind),
+            )
+            conn.commit()
+
+        await self._run(_end)
+
+    async def add_outage(self, kind: str, started: float, ended: float) -> None:
+        def _add(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "INSERT INTO outages (kind, started, ended) VALUES (?, ?, ?)",
+                (kind, started, ended),
+            )
+            conn.commit()
+
+        await self._run(_add)
+
+    async def outages(self, start: float, end: float) -> pd.DataFrame:
+        """Get the outages overlapping ``start`` to ``end`` (Unix seconds), clipped to that
+        range. Outages which are still going are treated as ending at ``end``.
+
+        Returns
+        -------
+        pd.DataFrame
+            Columns ``kind``, ``started`` and ``ended`` (as Unix seconds), ordered by start.
+        """
+
+        def _outages(conn: sqlite3.Connection) -> list[tuple[str, float, float]]:
+            return conn.execute(
+                "SELECT kind, MAX(started, :start), MIN(COALESCE(ended, :end), :end) "
+                "FROM outages WHERE (ended > :start OR ended IS NULL) AND started < :end "
+                "ORDER BY started",
+                {"start": start, "end": end},
+            ).fetchall()
+
+        rows = await self._run(_outages)
+        return pd.DataFrame(rows, columns=["kind", "started", "ended"])
+
+    async def clear(self) -> None:
+        def _clear(conn: sqlite3.Connection) -> None:
+            conn.execute("DELETE FROM daily")
+            conn.execute("DELETE FROM outages")
+            conn.execute("DELETE FROM meta")
+            conn.commit()
+
+        await self._run(_clear)
+
+    async def close(self) -> None:
+        def _close() -> None:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        await asyncio.get_running_loop().run_in_executor(self.executor, _close)
+        self.executor.shutdown(wait=False)
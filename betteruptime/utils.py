@@ -2,8 +2,10 @@ from __future__ import annotations
 
 import datetime
 from dataclasses import dataclass
+from functools import cached_property
 from math import ceil
 
+import numpy as np
 import pandas as pd
 from redbot.core.utils.chat_formatting import humanize_timedelta
 
@@ -18,6 +20,39 @@ def round_up_to_min(num: float):
     return ceil(num / 60.0) * 60
 
 
+def split_outages_by_day(outages: pd.DataFrame) -> pd.DataFrame:
+    """Split outages (as from ``UptimeStore.outages``) at midnight UTC.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns ``day`` (midnight of the day), ``kind``, ``started`` and ``ended``, with one
+        row for each day each outage touches.
+    """
+    started = outages["started"].to_numpy(dtype="float64")
+    ended = outages["ended"].to_numpy(dtype="float64")
+    first_day = (started // SECONDS_IN_DAY).astype("int64")
+    last_day = (np.maximum(ended - 1e-9, started) // SECONDS_IN_DAY).astype("int64")
+
+    counts = last_day - first_day + 1
+    which = np.repeat(np.arange(len(outages)), counts)
+    offsets = np.arange(len(which)) - np.repeat(np.cumsum(counts) - counts, counts)
+    day = first_day[which] + offsets
+
+    return pd.DataFrame(
+        {
+            "day": pd.to_datetime(day, unit="D"),
+            "kind": outages["kind"].to_numpy()[which],
+            "started": np.maximum(started[which], day * SECONDS_IN_DAY),
+            "ended": np.minimum(ended[which], (day + 1) * SECONDS_IN_DAY),
+        }
+    )
+
+
+def humanize_seconds(seconds: float) -> str:
+    return humanize_timedelta(seconds=round_up_to_min(seconds)) or "none"
+
+
 @dataclass
 class UptimeData:
     total_secs_connected: float
@@ -32,45 +67,46 @@ class UptimeData:
 
     expected_index: pd.DatetimeIndex
 
+    outages: pd.DataFrame  # from UptimeStore.outages, for the same timeframe
+
+    @cached_property
+    def daily(self) -> pd.DataFrame:
+        """Per-date data for the selected timeframe, excluding today.
+
+        Columns are ``connected`` and ``cog_loaded`` (seconds), ``connected_pc`` and
+        ``cog_loaded_pc`` (percentages, rounded to 2dp) and ``downtime`` and ``net_downtime``
+        (seconds). Dates without data are NaN.
+        """
+        midnight = datetime.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        df = pd.DataFrame(
+            {"connected": self.daily_connected_data, "cog_loaded": self.daily_cog_loaded_data},
+            dtype="float64",
+        )
+        df = df.drop(index=midnight, errors="ignore")
+        df["connected_pc"] = (df["connected"] / SECONDS_IN_DAY * 100).round(2)
+        df["cog_loaded_pc"] = (df["cog_loaded"] / SECONDS_IN_DAY * 100).round(2)
+        df["downtime"] = SECONDS_IN_DAY - df["connected"]
+        df["net_downtime"] = df["cog_loaded"] - df["connected"]
+        return df
+
     @property
     def downtime(self) -> str:
         """Get complete downtime for selected timeframe"""
-        return (
-            humanize_timedelta(
-                seconds=round_up_to_min(self.seconds_data_collected - self.total_secs_connected)
-            )
-            or "none"
-        )
+        return humanize_seconds(self.seconds_data_collected - self.total_secs_connected)
 
-    def date_downtime(self, date: pd.Timestamp) -> str:
-        """Get complete downtime for selected date"""
-        return (
-            humanize_timedelta(
-                seconds=round_up_to_min(SECONDS_IN_DAY - self.daily_connected_data[date])
-            )
-            or "none"
-        )
+    def downtime_dates(self) -> pd.DataFrame:
+        """Get the rows of ``daily`` with over a minute of downtime"""
+        return self.daily[self.daily["downtime"] > 60]
+
+    def outages_by_date(self) -> pd.DataFrame:
+        """Get the recorded outages split at midnight, indexed by date. Use ``.loc[[date]]``
+        to get those for one date."""
+        return split_outages_by_day(self.outages).set_index("day")
 
     @property
     def net_downtime(self) -> str:
         """Get network downtime for selected timeframe"""
-        return (
-            humanize_timedelta(
-                seconds=round_up_to_min(self.total_secs_loaded - self.total_secs_connected)
-            )
-            or "none"
-        )
-
-    def date_net_downtime(self, date: pd.Timestamp) -> str:
-        """Get network downtime for selected timeframe"""
-        return (
-            humanize_timedelta(
-                seconds=round_up_to_min(
-                    self.daily_cog_loaded_data[date] - self.daily_connected_data[date]
-                )
-            )
-            or "none"
-        )
+        return humanize_seconds(self.total_secs_loaded - self.total_secs_connected)
 
     @property
     def cog_uptime(self) -> str:
@@ -86,30 +122,11 @@ class UptimeData:
             round((self.total_secs_connected / self.seconds_data_collected) * 100, 2), ".2f"
         )
 
-    # for these two below no need to copy because object is single use
     def daily_connected_percentages(self) -> pd.Series:
-        midnight = datetime.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        new = self.daily_connected_data
-        for date in self.expected_index:
-            if date == midnight:
-                continue
-            new[date] = round((self.daily_connected_data[date] / SECONDS_IN_DAY) * 100, 2)
-        try:
-            del new[midnight]
-        except KeyError:  # dunno how this could happen but it did once
-            pass
-        return new.astype(float)
+        return self.daily["connected_pc"]
 
     def daily_cog_loaded_percentages(self) -> pd.Series:
-        midnight = datetime.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        new = self.daily_cog_loaded_data.copy()
-        for date in self.expected_index:
-            if date == midnight:
-                continue
-            new[date] = round((self.daily_cog_loaded_data[date] / SECONDS_IN_DAY) * 100, 2)
-
-        del new[midnight]
-        return new.astype(float)
+        return self.daily["cog_loaded_pc"]
 
 
 class Utils(MixinMeta):
@@ -185,6 +202,10 @@ class Utils(MixinMeta):
         ):  # for my my experience heartbeats are ~41 secs
             seconds_connected = seconds_data_collected
 
+        outages = await self.store.outages(
+            expected_index[0].timestamp(), now.replace(tzinfo=datetime.timezone.utc).timestamp()
+        )
+
         return UptimeData(
             total_secs_connected=seconds_connected,
             total_secs_loaded=seconds_cog_loaded,
@@ -193,4 +214,5 @@ class Utils(MixinMeta):
             seconds_data_collected=seconds_data_collected,
             first_load=conf_first_loaded,
             expected_index=expected_index,  # type:ignore
+            outages=outages,
         )
@@ -38,7 +38,7 @@ class MixinMeta(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def birthday_loop(self) -> None:
+    async def before_birthday_loop(self) -> None:
         raise NotImplementedError
 
     @abstractmethod
@@ -11,7 +11,13 @@ from .abc import CompositeMetaClass
 from .commands import BirthdayAdminCommands, BirthdayCommands
 from .loop import BirthdayLoop
 from .vexutils import format_help, format_info, get_vex_logger
-from .vexutils.loop import VexLoop
+from .vexutils.loop import (
+    VexLoop,
+    add_loop_stats_dev_value,
+    get_runner,
+    remove_loop_stats_dev_value,
+)
+from .vexutils.watchdog import add_watchdog_tools, remove_watchdog_tools
 
 log = get_vex_logger(__name__)
 
@@ -51,14 +57,19 @@ class Birthday(
         )
         self.config.register_member(birthday={"year": 1, "month": 1, "day": 1})
 
-        self.loop_meta = VexLoop("Birthday loop", 60 * 60)
-        self.loop = self.bot.loop.create_task(self.birthday_loop())
+        # on the hour, but not at the same time as every other loop on the bot
+        self.loop_meta = VexLoop("Birthday loop", 60 * 60, jitter=60.0)
+        self.loop = get_runner().register(
+            self.loop_meta, self._update_birthdays, wait_for=self.before_birthday_loop
+        )
         self.role_manager = self.bot.loop.create_task(self.birthday_role_manager())
         self.coro_queue = asyncio.Queue()
 
         self.ready = asyncio.Event()
 
         bot.add_dev_env_value("birthday", lambda _: self)
+        add_loop_stats_dev_value(bot, "Birthday")
+        add_watchdog_tools(bot, "Birthday")
 
     def format_help_for_context(self, ctx: commands.Context) -> str:
         """Thanks Sinbad."""
@@ -72,6 +83,8 @@ class Birthday(
             self.bot.remove_dev_env_value("birthday")
         except KeyError:
             pass
+        remove_watchdog_tools(self.bot, "Birthday")
+        remove_loop_stats_dev_value(self.bot, "Birthday")
 
     async def red_delete_data_for_user(self, **kwargs) -> None:
         # will delete for any requester
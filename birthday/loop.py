@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import datetime
-from typing import Any, NoReturn
+from typing import Any
 
 import discord
 from redbot.core import commands
@@ -90,14 +90,14 @@ class BirthdayLoop(MixinMeta):
             )
         )
 
-    async def birthday_loop(self) -> NoReturn:
-        """The Birthday loop. This coro will run forever."""
+    async def before_birthday_loop(self) -> None:
         await self.bot.wait_until_red_ready()
         await self.ready.wait()
 
         log.verbose("Birthday task started")
 
-        # 1st loop
+        # the loop runs on the hour, but the hour a guild's birthdays are due in might have
+        # already started, so there's one iteration straight away
         try:
             self.loop_meta.iter_start()
             await self._update_birthdays()
@@ -111,32 +111,6 @@ class BirthdayLoop(MixinMeta):
                 exc_info=e,
             )
 
-        # both iter_finish and iter_error set next_iter as not None
-        assert self.loop_meta.next_iter is not None
-        self.loop_meta.next_iter = self.loop_meta.next_iter.replace(
-            minute=0
-        )  # ensure further iterations are on the hour
-
-        await self.loop_meta.sleep_until_next()
-
-        # all further iterations
-        while True:
-            log.verbose("Loop has started next iteration")
-            try:
-                self.loop_meta.iter_start()
-                await self._update_birthdays()
-                self.loop_meta.iter_finish()
-                log.verbose("Loop has finished")
-            except Exception as e:
-                self.loop_meta.iter_error(e)
-                log.exception(
-                    "Something went wrong in the Birthday loop. The loop will try again "
-                    "in an hour. Please report this and the below information to Vexed.",
-                    exc_info=e,
-                )
-
-            await self.loop_meta.sleep_until_next()
-
     async def _update_birthdays(self):
         """Update birthdays"""
         all_birthdays: dict[int, dict[int, dict[str, Any]]] = await self.config.all_members()
@@ -17,7 +17,14 @@ from .components.setup import SetupYesNoView, StartSetupView
 from .poll import Poll, PollOption, PollView
 from .vexutils import format_help, format_info, get_vex_logger, kaleido_setup
 from .vexutils.chat import datetime_to_timestamp
-from .vexutils.loop import VexLoop
+from .vexutils.loop import (
+    VexLoop,
+    add_loop_stats_dev_value,
+    get_runner,
+    remove_loop_stats_dev_value,
+)
+from .vexutils.render import add_render_pool_user, get_render_pool, release_render_pool
+from .vexutils.watchdog import add_watchdog_tools, remove_watchdog_tools
 
 log = get_vex_logger(__name__)
 
@@ -48,14 +55,19 @@ class ButtonPoll(commands.Cog):
             historic_poll_user_choices={},
         )
 
-        self.loop = bot.loop.create_task(self.buttonpoll_loop())
-        self.loop_meta = VexLoop("ButtonPoll", 60.0)
+        self.loop_meta = VexLoop("ButtonPoll", 60.0, jitter=30.0)
+        self.loop = get_runner().register(
+            self.loop_meta, self.check_for_finished_polls, wait_for=bot.wait_until_red_ready
+        )
 
         self.polls: List[Poll] = []
 
         self.plot_backend_ready = False
 
         bot.add_dev_env_value("bpoll", lambda _: self)
+        add_loop_stats_dev_value(bot, "ButtonPoll")
+        add_watchdog_tools(bot, "ButtonPoll")
+        add_render_pool_user("ButtonPoll")
 
         self.plot_executor = ThreadPoolExecutor(
             max_workers=16, thread_name_prefix="buttonpoll_plot"
@@ -88,12 +100,15 @@ class ButtonPoll(commands.Cog):
     async def cog_unload(self) -> None:
         self.loop.cancel()
         self.bot.remove_dev_env_value("bpoll")
+        remove_watchdog_tools(self.bot, "ButtonPoll")
+        remove_loop_stats_dev_value(self.bot, "ButtonPoll")
 
         # if the cog will be reloaded, best to clean up views as they are re-initialised on load
         for poll in self.polls:
             poll.view.stop()
 
         self.plot_executor.shutdown(wait=False)
+        await release_render_pool("ButtonPoll")
 
         log.verbose("buttonpoll successfully unloaded")
 
@@ -103,7 +118,10 @@ class ButtonPoll(commands.Cog):
             ctx,
             self.qualified_name,
             self.__version__,
-            extras={"" "Plot backend ready": self.plot_backend_ready},
+            extras={
+                "Plot backend ready": self.plot_backend_ready,
+                "Render pool": get_render_pool().summary(),
+            },
         )
         return await ctx.send(main)
 
@@ -507,25 +525,6 @@ Choose wisely!`
             )
             await ctx.send(embed=embed)
 
-    async def buttonpoll_loop(self):
-        """Background loop for checking for finished polls."""
-        await self.bot.wait_until_red_ready()
-        while True:
-            try:
-                log.verbose("ButtonPoll loop starting.")
-                self.loop_meta.iter_start()
-                await self.check_for_finished_polls()
-                self.loop_meta.iter_finish()
-                log.verbose("ButtonPoll loop finished.")
-            except Exception as e:
-                log.exception(
-                    "Something went wrong with the ButtonPoll loop. Please report this to Vexed.",
-                    exc_info=e,
-                )
-                self.loop_meta.iter_error(e)
-
-            await self.loop_meta.sleep_until_next()
-
     async def check_for_finished_polls(self):
         polls = self.polls.copy()
         for poll in polls:
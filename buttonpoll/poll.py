@@ -13,6 +13,7 @@ from discord.enums import ButtonStyle
 
 from .components.poll import PollView
 from .vexutils import get_vex_logger
+from .vexutils.render import PRIORITY_LOW, get_render_pool
 
 if TYPE_CHECKING:
     from plotly.graph_objs._figure import Figure
@@ -340,7 +341,7 @@ class Poll:
 
         df = df.loc[df["count"] != 0]
 
-        def _plot() -> discord.File:
+        def _plot() -> dict:
             """blocking"""
             fig: Figure = px.pie(
                 df, template="plotly_dark", values="count", names=df.index, title=self.question
@@ -357,14 +358,12 @@ class Poll:
                 ),
             )
 
-            bytes = fig.to_image(format="png", width=800, height=500, scale=1)
-            buffer = io.BytesIO(bytes)
-            buffer.seek(0)
-            file = discord.File(buffer, filename="plot.png")
-            buffer.close()
-            return file
+            return fig.to_dict()
 
-        return await self.cog.bot.loop.run_in_executor(self.cog.plot_executor, _plot)
+        figure = await self.cog.bot.loop.run_in_executor(self.cog.plot_executor, _plot)
+        # only sent at the end of a poll, so anyone waiting on a command can go first
+        image = await get_render_pool().render(figure, priority=PRIORITY_LOW)
+        return discord.File(io.BytesIO(image), filename="plot.png")
 
     def __str__(self) -> str:
         return str(self.to_dict())
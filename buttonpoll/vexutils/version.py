@@ -1 +1 @@
-__version__ = "2.8.1"
+__version__ = "2.9.0"
@@ -0,0 +1,358 @@
+import asyncio
+import collections
+import datetime
+import inspect
+import sys
+import threading
+import time
+import traceback
+from logging import getLogger
+from typing import Deque, Dict, List, NamedTuple, Optional, Set
+
+from redbot.core import commands
+from redbot.core.bot import Red
+from redbot.core.utils.chat_formatting import pagify
+from rich import box as rich_box
+from rich.table import Table  # type:ignore
+
+from .chat import no_colour_rich_markup
+from .loop import DurationHistogram
+
+log = getLogger("red.vex-utils")
+
+WATCHDOG_FORMAT = 2  # change this if LoopWatchdog's data or methods change
+
+HEARTBEAT_INTERVAL = 0.1  # seconds between the event loop checking in
+BLOCKED_THRESHOLD = 0.25  # how late a check in must be to count as the loop being blocked
+MAX_EVENTS = 200
+STACK_FRAMES = 12
+
+COROUTINE_FLAGS = inspect.CO_COROUTINE | inspect.CO_ITERABLE_COROUTINE
+
+
+class BlockedEvent(NamedTuple):
+    """A time the event loop was blocked."""
+
+    when: datetime.datetime
+    duration: float
+    cog: Optional[str]
+    task: Optional[str]
+    stack: List[str]
+
+    def format_stack(self) -> str:
+        return "".join(self.stack)
+
+
+class LoopWatchdog:
+    """
+    Watches for the event loop being blocked and records what was running at the time.
+
+    A task on the event loop checks in every ``HEARTBEAT_INTERVAL``. A thread checks that it
+    has, and if it's more than ``BLOCKED_THRESHOLD`` late the thread grabs the event loop
+    thread's stack, which is the code blocking it. When the loop next checks in the block is
+    recorded as a `BlockedEvent`, keeping the last ``MAX_EVENTS``. Each is attributed to the
+    innermost cog in the stack, and the coroutine of the task that was running.
+
+    How late every check in was, blocked or not, is in ``lag``.
+
+    There's one of these shared by all Vex cogs, see `get_watchdog`. It does nothing until
+    started, with ``[p]vexwatchdog start``, and is stopped when the last cog using it unloads.
+    """
+
+    format = WATCHDOG_FORMAT
+
+    def __init__(self, bot: Red, max_events: int = MAX_EVENTS) -> None:
+        self.bot = bot
+        self.events: Deque[BlockedEvent] = collections.deque(maxlen=max_events)
+        self.lag = DurationHistogram()
+        self.started: Optional[datetime.datetime] = None
+        self.users: Set[str] = set()  # names of the cogs using this, see add_watchdog_tools
+
+        self._lock = threading.Lock()
+        self._beat = time.monotonic()
+        self._blocked: Optional[BlockedEvent] = None  # being recorded, set from the thread
+        self._cog_modules: Dict[str, str] = {}  # top level package: cog name
+        self._loop_thread: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"<LoopWatchdog running={self.running} events={len(self.events)} "
+            f"lag_p99={self.lag.percentile(99)}>"
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "LoopWatchdog":
+        """Start watching the event loop. Must be called from the event loop."""
+        if self.running:
+            return self
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._update_cog_modules()
+        self._stop = threading.Event()  # a new one, in case the last thread is still stopping
+        self._heartbeat_task = self._loop.create_task(self._heartbeat())
+        self._thread = threading.Thread(
+            target=self._watch, args=(self._stop,), name="vex_watchdog", daemon=True
+        )
+        self._thread.start()
+        self.started = datetime.datetime.utcnow()
+        log.info("Event loop watchdog started.")
+        return self
+
+    def stop(self) -> "LoopWatchdog":
+        """Stop watching. What's been recorded is kept."""
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        self._thread = None
+        return self
+
+    def clear(self) -> "LoopWatchdog":
+        """Forget everything recorded so far."""
+        self.events.clear()
+        self.lag = DurationHistogram()
+        return self
+
+    def _update_cog_modules(self) -> None:
+        self._cog_modules = {
+            type(cog).__module__.split(".")[0]: name for name, cog in self.bot.cogs.items()
+        }
+
+    async def _heartbeat(self) -> None:
+        last_cogs_update = time.monotonic()
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            now = time.monotonic()
+            with self._lock:
+                late = max(now - self._beat - HEARTBEAT_INTERVAL, 0.0)
+                self._beat = now
+                blocked, self._blocked = self._blocked, None
+            self.lag.record(late)
+            if blocked is not None:
+                self.events.append(blocked._replace(duration=late))
+                log.debug(
+                    "Event loop was blocked for %.3fs, by cog %s in task %s",
+                    late,
+                    blocked.cog,
+                    blocked.task,
+                )
+            if now - last_cogs_update > 60:
+                self._update_cog_modules()
+                last_cogs_update = now
+
+    def _watch(self, stop: threading.Event) -> None:
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            with self._lock:
+                if self._blocked is not None:
+                    continue  # already got the stack for this block
+                if time.monotonic() - self._beat < BLOCKED_THRESHOLD:
+                    continue
+            try:
+                event = self._sample()
+            except Exception:  # never let the thread die
+                log.debug("Unable to sample the event loop.", exc_info=True)
+                continue
+            with self._lock:
+                self._blocked = event
+
+    def _sample(self) -> Optional[BlockedEvent]:
+        assert self._loop_thread is not None
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return None
+        summary = traceback.extract_stack(frame)
+
+        # only the frames are used, as asyncio's task tracking isn't safe from another thread
+        cog = None
+        task_name = None
+        f = frame
+        while f is not None:  # innermost first
+            package = f.f_globals.get("__name__", "").split(".")[0]
+            if cog is None and package in self._cog_modules:
+                cog = self._cog_modules[package]
+            if f.f_code.co_flags & COROUTINE_FLAGS:  # the outermost is the task's coroutine
+                task_name = getattr(f.f_code, "co_qualname", f.f_code.co_name)
+            f = f.f_back
+
+        return BlockedEvent(
+            datetime.datetime.utcnow(),
+            0.0,  # filled in when the loop is unblocked
+            cog,
+            task_name,
+            traceback.format_list(summary[-STACK_FRAMES:]),
+        )
+
+    def query(
+        self, cog: Optional[str] = None, min_duration: float = 0.0, limit: Optional[int] = None
+    ) -> List[BlockedEvent]:
+        """Get recorded blocks, most recent first.
+
+        Parameters
+        ----------
+        cog : str, optional
+            Only those attributed to this cog, case insensitive
+        min_duration : float, optional
+            Only those which lasted at least this many seconds
+        limit : int, optional
+            Only this many
+        """
+        events = [
+            e
+            for e in reversed(self.events)
+            if e.duration >= min_duration and (cog is None or (e.cog or "").lower() == cog.lower())
+        ]
+        return events[:limit] if limit is not None else events
+
+    def by_cog(self) -> Dict[Optional[str], DurationHistogram]:
+        """Durations of recorded blocks, by cog (None for those not in a cog)."""
+        ret: Dict[Optional[str], DurationHistogram] = {}
+        for event in self.events:
+            if event.cog not in ret:
+                ret[event.cog] = DurationHistogram()
+            ret[event.cog].record(event.duration)
+        return ret
+
+    def report(self, cog: Optional[str] = None, stacks: int = 1) -> str:
+        """A summary of what's been blocking the event loop, for showing in Discord or a
+        terminal, with the stacks of the longest ``stacks`` blocks."""
+        if not self.running and self.started is None:
+            return "The watchdog isn't running. Start it with `[p]vexwatchdog start`."
+
+        lag = self.lag.to_dict()
+        text = (
+            f"Watching since {self.started} UTC, {'running' if self.running else 'stopped'}.\n"
+            f"Lag: p50 {lag['p50'] or 0:.3f}s, p99 {lag['p99'] or 0:.3f}s, "
+            f"max {lag['max'] or 0:.3f}s over {lag['count']} checks.\n"
+        )
+
+        table = Table("Cog", "Blocks", "Total", "p95", "Max", box=rich_box.MINIMAL)
+        histograms = sorted(self.by_cog().items(), key=lambda i: i[1].total, reverse=True)
+        for name, histogram in histograms:
+            if cog is not None and (name or "").lower() != cog.lower():
+                continue
+            table.add_row(
+                name or "(not a cog)",
+                str(histogram.count),
+                f"{histogram.total:.3f}",
+                f"{histogram.percentile(95):.3f}",
+                f"{histogram.max:.3f}",
+            )
+        text += no_colour_rich_markup(table)
+
+        longest = sorted(self.query(cog), key=lambda e: e.duration, reverse=True)[:stacks]
+        for event in longest:
+            text += (
+                f"\n{event.duration:.3f}s at {event.when:%Y-%m-%d %H:%M:%S} in {event.task}\n"
+                + event.format_stack()
+            )
+        return text
+
+
+_watchdog: Optional[LoopWatchdog] = None
+
+
+def get_watchdog(bot: Red) -> LoopWatchdog:
+    """Get the watchdog, using the same one as other loaded copies of vexutils if they have
+    one."""
+    global _watchdog
+    if _watchdog is not None:
+        return _watchdog
+
+    for name, module in list(sys.modules.items()):
+        if not name.endswith(".vexutils.watchdog"):
+            continue
+        other = getattr(module, "_watchdog", None)
+        if getattr(other, "format", None) == WATCHDOG_FORMAT:
+            _watchdog = other
+            return other
+
+    _watchdog = LoopWatchdog(bot)
+    return _watchdog
+
+
+@commands.group(name="vexwatchdog", hidden=True, invoke_without_command=True)
+@commands.is_owner()
+async def vexwatchdog(ctx: commands.Context, cog: Optional[str] = None, stacks: int = 1):
+    """
+    See what's been blocking the event loop.
+
+    This is shared by all of Vex's cogs. It needs starting first, with `[p]vexwatchdog start`.
+
+    **Examples:**
+    - `[p]vexwatchdog` - everything, with the stack of the longest block
+    - `[p]vexwatchdog StatTrack 3` - only blocks in StatTrack, with the 3 longest stacks
+    """
+    report = get_watchdog(ctx.bot).report(cog, stacks).replace("[p]", ctx.clean_prefix)
+    await ctx.send_interactive(pagify(report, page_length=1900), box_lang="")
+
+
+@vexwatchdog.command(name="start")
+async def vexwatchdog_start(ctx: commands.Context):
+    """Start watching the event loop."""
+    get_watchdog(ctx.bot).start()
+    await ctx.send("The watchdog is running.")
+
+
+@vexwatchdog.command(name="stop")
+async def vexwatchdog_stop(ctx: commands.Context):
+    """Stop watching the event loop, keeping what's been recorded."""
+    get_watchdog(ctx.bot).stop()
+    await ctx.send("The watchdog has stopped.")
+
+
+@vexwatchdog.command(name="clear")
+async def vexwatchdog_clear(ctx: commands.Context):
+    """Forget everything recorded so far."""
+    get_watchdog(ctx.bot).clear()
+    await ctx.send("Cleared.")
+
+
+def _add_command(bot: Red) -> None:
+    if bot.get_command("vexwatchdog") is None:
+        bot.add_command(vexwatchdog)
+
+
+def add_watchdog_tools(bot: Red, cog_name: str) -> None:
+    """Add the ``vexwatchdog`` command and dev env value, if another cog hasn't already, and
+    record the cog as using the watchdog. Call `remove_watchdog_tools` when the cog unloads."""
+    get_watchdog(bot).users.add(cog_name)
+    _add_command(bot)
+    try:
+        bot.add_dev_env_value("vexwatchdog", lambda _: get_watchdog(bot))
+    except RuntimeError:
+        pass
+
+
+def remove_watchdog_tools(bot: Red, cog_name: str) -> None:
+    """Record the cog as no longer using the watchdog. Once no cogs are, the watchdog is
+    stopped and the command and dev env value are removed."""
+    watchdog = get_watchdog(bot)
+    watchdog.users.discard(cog_name)
+
+    if watchdog.users:
+        # commands are removed with the package they're from, so if it's this copy's command
+        # it needs to be swapped for another copy's
+        if bot.get_command("vexwatchdog") is vexwatchdog:
+            bot.remove_command("vexwatchdog")
+            for name, module in list(sys.modules.items()):
+                if name.endswith(".vexutils.watchdog") and name != __name__:
+                    if getattr(module, "WATCHDOG_FORMAT", None) == WATCHDOG_FORMAT:
+                        module._add_command(bot)
+                        break
+        return
+
+    watchdog.stop()
+    if bot.get_command("vexwatchdog") is not None:
+        bot.remove_command("vexwatchdog")
+    try:
+        bot.remove_dev_env_value("vexwatchdog")
+    except KeyError:
+        pass
@@ -8,6 +8,7 @@ from redbot.core import Config, commands
 from redbot.core.bot import Red
 
 from .vexutils import format_help, format_info, get_vex_logger
+from .vexutils.watchdog import add_watchdog_tools, remove_watchdog_tools
 from .view import CalcView, preprocess_expression
 
 log = get_vex_logger(__name__)
@@ -31,6 +32,12 @@ class Calc(commands.Cog):
         default_guild = {"auto_calc": False}
         self.config.register_guild(**default_guild)
 
+        # auto calc runs on every message, so useful to see if it's slowing the bot down
+        add_watchdog_tools(bot, "Calc")
+
+    async def cog_unload(self) -> None:
+        remove_watchdog_tools(self.bot, "Calc")
+
     def format_help_for_context(self, ctx: commands.Context) -> str:
         """Thanks Sinbad."""
         return format_help(self, ctx)
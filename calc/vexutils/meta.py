@@ -2,13 +2,17 @@ from __future__ import annotations
 
 import asyncio
 import json
+import os
+import sys
+import time
 from logging import Logger, getLogger
 from pathlib import Path
-from typing import Literal, NamedTuple
+from typing import Any, Callable, Literal, NamedTuple
 
 import aiohttp
 from redbot.core import VersionInfo, commands
 from redbot.core import version_info as cur_red_version
+from redbot.core.data_manager import core_data_path
 from rich import box as rich_box
 from rich.table import Table  # type:ignore
 
@@ -18,8 +22,16 @@ from .loop import VexLoop
 
 log = getLogger("red.vex-utils")
 
+VERSION_CACHE_TTL = 6 * 60 * 60  # seconds before checking for new versions again
+VERSION_RETRY_AFTER = 5 * 60  # seconds before trying again after a failed check
+VERSION_CACHE_FORMAT = 2  # change this if VersionCache's data or methods change
 
-cog_ver_lock = asyncio.Lock()
+VEX_VERSIONS_URL = "https://api.vexcodes.com/v2/vers/{cogname}"
+# the response has the versions of every cog and the utils, so it's cached once for all of them
+VEX_VERSIONS_KEY = "vexcodes-versions"
+
+# references to the out of date checks, so they aren't garbage collected while running
+_background_checks: set[asyncio.Task] = set()
 
 
 def get_vex_logger(name: str) -> Logger:
@@ -183,10 +195,18 @@ async def format_info(
 
 
 async def out_of_date_check(cogname: str, currentver: str) -> None:
-    """Send a log at warning level if the cog is out of date."""
+    """Send a log at warning level if the cog is out of date.
+
+    This runs in the background, so it doesn't hold up loading the cog.
+    """
+    task = asyncio.create_task(_out_of_date_check(cogname, currentver))
+    _background_checks.add(task)
+    task.add_done_callback(_background_checks.discard)
+
+
+async def _out_of_date_check(cogname: str, currentver: str) -> None:
     try:
-        async with cog_ver_lock:
-            vers = await _get_latest_vers(cogname)
+        vers = await _get_latest_vers(cogname)
         if VersionInfo.from_str(currentver) < vers.cog:
             log.warning(
                 f"Your {cogname} cog, from Vex, is out of date. You can update your cogs with the "
@@ -216,16 +236,163 @@ class UnknownVers(NamedTuple):
     red: VersionInfo | Literal["Unknown"] = "Unknown"
 
 
+class VersionCache:
+    """Responses from the version APIs, shared by every loaded copy of vexutils (each cog has
+    its own) and saved to disk so they survive a restart.
+
+    A URL is only fetched again once its response is older than ``VERSION_CACHE_TTL``, and
+    lookups for the same URL at the same time all wait on one request. If a request fails the
+    last response is used, however old, and the URL isn't tried again for
+    ``VERSION_RETRY_AFTER`` so an offline bot doesn't wait on a timeout every time.
+    """
+
+    format = VERSION_CACHE_FORMAT
+
+    def __init__(self, path: Path | None) -> None:
+        self.path = path
+        self._entries: dict[str, tuple[float, Any]] = {}  # url: (time fetched, response)
+        self._failed: dict[str, float] = {}  # url: time of last failure
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._loaded = False
+
+    def _load(self) -> None:
+        self._loaded = True
+        if self.path is None:
+            return
+        try:
+            with open(self.path) as fp:
+                data = json.load(fp)
+            if data.get("format") == VERSION_CACHE_FORMAT:
+                self._entries = {url: tuple(entry) for url, entry in data["entries"].items()}
+        except FileNotFoundError:
+            pass
+        except Exception:  # corrupt, it'll be replaced on the next fetch
+            log.debug("Unable to read the version cache.", exc_info=True)
+
+    def _save(self, raw: str) -> None:
+        assert self.path is not None
+        tmp = self.path.with_suffix(".tmp")
+        try:
+            with open(tmp, "w") as fp:
+                fp.write(raw)
+            os.replace(tmp, self.path)
+        except OSError:
+            log.debug("Unable to save the version cache.", exc_info=True)
+
+    async def get(
+        self, url: str, transform: Callable[[Any], Any] | None = None, *, key: str | None = None
+    ) -> Any:
+        """Get the JSON response from ``url``, from the cache if it's fresh enough.
+
+        ``transform`` is applied to the response before it's cached, for example to only keep
+        the parts needed. It should always be the same for a given URL.
+
+        ``key`` is what the response is cached as, by default the URL. Responses from
+        different URLs can share a key if any of them will do.
+
+        Raises
+        ------
+        Exception
+            If the request failed and there's no cached response to fall back on.
+        """
+        if not self._loaded:
+            self._load()
+        key = key or url
+
+        now = time.time()
+        cached = self._entries.get(key)
+        if cached is not None and now - cached[0] < VERSION_CACHE_TTL:
+            return cached[1]
+        if now - self._failed.get(key, 0.0) < VERSION_RETRY_AFTER:
+            if cached is None:
+                raise RuntimeError(f"Unable to reach {url} recently, not trying again yet.")
+            return cached[1]
+
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(url, key, transform))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda f: self._done(key, f))
+        # one waiter being cancelled shouldn't cancel the request for everyone else
+        return await asyncio.shield(future)
+
+    def _done(self, key: str, future: asyncio.Future) -> None:
+        self._in_flight.pop(key, None)
+        if not future.cancelled():
+            future.exception()  # mark as retrieved, in case everyone waiting was cancelled
+
+    async def _fetch(self, url: str, key: str, transform: Callable[[Any], Any] | None) -> Any:
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=3)) as r:
+                    r.raise_for_status()
+                    data = await r.json()
+            if transform is not None:
+                data = transform(data)
+        except Exception:
+            self._failed[key] = time.time()
+            cached = self._entries.get(key)
+            if cached is None:
+                raise
+            log.debug("Unable to check %s, using the cached response.", url, exc_info=True)
+            return cached[1]
+
+        self._entries[key] = (time.time(), data)
+        self._failed.pop(key, None)
+        if self.path is not None:
+            raw = json.dumps({"format": VERSION_CACHE_FORMAT, "entries": self._entries})
+            await asyncio.get_running_loop().run_in_executor(None, self._save, raw)
+        return data
+
+
+_version_cache: VersionCache | None = None
+
+
+def _get_version_cache() -> VersionCache:
+    """Get the version cache, using the same one as other loaded copies of vexutils if they
+    have one."""
+    global _version_cache
+    if _version_cache is not None:
+        return _version_cache
+
+    for name, module in list(sys.modules.items()):
+        if not name.endswith(".vexutils.meta"):
+            continue
+        other = getattr(module, "_version_cache", None)
+        if getattr(other, "format", None) == VERSION_CACHE_FORMAT:
+            _version_cache = other
+            return other
+
+    try:
+        # in the core data folder, as it's for every Vex cog and VexUtils isn't a cog itself
+        path: Path | None = core_data_path() / "vexutils_version_cache.json"
+    except Exception:  # data manager not set up, so just keep it in memory
+        path = None
+    _version_cache = VersionCache(path)
+    return _version_cache
+
+
+async def _get_vex_versions(cache: VersionCache, cogname: str) -> dict[str, str]:
+    # any cog's URL gives every cog's version, so only the first cog to check fetches
+    data = await cache.get(VEX_VERSIONS_URL.format(cogname=cogname), key=VEX_VERSIONS_KEY)
+    if cogname not in data:  # eg a new cog, released since this was cached
+        data = await cache.get(VEX_VERSIONS_URL.format(cogname=cogname))
+    return data
+
+
 async def _get_latest_vers(cogname: str) -> Vers:
-    data: dict
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"https://api.vexcodes.com/v2/vers/{cogname}", timeout=3) as r:
-            data = await r.json()
-            latest_utils = data["utils"][:7]
-            latest_cog = VersionInfo.from_str(data.get(cogname, "0.0.0"))
-        async with session.get("https://pypi.org/pypi/Red-DiscordBot/json", timeout=3) as r:
-            data = await r.json()
-            latest_red = VersionInfo.from_str(data.get("info", {}).get("version", "0.0.0"))
+    cache = _get_version_cache()
+    vex_data, pypi_data = await asyncio.gather(
+        _get_vex_versions(cache, cogname),
+        # the full response has every release, only the latest version is needed
+        cache.get(
+            "https://pypi.org/pypi/Red-DiscordBot/json",
+            lambda data: {"info": {"version": data.get("info", {}).get("version", "0.0.0")}},
+        ),
+    )
+    latest_utils = vex_data["utils"][:7]
+    latest_cog = VersionInfo.from_str(vex_data.get(cogname, "0.0.0"))
+    latest_red = VersionInfo.from_str(pypi_data.get("info", {}).get("version", "0.0.0"))
 
     return Vers(cogname, latest_cog, latest_utils, latest_red)
 
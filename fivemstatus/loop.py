@@ -1,40 +1,26 @@
-import asyncio
-from typing import Literal, NoReturn
+from typing import Literal
 
 import discord
 
 from .abc import MixinMeta
 from .objects import MessageData, ServerUnreachable
 from .vexutils import get_vex_logger
-from .vexutils.loop import VexLoop
+from .vexutils.loop import VexLoop, get_runner
 
 _log = get_vex_logger(__name__)
 
 
 class FiveMLoop(MixinMeta):
     def __init__(self) -> None:
-        self.loop_meta = VexLoop("FiveMStatus Loop", 60)  # 1 min
-        self.loop = self.bot.loop.create_task(self.fivemstatus_loop())
-
-    async def fivemstatus_loop(self) -> NoReturn:
-        await self.bot.wait_until_red_ready()
-        await asyncio.sleep(1)
-        while True:
-            try:
-                _log.verbose("FiveMStatus l oop has started.")
-                self.loop_meta.iter_start()
-                await self.update_messages()
-                self.loop_meta.iter_finish()
+        self.loop_meta = VexLoop("FiveMStatus Loop", 60, jitter=30.0)  # 1 min
+        self.loop = get_runner().register(
+            self.loop_meta, self.fivemstatus_iteration, wait_for=self.bot.wait_until_red_ready
+        )
 
-                _log.verbose("FiveMStatus iteration finished")
-            except Exception as e:
-                self.loop_meta.iter_error(e)
-                _log.exception(
-                    "Something went wrong in the FiveMStatus loop. Some channels may have been "
-                    "missed. The loop will run again at the next hour.",
-                    exc_info=e,
-                )
-            await self.loop_meta.sleep_until_next()
+    async def fivemstatus_iteration(self) -> None:
+        _log.verbose("FiveMStatus loop has started.")
+        await self.update_messages()
+        _log.verbose("FiveMStatus iteration finished")
 
     async def update_messages(self) -> None:
         all_guilds: dict[int, dict[Literal["message"], MessageData]] = (
@@ -13,6 +13,7 @@ from .errors import NoData
 from .plot import TrendsPlot
 from .vexutils import kaleido_setup, url_buttons
 from .vexutils.meta import format_help, format_info
+from .vexutils.render import add_render_pool_user, get_render_pool, release_render_pool
 
 
 class GoogleTrends(commands.Cog, TrendsPlot, metaclass=CompositeMetaClass):
@@ -27,9 +28,11 @@ class GoogleTrends(commands.Cog, TrendsPlot, metaclass=CompositeMetaClass):
     __author__ = "@vexingvexed"
 
     def __init__(self, bot):
+        super().__init__()
         self.bot = bot
 
         self.plot_backend_ready = False
+        add_render_pool_user("GoogleTrends")
 
         self.bot.loop.create_task(self.kaleido_check())
 
@@ -46,6 +49,7 @@ class GoogleTrends(commands.Cog, TrendsPlot, metaclass=CompositeMetaClass):
 
     async def cog_unload(self) -> None:
         self.executor.shutdown(wait=False)
+        await release_render_pool("GoogleTrends")
 
     @commands.command(hidden=True)
     async def trendsinfo(self, ctx: commands.Context):
@@ -54,7 +58,10 @@ class GoogleTrends(commands.Cog, TrendsPlot, metaclass=CompositeMetaClass):
                 ctx,
                 self.qualified_name,
                 self.__version__,
-                extras={"Plot backend ready": str(self.plot_backend_ready)},
+                extras={
+                    "Plot backend ready": str(self.plot_backend_ready),
+                    "Render pool": get_render_pool().summary(),
+                },
             )
         )
 
@@ -13,6 +13,7 @@ from pytrends.request import TrendReq
 from googletrends.errors import NoData
 
 from .abc import MixinMeta
+from .vexutils.render import PRIORITY_HIGH, get_render_pool
 
 if TYPE_CHECKING:
     from plotly.graph_objs._figure import Figure
@@ -55,10 +56,12 @@ class TrendsPlot(MixinMeta):
         """Get a graph of the trends."""
         func = functools.partial(self._plot_graph, trend=trend, timeframe=timeframe, geo=geo)
 
-        return await self.bot.loop.run_in_executor(self.executor, func)
+        figure = await self.bot.loop.run_in_executor(self.executor, func)
+        image = await get_render_pool().render(figure, priority=PRIORITY_HIGH)
+        return discord.File(io.BytesIO(image), filename="plot.png")
 
-    def _plot_graph(self, trend: TrendReq, timeframe: str, geo: str) -> discord.File:
-        """Blocking"""
+    def _plot_graph(self, trend: TrendReq, timeframe: str, geo: str) -> dict:
+        """Blocking. Returns the figure's dict, ready for rendering."""
         df = trend.interest_over_time()
         assert isinstance(df, pandas.DataFrame)
 
@@ -87,9 +90,4 @@ class TrendsPlot(MixinMeta):
             },
         )
         fig.update_yaxes(rangemode="tozero")
-        bytes = fig.to_image(format="png", width=800, height=500, scale=1)
-        buffer = io.BytesIO(bytes)
-        buffer.seek(0)
-        file = discord.File(buffer, filename="plot.png")
-        buffer.close()
-        return file
+        return fig.to_dict()
@@ -1,30 +1,140 @@
 import asyncio
+import contextlib
 import datetime
+import math
+import random
+import sys
+import time
 import traceback
-from typing import Optional
+import weakref
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Literal, Optional, Set
 
 import discord
+from redbot.core.bot import Red
 from redbot.core.utils.chat_formatting import box, pagify
 from rich.table import Table  # type:ignore
 
 from .chat import no_colour_rich_markup
 from .consts import CHECK, CROSS
 
+log = getLogger("red.vex-utils")
+
+# what to do when an iteration takes longer than the interval:
+# skip: carry on from the next tick that's still in the future, dropping the ones missed
+# queue: run the missed ticks straight away, one after the other, until caught up
+OverrunPolicy = Literal["skip", "queue"]
+
+RUNNER_FORMAT = 2  # change this if VexLoopRunner's data or methods change
+
+# every VexLoop from this copy of vexutils, for loop_stats
+_loops: "weakref.WeakSet[VexLoop]" = weakref.WeakSet()
+
+
+class DurationHistogram:
+    """
+    Durations in seconds, counted into a fixed set of buckets so memory use doesn't grow.
+
+    Buckets are spaced logarithmically, four per doubling from 1ms up to about an hour, so a
+    percentile is accurate to within about 19%. Count, total and max are exact.
+    """
+
+    MIN = 0.001
+    PER_DOUBLING = 4
+    SIZE = 90  # the last bucket is everything over ~1 hour
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * self.SIZE
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"<DurationHistogram count={self.count} p50={self.percentile(50)} "
+            f"p95={self.percentile(95)} max={self.max}>"
+        )
+
+    def record(self, seconds: float) -> None:
+        """Add a duration."""
+        if seconds <= self.MIN:
+            bucket = 0
+        else:
+            bucket = min(
+                math.ceil(math.log2(seconds / self.MIN) * self.PER_DOUBLING), self.SIZE - 1
+            )
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pc: float) -> Optional[float]:
+        """The duration ``pc`` percent of durations were at or under, or None if empty. This
+        is the top of the bucket it falls in, but never more than the max."""
+        if not self.count:
+            return None
+        target = max(math.ceil(pc / 100 * self.count), 1)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self.MIN * 2 ** (bucket / self.PER_DOUBLING), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        """Count, total, mean, p50, p95, p99 and max, in seconds."""
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max if self.count else None,
+        }
+
 
 class VexLoop:
     """
-    A class with some utilities for logging the state of a loop.
+    A class with some utilities for logging the state of a loop, and scheduling it.
+
+    Ticks are kept on the monotonic clock, each one exactly ``expected_interval`` after the
+    last, so slow iterations don't make the loop drift. With ``align``, ticks fall on multiples
+    of the interval in wall clock time (eg on the minute) plus a random offset of up to
+    ``jitter`` seconds, which is picked once so different cogs don't all wake at once.
 
     Note iter_count increases at the start of an iteration.
 
-    This does not log anything itself.
+    How long each iteration takes is recorded in ``durations``, and parts of an iteration can
+    be timed with `span`. See `stats` for all of it at once.
+
+    This does not log anything itself. Use `VexLoopRunner` to have it run a coroutine, or call
+    `iter_start`, `iter_finish`/`iter_error` and `sleep_until_next` in your own loop.
     """
 
-    def __init__(self, friendly_name: str, expected_interval: float) -> None:
+    def __init__(
+        self,
+        friendly_name: str,
+        expected_interval: float,
+        *,
+        jitter: float = 0.0,
+        overrun: OverrunPolicy = "skip",
+        align: bool = True,
+    ) -> None:
+        if overrun not in ("skip", "queue"):
+            raise ValueError("overrun must be 'skip' or 'queue'")
         self.friendly_name = friendly_name
         self.expected_interval = datetime.timedelta(seconds=expected_interval)
+        self.overrun: OverrunPolicy = overrun
+        self.align = align
+        self.jitter = jitter
+        self.offset = random.uniform(0.0, min(jitter, expected_interval)) if jitter else 0.0
 
         self.iter_count: int = 0
+        self.error_count: int = 0
+        self.overrun_count: int = 0  # iterations which finished after the next tick
+        self.skipped_count: int = 0  # ticks dropped by the skip policy
         self.currently_running: bool = False  # whether the loop is running or sleeping
         self.last_exc: str = "No exception has occurred yet."
         self.last_exc_raw: Optional[BaseException] = None
@@ -32,6 +142,14 @@ class VexLoop:
         self.last_iter: Optional[datetime.datetime] = None
         self.next_iter: Optional[datetime.datetime] = None
 
+        self.durations = DurationHistogram()
+        self.spans: Dict[str, DurationHistogram] = {}
+
+        self._deadline: Optional[float] = None  # monotonic time of the next tick
+        self._started: Optional[float] = None  # monotonic time the current iteration started
+
+        _loops.add(self)
+
     def __repr__(self) -> str:
         return (
             f"<friendly_name={self.friendly_name} iter_count={self.iter_count} "
@@ -39,14 +157,29 @@ class VexLoop:
             f"next_iter={self.next_iter} integrity={self.integrity}>"
         )
 
+    @property
+    def _interval(self) -> float:
+        return self.expected_interval.total_seconds()
+
+    def _set_deadline(self, deadline: float) -> None:
+        self._deadline = deadline
+        self.next_iter = datetime.datetime.utcnow() + datetime.timedelta(
+            seconds=deadline - time.monotonic()
+        )
+
     @property
     def integrity(self) -> bool:
         """
         If the loop is running on time (whether or not next expected iteration is in the future)
         """
-        if self.next_iter is None:  # not started yet
+        if self._deadline is None:  # not started yet
             return False
-        return self.next_iter > datetime.datetime.utcnow()
+        return self._deadline > time.monotonic()
+
+    @property
+    def error_rate(self) -> float:
+        """The fraction of iterations which raised an exception."""
+        return self.error_count / self.iter_count if self.iter_count else 0.0
 
     @property
     def until_next(self) -> float:
@@ -56,17 +189,27 @@ class VexLoop:
 
         If the expected time of the next iteration is in the past, this will return `0.0`
         """
-        if self.next_iter is None:  # not started yet
+        if self._deadline is None:  # not started yet
             return 0.0
 
-        raw_until_next = (self.next_iter - datetime.datetime.utcnow()).total_seconds()
-        if raw_until_next > self.expected_interval.total_seconds():  # should never happen
-            return self.expected_interval.total_seconds()
+        raw_until_next = self._deadline - time.monotonic()
+        if raw_until_next > self._interval:  # should never happen
+            return self._interval
         elif raw_until_next > 0.0:
             return raw_until_next
         else:
             return 0.0
 
+    def until_first(self) -> float:
+        """Seconds until the first tick should be, from now.
+
+        With ``align`` this is the next multiple of the interval in wall clock time, plus the
+        offset. Otherwise it's just the offset.
+        """
+        if not self.align:
+            return self.offset
+        return (self.offset - time.time()) % self._interval
+
     async def sleep_until_next(self) -> None:
         """Sleep until the next iteration. Basically an "all-in-one" version of `until_next`."""
         await asyncio.sleep(self.until_next)
@@ -76,22 +219,86 @@ class VexLoop:
         self.iter_count += 1
         self.currently_running = True
         self.last_iter = datetime.datetime.utcnow()
-        self.next_iter = datetime.datetime.utcnow() + self.expected_interval
-        # this isn't accurate, it will be "corrected" when finishing is called
+
+        now = time.monotonic()
+        self._started = now
+        # carry on from the tick this iteration was due at, so lateness doesn't add up. if this
+        # is the first iteration or it was started early, the schedule starts from now instead
+        if self._deadline is None or self._deadline > now:
+            tick = now
+        else:
+            tick = self._deadline
+        self._set_deadline(tick + self._interval)
+
+    def _iter_end(self) -> None:
+        self.currently_running = False
+        now = time.monotonic()
+        if self._started is not None:
+            self.durations.record(now - self._started)
+            self._started = None
+        if self._deadline is None:
+            return
+        late = now - self._deadline
+        if late <= 0:
+            return
+        self.overrun_count += 1
+        if self.overrun == "skip":
+            missed = math.ceil(late / self._interval)
+            self.skipped_count += missed
+            self._set_deadline(self._deadline + missed * self._interval)
 
     def iter_finish(self) -> None:
         """Register an iteration as finished successfully."""
-        self.currently_running = False
-        # now this is accurate. imo its better to have something than nothing
+        self._iter_end()
 
     def iter_error(self, error: BaseException) -> None:
         """Register an iteration's exception."""
-        self.currently_running = False
+        self._iter_end()
+        self.error_count += 1
         self.last_exc_raw = error
         self.last_exc = "".join(
             traceback.format_exception(type(error), error, error.__traceback__)
         )
 
+    @contextlib.contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time part of an iteration, recording it under ``name``.
+
+        This is wall time, so it includes any time spent awaiting other things.
+
+        Example
+        -------
+        .. code-block:: python
+
+            with self.loop_meta.span("db"):
+                await self.driver.append(df)
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            histogram = self.spans.get(name)
+            if histogram is None:
+                histogram = self.spans[name] = DurationHistogram()
+            histogram.record(time.monotonic() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        """Everything recorded about this loop, as plain types.
+
+        Durations are in seconds, with the keys from `DurationHistogram.to_dict`.
+        """
+        return {
+            "name": self.friendly_name,
+            "interval": self._interval,
+            "iterations": self.iter_count,
+            "errors": self.error_count,
+            "error_rate": self.error_rate,
+            "overruns": self.overrun_count,
+            "skipped": self.skipped_count,
+            "duration": self.durations.to_dict(),
+            "spans": {name: histogram.to_dict() for name, histogram in self.spans.items()},
+        }
+
     def get_debug_embed(self) -> discord.Embed:
         """Get an embed with infomation on this loop."""
         table = Table("Key", "Value")
@@ -101,6 +308,8 @@ class VexLoop:
         table.add_row("currently_running", str(self.currently_running))
         table.add_row("last_iterstr", str(self.last_iter) or "Loop not started")
         table.add_row("next_iterstr", str(self.next_iter) or "Loop not started")
+        table.add_row("offset", f"{self.offset:.2f}s (jitter {self.jitter}s)")
+        table.add_row("overrun", f"{self.overrun_count} ({self.overrun}, {self.skipped_count})")
 
         raw_table_str = no_colour_rich_markup(table)
 
@@ -108,13 +317,35 @@ class VexLoop:
 
         if self.next_iter and self.last_iter:
             table = Table("Key", "Value")
-            table.add_row("Seconds until next", str((self.next_iter - now).total_seconds()))
+            table.add_row("Seconds until next", str(self.until_next))
             table.add_row("Seconds since last", str((now - self.last_iter).total_seconds()))
             processed_table_str = no_colour_rich_markup(table)
 
         else:
             processed_table_str = "Loop hasn't started yet."
 
+        if self.durations.count:
+            table = Table("Name", "Count", "p50", "p95", "p99", "Max")
+            rows = [("iteration", self.durations)] + list(self.spans.items())
+            for name, histogram in rows:
+                table.add_row(
+                    name,
+                    str(histogram.count),
+                    *(
+                        f"{value:.3f}"
+                        for value in (
+                            histogram.percentile(50),
+                            histogram.percentile(95),
+                            histogram.percentile(99),
+                            histogram.max,
+                        )
+                    ),
+                )
+            timings_str = no_colour_rich_markup(table)
+            timings_str += f"\nErrors: {self.error_count} ({self.error_rate:.1%})"
+        else:
+            timings_str = "No iterations have finished yet."
+
         emoji = CHECK if self.integrity else CROSS
         embed = discord.Embed(title=f"{self.friendly_name}: `{emoji}`")
         embed.add_field(name="Raw data", value=raw_table_str, inline=False)
@@ -123,9 +354,193 @@ class VexLoop:
             value=processed_table_str,
             inline=False,
         )
+        embed.add_field(name="Timings (seconds)", value=timings_str[:1024], inline=False)
         exc = self.last_exc
         if len(exc) > 1024:
             exc = list(pagify(exc, page_length=1024))[0] + "\n..."
         embed.add_field(name="Exception", value=box(exc), inline=False)
 
         return embed
+
+
+class VexLoopRunner:
+    """
+    Runs coroutines on the schedule of a `VexLoop`, so cogs don't each need their own
+    ``while True`` loop.
+
+    Each registered loop gets its own task, so a slow iteration in one never delays another,
+    and a loop never runs over itself: if an iteration is still going when the next tick is due,
+    the loop's overrun policy decides what happens once it finishes. Exceptions are logged and
+    recorded on the `VexLoop`, and the loop carries on at the next tick.
+
+    One runner is shared by every cog (see `get_runner`), so it can see all their loops. Loops
+    with jitter have their offset picked to be as far as possible from the other loops with
+    the same interval, instead of at random, so they're spread out.
+    """
+
+    format = RUNNER_FORMAT
+
+    def __init__(self) -> None:
+        self._tasks: Dict[VexLoop, asyncio.Task] = {}
+        self.users: Set[str] = set()  # cogs using vexloops, see add_loop_stats_dev_value
+
+    @property
+    def loops(self) -> List[VexLoop]:
+        """The loops currently registered."""
+        return list(self._tasks)
+
+    def register(
+        self,
+        loop_meta: VexLoop,
+        func: Callable[[], Awaitable[Any]],
+        *,
+        wait_for: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> asyncio.Task:
+        """Start running ``func`` on the loop's schedule.
+
+        Parameters
+        ----------
+        loop_meta : VexLoop
+            The loop, which decides the schedule and records each iteration
+        func : Callable[[], Awaitable[Any]]
+            The coroutine function to run each iteration
+        wait_for : Callable[[], Awaitable[Any]], optional
+            Awaited before the first tick, for example ``bot.wait_until_red_ready``
+
+        Returns
+        -------
+        asyncio.Task
+            The task running the loop. Cancelling it is the same as `unregister`.
+        """
+        if loop_meta in self._tasks:
+            raise ValueError(f"{loop_meta.friendly_name} is already registered")
+        if loop_meta.jitter:
+            loop_meta.offset = self._spread_offset(loop_meta)
+        task = asyncio.create_task(self._run(loop_meta, func, wait_for))
+        self._tasks[loop_meta] = task
+        task.add_done_callback(lambda _: self._forget(loop_meta, task))
+        return task
+
+    def unregister(self, loop_meta: VexLoop) -> None:
+        """Stop running a loop. Does nothing if it's not registered."""
+        task = self._tasks.pop(loop_meta, None)
+        if task is not None:
+            task.cancel()
+
+    def _spread_offset(self, loop_meta: VexLoop, candidates: int = 64) -> float:
+        """The offset within the loop's jitter furthest from those of the registered loops with
+        the same interval."""
+        interval = loop_meta._interval
+        others = [other.offset % interval for other in self._tasks if other._interval == interval]
+        if not others:
+            return loop_meta.offset
+
+        def distance(offset: float) -> float:
+            return min(min(abs(offset - o), interval - abs(offset - o)) for o in others)
+
+        window = min(loop_meta.jitter, interval)
+        return max((window * i / candidates for i in range(candidates)), key=distance)
+
+    def _forget(self, loop_meta: VexLoop, task: asyncio.Task) -> None:
+        if self._tasks.get(loop_meta) is task:
+            del self._tasks[loop_meta]
+
+    async def _run(
+        self,
+        loop_meta: VexLoop,
+        func: Callable[[], Awaitable[Any]],
+        wait_for: Optional[Callable[[], Awaitable[Any]]],
+    ) -> None:
+        if wait_for is not None:
+            await wait_for()
+        await asyncio.sleep(loop_meta.until_first())
+
+        while True:
+            log.debug("%s has started next iteration", loop_meta.friendly_name)
+            try:
+                loop_meta.iter_start()
+                await func()
+                loop_meta.iter_finish()
+            except asyncio.CancelledError:
+                loop_meta.currently_running = False
+                raise
+            except Exception as e:
+                loop_meta.iter_error(e)
+                log.exception(
+                    "Something went wrong in the %s. The loop will try again at the next tick.",
+                    loop_meta.friendly_name,
+                    exc_info=e,
+                )
+
+            await loop_meta.sleep_until_next()
+
+
+_runner: Optional[VexLoopRunner] = None
+
+
+def get_runner() -> VexLoopRunner:
+    """Get the loop runner, using the same one as other loaded copies of vexutils if they have
+    one."""
+    global _runner
+    if _runner is not None:
+        return _runner
+
+    for name, module in list(sys.modules.items()):
+        if not name.endswith(".vexutils.loop"):
+            continue
+        other = getattr(module, "_runner", None)
+        if getattr(other, "format", None) == RUNNER_FORMAT:
+            _runner = other
+            return other
+
+    _runner = VexLoopRunner()
+    return _runner
+
+
+def loop_stats() -> List[Dict[str, Any]]:
+    """`VexLoop.stats` for every loop made with this copy of vexutils."""
+    return [loop.stats() for loop in list(_loops)]
+
+
+def all_loop_stats() -> List[Dict[str, Any]]:
+    """`VexLoop.stats` for every loop in every loaded copy of vexutils (each cog has its own),
+    with those that have spent the most time running first."""
+    stats = []
+    for name, module in list(sys.modules.items()):
+        if name.endswith(".vexutils.loop") or name == "vexutils.loop":
+            stats.extend(getattr(module, "loop_stats", list)())
+    return sorted(stats, key=lambda s: s["duration"]["total"], reverse=True)
+
+
+def _add_dev_value(bot: Red) -> None:
+    try:
+        bot.add_dev_env_value("vexloops", lambda _: all_loop_stats())
+    except RuntimeError:  # another cog has already added it, which will show the same thing
+        pass
+
+
+def add_loop_stats_dev_value(bot: Red, cog_name: str) -> None:
+    """Add ``vexloops`` to the dev environment, for `all_loop_stats`, and record the cog as
+    using it. Call `remove_loop_stats_dev_value` when the cog unloads."""
+    get_runner().users.add(cog_name)
+    _add_dev_value(bot)
+
+
+def remove_loop_stats_dev_value(bot: Red, cog_name: str) -> None:
+    """Record the cog as no longer using ``vexloops``. It's removed from the dev environment,
+    and added again from another loaded copy of vexutils if other cogs still use it, so it
+    never refers to an unloaded one."""
+    runner = get_runner()
+    runner.users.discard(cog_name)
+    try:
+        bot.remove_dev_env_value("vexloops")
+    except KeyError:
+        pass
+    if not runner.users:
+        return
+
+    for name, module in list(sys.modules.items()):
+        if name.endswith(".vexutils.loop") and name != __name__:
+            if getattr(module, "RUNNER_FORMAT", None) == RUNNER_FORMAT:
+                module._add_dev_value(bot)
+                return
@@ -3,7 +3,7 @@ from __future__ import annotations
 import asyncio
 from abc import ABC, ABCMeta, abstractmethod
 from concurrent.futures import ThreadPoolExecutor
-from typing import Any
+from typing import Any, Hashable
 
 import discord
 import pandas
@@ -11,7 +11,10 @@ from discord.ext.commands.cog import CogMeta
 from redbot.core.bot import Red
 from redbot.core.config import Config
 
+from .buffer import SampleBuffer
+from .counters import GuildCounter
 from .driver import StatTrackSQLiteDriver
+from .plotcache import PlotCache
 from .vexutils.loop import VexLoop
 
 
@@ -29,7 +32,10 @@ class MixinMeta(ABC):
     config: Config
 
     driver: StatTrackSQLiteDriver
+    counter: GuildCounter
+    buffer: SampleBuffer
     plot_executor: ThreadPoolExecutor
+    plot_cache: PlotCache
 
     loop_meta: VexLoop
     loop: asyncio.Task
@@ -40,8 +46,17 @@ class MixinMeta(ABC):
     cmd_count: int
     msg_count: int
 
+    @abstractmethod
+    async def load_buffer(self) -> None:
+        raise NotImplementedError
+
     @abstractmethod
     async def plot(
-        self, df: pandas.DataFrame, ylabel: str, status_colours: bool
+        self,
+        df: pandas.DataFrame,
+        ylabel: str,
+        status_colours: bool,
+        bands: tuple[pandas.DataFrame, pandas.DataFrame] | None = None,
+        cache_key: Hashable | None = None,
     ) -> discord.File | str:
         raise NotImplementedError
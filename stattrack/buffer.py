@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+
+class SampleBuffer:
+    """A fixed-size, in-memory copy of the most recent minutes of data, so the common short
+    graphs don't need to go to SQLite.
+
+    Each metric is a float64 NumPy array used as a ring buffer, alongside one int32 array of
+    the minutes since the epoch for each row. Rows must be added in time order.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.index = np.zeros(capacity, dtype=np.int32)
+        self.columns: dict[str, np.ndarray] = {}
+        self.start = 0  # position of the oldest row
+        self.size = 0
+
+        # the buffer has every row from this minute onwards, None if not loaded
+        self.complete_from: int | None = None
+
+    def __repr__(self) -> str:
+        return (
+            f"<SampleBuffer size={self.size} capacity={self.capacity} "
+            f"complete_from={self.complete_from} metrics={len(self.columns)}>"
+        )
+
+    def __len__(self) -> int:
+        return self.size
+
+    def load(self, df: pd.DataFrame, complete_from: int) -> None:
+        """Replace the contents of the buffer with ``df``, which should have every row from
+        ``complete_from`` (in minutes since the epoch) onwards."""
+        df = df.iloc[-self.capacity :]
+        size = len(df)
+
+        self.index = np.zeros(self.capacity, dtype=np.int32)
+        self.index[:size] = _to_minutes(df.index)
+        self.columns = {}
+        for col in df.columns:
+            arr = np.full(self.capacity, np.nan)
+            arr[:size] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            self.columns[str(col)] = arr
+        self.start = 0
+        self.size = size
+
+        self.complete_from = complete_from
+        if size == self.capacity:
+            self.complete_from = max(complete_from, int(self.index[0]))
+
+    def append(self, df: pd.DataFrame) -> None:
+        """Add rows to the end of the buffer, overwriting the oldest if it is full."""
+        if self.complete_from is None:  # not loaded yet, we'd have a gap
+            return
+        for col in df.columns:
+            if col not in self.columns:
+                self.columns[str(col)] = np.full(self.capacity, np.nan)
+
+        minutes = _to_minutes(df.index)
+        values = {col: df[col].to_numpy(dtype=np.float64, na_value=np.nan) for col in df.columns}
+        for row, minute in enumerate(minutes):
+            pos = (self.start + self.size) % self.capacity
+            if self.size == self.capacity:
+                self.start = (self.start + 1) % self.capacity
+                self.complete_from = int(self.index[self.start])
+            else:
+                self.size += 1
+            self.index[pos] = minute
+            for col, arr in self.columns.items():
+                arr[pos] = values[col][row] if col in values else np.nan
+
+    @property
+    def last_index(self) -> int | None:
+        """The minute (since the epoch) of the newest row, or None if the buffer isn't loaded
+        or is empty."""
+        if self.complete_from is None or not self.size:
+            return None
+        return int(self.index[(self.start + self.size - 1) % self.capacity])
+
+    def covers(self, start: int) -> bool:
+        """Whether the buffer has all data from ``start`` (minutes since the epoch) onwards."""
+        return self.complete_from is not None and self.size > 0 and self.complete_from <= start
+
+    def read(self, metrics: Iterable[str], start: int) -> pd.DataFrame:
+        """Get the metric(s) from ``start`` (minutes since the epoch) onwards, in the same form
+        as ``StatTrackSQLiteDriver.read_partial``."""
+        order = (np.arange(self.size) + self.start) % self.capacity
+        index = self.index[order]
+        order = order[np.searchsorted(index, start) :]
+
+        data = {}
+        for metric in metrics:
+            arr = self.columns.get(metric)
+            if arr is None:
+                data[metric] = np.full(len(order), np.nan)
+                continue
+            values = arr[order]
+            # keep ints as ints, like they would be from SQLite
+            if not np.isnan(values).any() and np.array_equal(values, np.round(values)):
+                values = values.astype(np.int64)
+            data[metric] = values
+
+        index = pd.DatetimeIndex(self.index[order].astype("datetime64[m]"), name="index")
+        return pd.DataFrame(data, index=index, copy=False)
+
+
+def _to_minutes(index: pd.Index) -> np.ndarray:
+    return pd.DatetimeIndex(index).values.astype("datetime64[m]").astype(np.int64)
@@ -4,7 +4,7 @@ import datetime
 import json
 from io import BytesIO, StringIO
 from time import monotonic
-from typing import Iterable, Optional
+from typing import Iterable, NamedTuple, Optional
 
 import discord
 import pandas as pd
@@ -20,6 +20,8 @@ from stattrack.converters import (
     TimespanConverter,
     UserGraphConverter,
 )
+from stattrack.driver import DownsampledData, to_epoch_minute
+from stattrack.export import FORMATS, ExportTooLarge, pyarrow_available
 
 from .vexutils import get_vex_logger
 
@@ -28,7 +30,105 @@ log = get_vex_logger(__name__)
 DEFAULT_DELTA = datetime.timedelta(days=1)
 
 
+class PlotData(NamedTuple):
+    """The data for a graph, ready to plot."""
+
+    df: pd.DataFrame
+    downsampled: DownsampledData | None
+    bands: tuple[pd.DataFrame, pd.DataFrame] | None  # min and max, if they should be plotted
+    total: float | None
+    points: int  # rows read, before reindexing
+    frequency: int  # minutes per point
+    maxpoints: int
+    mins: float  # minutes in the delta
+    db_time: float
+    processing_time: float
+
+
 class StatTrackCommands(MixinMeta):
+    async def prepare_plot_data(
+        self,
+        metrics: list[str],
+        delta: datetime.timedelta,
+        *,
+        do_average: bool = False,
+        show_total: bool = False,
+    ) -> PlotData:
+        """Read and process the data for a graph, everything in ``all_in_one`` before plotting."""
+        # work out the frequency before reading, so any downsampling can be done by SQLite
+        now = datetime.datetime.utcnow().replace(microsecond=0, second=0)
+        start = max(now - delta, await self.driver.get_first_index())
+
+        delta_max_points = (now - start).total_seconds() / 60
+
+        maxpoints = await self.config.maxpoints()
+        if delta_max_points > 1440 and maxpoints != -1:  # 1 day
+            frequency = int(delta_max_points // maxpoints)
+            if frequency < 1:
+                frequency = 1
+        else:
+            frequency = 1
+        # may be rounded up to fit the hourly/daily rollups
+        frequency = await self.driver.resolve_bucket(delta, frequency)
+
+        db_start = monotonic()
+        if frequency > 1:
+            downsampled = await self.driver.read_downsampled(metrics, delta, frequency)
+            df = downsampled.mean
+        elif self.buffer.covers(to_epoch_minute(start)):
+            downsampled = None
+            df = self.buffer.read(metrics, to_epoch_minute(start))
+        else:
+            downsampled = None
+            df = await self.driver.read_partial(metrics, delta)
+        db_time = monotonic() - db_start
+
+        log.trace("pd df obj: %s", df)
+        points = len(df)
+
+        processing_start = monotonic()
+
+        # index data to desired delta, buckets from SQLite are aligned to the epoch
+        expected_index = pd.date_range(
+            start=pd.Timestamp(start).floor(f"{frequency}min"), end=now, freq=f"{frequency}min"
+        )
+        df = df.reindex(index=expected_index)
+
+        df = pd.DataFrame(df)  # ensure it is a df, sometimes series
+
+        total = None
+        if show_total is True:
+            if downsampled is not None:
+                total = downsampled.sum.sum().values[0]
+            else:
+                total = df.sum().values[0]
+
+        # min/max bands are only useful when each point covers more than one minute
+        bands = None
+        if downsampled is not None and len(df.columns) == 1 and not do_average:
+            bands = (
+                downsampled.min.reindex(index=expected_index),
+                downsampled.max.reindex(index=expected_index),
+            )
+
+        if do_average:
+            df = df.rolling(10, min_periods=1).mean()
+
+        processing_time = monotonic() - processing_start
+
+        return PlotData(
+            df=df,
+            downsampled=downsampled,
+            bands=bands,
+            total=total,
+            points=points,
+            frequency=frequency,
+            maxpoints=maxpoints,
+            mins=delta_max_points,
+            db_time=db_time,
+            processing_time=processing_time,
+        )
+
     async def all_in_one(
         self,
         ctx: commands.Context | discord.Message,
@@ -46,60 +146,46 @@ class StatTrackCommands(MixinMeta):
     ) -> None:
         if ylabel is None:
             ylabel = title
-        db_start = monotonic()
-        df = await self.driver.read_partial([label] if isinstance(label, str) else label, delta)
-        db_time = monotonic() - db_start
+        metrics = [label] if isinstance(label, str) else list(label)
 
-        log.trace("pd df obj: %s", df)
+        data = await self.prepare_plot_data(
+            metrics, delta, do_average=do_average, show_total=show_total
+        )
+        df = data.df
 
-        if len(df) < 2:
+        if data.points < 2:
             await ctx.send("I need a little longer to collect data. Try again in a minute.")
             return
-        if do_average and len(df) < 30:
+        if do_average and data.points < 30:
             await ctx.send(
                 "I need a little longer to collect data for this particular metric. "
                 "Others should still work. Try again in a few minutes."
             )
             return
 
-        processing_start = monotonic()
-
-        # index data to desired delta
-        now = datetime.datetime.utcnow().replace(microsecond=0, second=0)
-        start = now - delta
-        start = max(start, df.first_valid_index())
-
-        delta_max_points = (now - start).total_seconds() / 60
-
-        maxpoints = await self.config.maxpoints()
-        if delta_max_points > 1440 and maxpoints != -1:  # 1 day
-            frequency = int(delta_max_points // maxpoints)
-            if frequency < 1:
-                frequency = 1
-        else:
-            frequency = 1
-        expected_index = pd.date_range(start=start, end=now, freq=f"{frequency}min")
-        df = df.reindex(index=expected_index)
-
-        df = pd.DataFrame(df)  # ensure it is a df, sometimes series
-
-        if show_total is True:
-            total_before_avg = df.sum().values[0]
-
-        if do_average:
-            df = df.rolling(10, min_periods=1).mean()
-
-        processing_time = monotonic() - processing_start
+        # a new sample changes the last index, so cached plots go stale by themselves
+        last_index = self.buffer.last_index
+        if last_index is None:  # not loaded yet
+            last_index = await self.driver.get_last_index()
+        cache_key = (
+            tuple(metrics),
+            delta,
+            do_average,
+            status_colours,
+            ylabel,
+            data.maxpoints,
+            last_index,
+        )
 
         plot_start = monotonic()
         if isinstance(ctx, commands.Context):
             async with ctx.channel.typing():
-                graph = await self.plot(df, ylabel, status_colours)
+                graph = await self.plot(df, ylabel, status_colours, data.bands, cache_key)
             if isinstance(graph, str):
                 await ctx.send(graph)
                 return
         else:  # from select menu so already empherially typing
-            graph = await self.plot(df, ylabel, status_colours)
+            graph = await self.plot(df, ylabel, status_colours, data.bands, cache_key)
             if isinstance(graph, str):
                 await ctx.edit(content=graph)
                 return
@@ -117,11 +203,21 @@ class StatTrackCommands(MixinMeta):
         )
 
         if len(df.columns) == 1:
-            embed.add_field(name="Min", value=df.min().values[0])
-            embed.add_field(name="Max", value=df.max().values[0])
+            embed.add_field(
+                name="Min",
+                value=(data.downsampled.min if data.downsampled is not None else df)
+                .min()
+                .values[0],
+            )
+            embed.add_field(
+                name="Max",
+                value=(data.downsampled.max if data.downsampled is not None else df)
+                .max()
+                .values[0],
+            )
             embed.add_field(name="Average", value=round(df.mean().values[0], 2))  # type:ignore
             if show_total is True:
-                embed.add_field(name="Total", value=total_before_avg)  # type:ignore
+                embed.add_field(name="Total", value=data.total)
 
         if more_options and isinstance(ctx, commands.Context):
             embed.description = (
@@ -138,7 +234,7 @@ class StatTrackCommands(MixinMeta):
             author=author or ctx.author,
             comclass=self,
             chart=chart,
-            current_metrics=[label] if isinstance(label, str) else label,
+            current_metrics=metrics,
         )
 
         if isinstance(ctx, commands.Context):
@@ -150,13 +246,13 @@ class StatTrackCommands(MixinMeta):
 
         debug_info = {
             "plot_msg": msg.id,  # message id of sent plot
-            "maxpoints": maxpoints,  # user set max points to plot on a graph
-            "mins": delta_max_points,  # the amount of minutes in the delta
+            "maxpoints": data.maxpoints,  # user set max points to plot on a graph
+            "mins": data.mins,  # the amount of minutes in the delta
             "points_plotted": len(df),  # valid datapoints in the delta dataframe
-            "wanted_frequency": frequency,  # wanted frequency of the plot
+            "wanted_frequency": data.frequency,  # wanted frequency of the plot
             "plotted": label,  # metrics plotted
-            "time_db": db_time,  # time taken for DB query
-            "time_processing": processing_time,  # time taken for data processing
+            "time_db": data.db_time,  # time taken for DB query
+            "time_processing": data.processing_time,  # time taken for data processing
             "time_plot": plot_time,  # time taken for plotting generation
             "send_time": send_time,  # time taken for sending the message
         }
@@ -186,6 +282,7 @@ class StatTrackCommands(MixinMeta):
                     BytesIO(await ctx.message.attachments[0].read()), orient="split", typ="frame"
                 )
             )
+            await self.load_buffer()
         await ctx.send("Done.")
 
     @commands.is_owner()
@@ -249,6 +346,55 @@ class StatTrackCommands(MixinMeta):
             fp.seek(0)
         await ctx.send("Here is your file.", file=discord.File(fp, "stattrack.csv"))  # type:ignore
 
+    @export.command(name="csvgz")
+    async def export_csvgz(self, ctx: commands.Context):
+        """Export as gzip-compressed CSV"""
+        await self._send_export(ctx, "csvgz")
+
+    @export.command(name="parquet")
+    async def export_parquet(self, ctx: commands.Context):
+        """
+        Export as Parquet
+
+        This is much smaller than CSV or JSON and keeps column types, so is the best choice for
+        large amounts of data. It can be opened with pandas, polars, DuckDB and the like.
+
+        Requires `pyarrow` to be installed.
+        """
+        await self._send_export(ctx, "parquet")
+
+    @export.command(name="feather")
+    async def export_feather(self, ctx: commands.Context):
+        """
+        Export as Feather (Arrow IPC)
+
+        Requires `pyarrow` to be installed.
+        """
+        await self._send_export(ctx, "feather")
+
+    async def _send_export(self, ctx: commands.Context, fmt: str):
+        ext, needs_pyarrow = FORMATS[fmt]
+        if needs_pyarrow and not pyarrow_available():
+            await ctx.send(
+                "This format needs `pyarrow` to be installed. You can install it with "
+                f"`{ctx.clean_prefix}pipinstall pyarrow` and then reload this cog."
+            )
+            return
+        if ctx.guild:
+            max_size = ctx.guild.filesize_limit
+        else:
+            max_size = 8388608
+        async with ctx.typing():
+            try:
+                fp = await self.driver.export(fmt, max_size)
+            except ExportTooLarge:
+                await ctx.send(
+                    "Sorry, this file is too big to send here. Try a server with a higher upload "
+                    "file size limit."
+                )
+                return
+        await ctx.send("Here is your file.", file=discord.File(fp, f"stattrack.{ext}"))
+
     @commands.is_owner()
     @stattrack.command()
     async def maxpoints(self, ctx: commands.Context, maxpoints: int):
@@ -278,6 +424,45 @@ class StatTrackCommands(MixinMeta):
         await self.config.maxpoints.set(maxpoints)
         await ctx.send(f"Done, the maximum points to plot is now {humanize_number(maxpoints)}.")
 
+    @commands.is_owner()
+    @stattrack.command()
+    async def retention(self, ctx: commands.Context, raw_days: int, hourly_days: int = -1):
+        """
+        Set how long to keep data at each resolution. This limits the size of the database.
+
+        Every minute's data is kept for `raw_days` days, and hourly averages, minimums and
+        maximums for `hourly_days` days. Daily ones are always kept, so graphs over long
+        timespans will still work, but will be less detailed.
+
+        Data exports only include the per-minute data which is still kept.
+
+        Use -1 to keep data forever, which is the default for both.
+
+        Otherwise, `raw_days` must be at least 7 and `hourly_days` must be at least
+        `raw_days`.
+
+        **Examples:**
+        - `[p]stattrack retention 30` - keep per-minute data for 30 days
+        - `[p]stattrack retention 90 365` - keep per-minute data for 90 days and hourly for 1 year
+        - `[p]stattrack retention -1 -1` - the default, keep everything forever
+        """
+        if raw_days != -1 and raw_days < 7:
+            await ctx.send("The minimum value for `raw_days` is 7.")
+            return
+        if hourly_days != -1 and (raw_days == -1 or hourly_days < raw_days):
+            await ctx.send("`hourly_days` must be at least `raw_days`.")
+            return
+        await self.config.retention_raw.set(raw_days)
+        await self.config.retention_hourly.set(hourly_days)
+
+        def fmt(days: int) -> str:
+            return "forever" if days == -1 else f"for {humanize_number(days)} days"
+
+        await ctx.send(
+            f"Done, per-minute data will be kept {fmt(raw_days)} and hourly data will be kept "
+            f"{fmt(hourly_days)}. Old data will be removed within a minute."
+        )
+
     @stattrack.command(aliases=["ping"])
     async def latency(self, ctx: commands.Context, timespan: TimespanConverter = DEFAULT_DELTA):
         """
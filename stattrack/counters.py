@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import time
+from collections import Counter
+from typing import Iterable
+
+import discord
+from redbot.core.utils import AsyncIter
+
+from .vexutils import get_vex_logger
+
+log = get_vex_logger(__name__)
+
+STATUSES = ("online", "idle", "offline", "dnd")
+
+
+def _channel_kind(channel: discord.abc.GuildChannel) -> str | None:
+    if isinstance(channel, discord.TextChannel):
+        return "text"
+    if isinstance(channel, discord.VoiceChannel):
+        return "voice"
+    if isinstance(channel, discord.StageChannel):
+        return "stage"
+    if isinstance(channel, discord.CategoryChannel):
+        return "cat"
+    return None
+
+
+class GuildCounter:
+    """Member, status and channel counts across all of the bot's guilds, kept up to date from
+    gateway events so taking a sample doesn't need to go through every member.
+
+    Events can be missed (for example members being chunked in after joining a large guild) so
+    the counts should be rebuilt from scratch every so often with :meth:`reconcile`.
+    """
+
+    def __init__(self) -> None:
+        self.users_total = 0
+        self.guild_counts: dict[int, int] = {}  # user id -> how many guilds they're in
+        self.statuses: dict[int, str] = {}  # user id -> raw status
+        self.status_counts: Counter[str] = Counter()
+        self.bots: set[int] = set()
+        self.channels: Counter[str] = Counter()
+
+        self.last_reconcile: float | None = None  # monotonic
+
+    def __repr__(self) -> str:
+        return f"<GuildCounter {self.sample()}>"
+
+    def sample(self) -> dict[str, int]:
+        """Get the current counts, with the same keys as the main_df columns."""
+        data = {
+            "users_total": self.users_total,
+            "users_unique": len(self.guild_counts),
+            "users_humans": len(self.guild_counts) - len(self.bots),
+            "users_bots": len(self.bots),
+            "channels_total": self.channels["total"],
+            "channels_text": self.channels["text"],
+            "channels_voice": self.channels["voice"],
+            "channels_cat": self.channels["cat"],
+            "channels_stage": self.channels["stage"],
+        }
+        for status in STATUSES:
+            data[f"status_{status}"] = self.status_counts[status]
+        return data
+
+    def reconcile_due(self, interval: float) -> bool:
+        return self.last_reconcile is None or time.monotonic() - self.last_reconcile > interval
+
+    async def reconcile(self, guilds: Iterable[discord.Guild]) -> None:
+        """Rebuild all counts from the member and channel cache. This yields to the event loop
+        regularly, but is still O(members) so shouldn't be done too often."""
+        fresh = GuildCounter()
+        async for guild in AsyncIter(guilds, steps=50):
+            fresh.add_channels(guild.channels)
+            async for member in AsyncIter(guild.members, steps=500):
+                fresh.add_member(member)
+
+        drifted = self.users_total != fresh.users_total or self.channels != fresh.channels
+        if self.last_reconcile is not None and drifted:
+            log.debug(
+                "Counts had drifted since the last reconcile: users_total %s -> %s",
+                self.users_total,
+                fresh.users_total,
+            )
+
+        self.users_total = fresh.users_total
+        self.guild_counts = fresh.guild_counts
+        self.statuses = fresh.statuses
+        self.status_counts = fresh.status_counts
+        self.bots = fresh.bots
+        self.channels = fresh.channels
+        self.last_reconcile = time.monotonic()
+
+    def add_member(self, member: discord.Member) -> None:
+        self.users_total += 1
+        count = self.guild_counts.get(member.id, 0)
+        self.guild_counts[member.id] = count + 1
+        if count == 0:
+            if member.bot:
+                self.bots.add(member.id)
+            self.set_status(member.id, member.raw_status)
+
+    def remove_member(self, member: discord.Member) -> None:
+        count = self.guild_counts.get(member.id)
+        if count is None:  # never counted, eg they weren't cached
+            return
+        self.users_total -= 1
+        if count > 1:
+            self.guild_counts[member.id] = count - 1
+            return
+
+        del self.guild_counts[member.id]
+        self.bots.discard(member.id)
+        old_status = self.statuses.pop(member.id, None)
+        if old_status is not None:
+            self.status_counts[old_status] -= 1
+
+    def set_status(self, user_id: int, status: str) -> None:
+        if user_id not in self.guild_counts:
+            return
+        old_status = self.statuses.get(user_id)
+        if old_status == status:
+            return
+        if old_status is not None:
+            self.status_counts[old_status] -= 1
+        self.statuses[user_id] = status
+        self.status_counts[status] += 1
+
+    def add_channels(self, channels: Iterable[discord.abc.GuildChannel]) -> None:
+        for channel in channels:
+            self.channels["total"] += 1
+            kind = _channel_kind(channel)
+            if kind:
+                self.channels[kind] += 1
+
+    def remove_channels(self, channels: Iterable[discord.abc.GuildChannel]) -> None:
+        for channel in channels:
+            self.channels["total"] -= 1
+            kind = _channel_kind(channel)
+            if kind:
+                self.channels[kind] -= 1
+
+    async def add_guild(self, guild: discord.Guild) -> None:
+        self.add_channels(guild.channels)
+        async for member in AsyncIter(guild.members, steps=500):
+            self.add_member(member)
+
+    async def remove_guild(self, guild: discord.Guild) -> None:
+        self.remove_channels(guild.channels)
+        async for member in AsyncIter(guild.members, steps=500):
+            self.remove_member(member)
@@ -1,27 +1,160 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import datetime
+import io
 import os
 import sqlite3
 from concurrent.futures import ThreadPoolExecutor
-from typing import Iterable
+from pathlib import Path
+from typing import AsyncIterator, Callable, Iterable, Iterator, NamedTuple, TypeVar
 
 import aiosqlite
 import pandas as pd
 from redbot.core.data_manager import cog_data_path
 
+from . import export, rollups
+
+T = TypeVar("T")
+
+READ_POOL_SIZE = 3
+
+# how much source data (in minutes) to roll up per write job, so catching up on a big
+# backlog doesn't hold the writer up for too long at once
+ROLLUP_CHUNK_MINUTES = 7 * 1440
+
+EXPORT_CHUNK_ROWS = 50_000
+
+# applied to every connection, reader or writer. WAL means readers never wait on the writer
+# (and the writer never waits on readers), and with WAL synchronous=NORMAL is still safe
+# against corruption - at worst the last commit before a power loss is lost.
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",  # negative is KiB, so ~16MB of page cache per connection
+    "PRAGMA mmap_size=268435456",  # 256MB
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class DownsampledData(NamedTuple):
+    """Per-bucket aggregates of some metrics, each indexed by the start of the bucket."""
+
+    mean: pd.DataFrame
+    min: pd.DataFrame
+    max: pd.DataFrame
+    sum: pd.DataFrame
+    bucket: int
+
 
 class StatTrackSQLiteDriver:
-    """An asynchronous SQLite driver, working with DataFrames. Tailored to StatTrack"""
+    """An asynchronous SQLite driver, working with DataFrames. Tailored to StatTrack
+
+    One long-lived connection is used for writes, on ``sql_write_executor``, and a small pool of
+    read-only connections is used for reads. The database is in WAL mode so reads can happen
+    while a write is in progress.
 
-    def __init__(self) -> None:
-        self.sql_path = str(cog_data_path(raw_name="StatTrack") / "timeseries.db")
+    As well as the minute data in main_df, hourly and daily rollups are kept (see
+    ``stattrack.rollups``) so minute data can be pruned and long timespans read cheaply.
+    """
+
+    def __init__(self, read_pool_size: int = READ_POOL_SIZE, sql_path: str | None = None) -> None:
+        if sql_path is None:
+            sql_path = str(cog_data_path(raw_name="StatTrack") / "timeseries.db")
+        self.sql_path = sql_path
         self.sql_write_executor = ThreadPoolExecutor(1, "stattrack_sql_write")
 
+        self.read_pool_size = read_pool_size
+
+        # only ever touched from the thread of sql_write_executor
+        self._write_conn: sqlite3.Connection | None = None
+        self._columns: set[str] | None = None  # columns of main_df, cached for appends
+
+        self._read_conns: list[aiosqlite.Connection] = []
+        self._read_pool: asyncio.Queue[aiosqlite.Connection] | None = None
+        self._read_pool_lock = asyncio.Lock()
+
     def storage_usage(self) -> int:
-        """Return the size of the database file in bytes."""
-        return os.path.getsize(self.sql_path)
+        """Return the size of the database file in bytes, including the write-ahead log."""
+        size = os.path.getsize(self.sql_path)
+        with contextlib.suppress(FileNotFoundError):
+            size += os.path.getsize(self.sql_path + "-wal")
+        return size
+
+    def _get_write_conn(self) -> sqlite3.Connection:
+        """Get the writer connection, opening it if needed. Only call from the write executor."""
+        if self._write_conn is None:
+            conn = sqlite3.connect(self.sql_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            rollups.ensure_schema(conn)
+            conn.commit()
+            self._write_conn = conn
+        return self._write_conn
+
+    async def _run_write(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        """Run ``func`` with the writer connection on the write executor."""
+
+        def _run() -> T:
+            conn = self._get_write_conn()
+            try:
+                return func(conn)
+            except BaseException:
+                # don't leave a half-done transaction open on the long-lived connection
+                conn.rollback()
+                self._columns = None
+                raise
+
+        return await asyncio.get_event_loop().run_in_executor(self.sql_write_executor, _run)
+
+    async def _open_read_pool(self) -> asyncio.Queue[aiosqlite.Connection]:
+        async with self._read_pool_lock:
+            if self._read_pool is not None:
+                return self._read_pool
+
+            # the writer creates the file and switches it into WAL mode, which must happen
+            # before any read-only connection can be opened
+            await self._run_write(lambda _: None)
+
+            uri = Path(self.sql_path).as_uri() + "?mode=ro"
+            pool: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+            for _ in range(self.read_pool_size):
+                conn = await aiosqlite.connect(uri, uri=True)
+                for pragma in CONNECTION_PRAGMAS:
+                    await conn.execute(pragma)
+                self._read_conns.append(conn)
+                pool.put_nowait(conn)
+
+            self._read_pool = pool
+            return pool
+
+    @contextlib.asynccontextmanager
+    async def _read_conn(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a read-only connection from the pool."""
+        pool = self._read_pool or await self._open_read_pool()
+        conn = await pool.get()
+        try:
+            yield conn
+        finally:
+            pool.put_nowait(conn)
+
+    async def close(self) -> None:
+        """Close all connections and shut down the write executor."""
+        for conn in self._read_conns:
+            with contextlib.suppress(Exception):
+                await conn.close()
+        self._read_conns.clear()
+        self._read_pool = None
+
+        def _close() -> None:
+            if self._write_conn is not None:
+                self._write_conn.close()
+                self._write_conn = None
+
+        with contextlib.suppress(Exception):
+            await asyncio.get_event_loop().run_in_executor(self.sql_write_executor, _close)
+        self.sql_write_executor.shutdown(wait=False)
 
     async def get_last_index(self) -> pd.Timestamp:
         """Get the latest index from the database.
@@ -30,31 +163,67 @@ class StatTrackSQLiteDriver:
         -------
         pd.Timestamp
         """
-        query = 'SELECT "index" FROM main_df ORDER BY "index" DESC LIMIT 1'
-        async with aiosqlite.connect(self.sql_path) as conn:
+        # "index" is the rowid, so this is a single B-tree lookup
+        query = 'SELECT MAX("index") FROM main_df'
+        async with self._read_conn() as conn:
             async with conn.execute(query) as cursor:
                 index = await cursor.fetchone()
-        if index is None:
+        if index is None or index[0] is None:
             return pd.Timestamp(0)
-        return pd.to_datetime(index[0], format="ISO8601")
+        return pd.Timestamp(index[0] * 60, unit="s")
+
+    async def get_first_index(self) -> pd.Timestamp:
+        """Get the earliest index from the database.
 
-    async def read_all(self) -> pd.DataFrame:
+        Returns
+        -------
+        pd.Timestamp
+        """
+        firsts = [i for i in await self._get_first_indexes() if i is not None]
+        if not firsts:
+            return pd.Timestamp(0)
+        return pd.Timestamp(min(firsts) * 60, unit="s")
+
+    async def _get_first_indexes(self) -> list[int | None]:
+        """Get the earliest minute in each tier (main_df, then the rollups)"""
+        async with self._read_conn() as conn:
+            async with conn.execute(rollups.first_indexes_query()) as cursor:
+                row = await cursor.fetchone()
+        return list(row) if row else [None] * len(rollups.TIERS)
+
+    async def resolve_bucket(self, delta: datetime.timedelta | None, bucket: int) -> int:
+        """Get the bucket size (in minutes) that :meth:`read_downsampled` will actually use.
+
+        This will be rounded up to a multiple of the resolution of the coarsest rollup that
+        satisfies ``bucket``, or to a coarser rollup still if the minute data for the start of
+        the timespan has already been pruned.
+        """
+        start = to_epoch_minute(datetime.datetime.utcnow() - delta) if delta else 0
+        return rollups.pick_tier(await self._get_first_indexes(), start, bucket)[1]
+
+    async def read_all(self, delta: datetime.timedelta | None = None) -> pd.DataFrame:
         """Create a Pandas DataFrame from the whole table.
 
+        Parameters
+        ----------
+        delta : datetime.timedelta, optional
+            If given, only read data from now to `delta` ago.
+
         Returns
         -------
         pd.DataFrame
         """
         query = "SELECT * FROM main_df"
-        async with aiosqlite.connect(self.sql_path) as conn:
+        params: tuple[int, ...] = ()
+        if delta:
+            query += ' WHERE "index" >= ?'
+            params = (to_epoch_minute(datetime.datetime.utcnow() - delta),)
+        async with self._read_conn() as conn:
             async with conn.execute("PRAGMA table_info(main_df)") as cursor:
                 columns = [row[1] for row in await cursor.fetchall()]
-            async with conn.execute(query) as cursor:
+            async with conn.execute(query, params) as cursor:
                 data = await cursor.fetchall()
-        df = pd.DataFrame(data, columns=columns)
-        df.set_index("index", inplace=True)
-        df.index = pd.to_datetime(df.index, format="ISO8601")
-        return df
+        return _build_df(data, columns)
 
     async def read_partial(
         self, metrics: Iterable[str], delta: datetime.timedelta | None = None
@@ -73,21 +242,118 @@ class StatTrackSQLiteDriver:
         Returns
         -------
         pd.DataFrame
+            One row per minute, unless the minute data for the start of the timespan has been
+            pruned, in which case this will be hourly (or daily) averages.
         """
+        metrics = list(metrics)
+        if await self.resolve_bucket(delta, 1) > 1:
+            return (await self.read_downsampled(metrics, delta, 1)).mean
+
         query = f"""
         SELECT "index",{",".join(metrics)}
         FROM main_df
         """
+        params: tuple[int, ...] = ()
         if delta:
-            start_timestamp = (datetime.datetime.now() - delta).strftime("%Y-%m-%d %H:%M:%S")
-            query += f'\nWHERE "index" >= "{start_timestamp}"'
-        async with aiosqlite.connect(self.sql_path) as conn:
-            async with conn.execute(query) as cursor:
+            query += '\nWHERE "index" >= ?'
+            params = (to_epoch_minute(datetime.datetime.utcnow() - delta),)
+        async with self._read_conn() as conn:
+            async with conn.execute(query, params) as cursor:
                 data = await cursor.fetchall()
-        df = pd.DataFrame(data, columns=["index"] + list(metrics))
-        df.set_index("index", inplace=True)
-        df.index = pd.to_datetime(df.index, format="ISO8601")
-        return df
+        return _build_df(data, ["index"] + metrics)
+
+    async def read_downsampled(
+        self, metrics: Iterable[str], delta: datetime.timedelta | None, bucket: int
+    ) -> DownsampledData:
+        """Aggregate the metric(s) into buckets of ``bucket`` minutes in SQLite, so only one row
+        per bucket is loaded.
+
+        The coarsest table that can serve the bucket size is read from, so this will use the
+        hourly or daily rollups where possible. See :meth:`resolve_bucket`.
+
+        Buckets are aligned to the Unix epoch, like ``pd.Timestamp.floor``.
+
+        Parameters
+        ----------
+        metrics : Iterable[str]
+            The metric(s) to query
+
+        delta : datetime.timedelta, optional
+            Timeframe for data: from now to `delta` ago
+            If not given, data returned will be all-time.
+
+        bucket : int
+            Wanted size of each bucket, in minutes.
+
+        Returns
+        -------
+        DownsampledData
+            The mean, min, max and sum of each bucket, and the bucket size actually used.
+        """
+        metrics = list(metrics)
+        start = to_epoch_minute(datetime.datetime.utcnow() - delta) if delta else 0
+        tier, bucket = rollups.pick_tier(await self._get_first_indexes(), start, bucket)
+        query = rollups.downsample_query(metrics, tier, bucket)
+        async with self._read_conn() as conn:
+            async with conn.execute(query, {"start": start}) as cursor:
+                data = await cursor.fetchall()
+
+        aggs = ("mean", "min", "max", "sum")
+        columns = ["index"] + [f"{m}_{agg}" for m in metrics for agg in aggs]
+        df = _build_df(data, columns)
+        return DownsampledData(
+            *(
+                df[[f"{m}_{agg}" for m in metrics]].set_axis(metrics, axis="columns")
+                for agg in aggs
+            ),
+            bucket=bucket,
+        )
+
+    async def export(
+        self, fmt: str, max_size: int, chunk_rows: int = EXPORT_CHUNK_ROWS
+    ) -> io.BytesIO:
+        """Export main_df to an in-memory file, streaming it from SQLite ``chunk_rows`` rows at a
+        time so the whole table is never loaded at once.
+
+        This uses its own read-only connection on the default executor, so won't hold up
+        other reads or writes.
+
+        Parameters
+        ----------
+        fmt : str
+            One of ``stattrack.export.FORMATS``
+        max_size : int
+            Maximum file size in bytes
+
+        Returns
+        -------
+        io.BytesIO
+            The file
+
+        Raises
+        ------
+        stattrack.export.ExportTooLarge
+            If the file would be bigger than ``max_size``
+        """
+
+        def _export() -> io.BytesIO:
+            uri = Path(self.sql_path).as_uri() + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True)
+            try:
+                table_info = conn.execute("PRAGMA table_info(main_df)").fetchall()
+                names = [row[1] for row in table_info]
+                columns = [(row[1], row[2]) for row in table_info if row[1] != "index"]
+
+                def chunks() -> Iterator[pd.DataFrame]:
+                    cursor = conn.execute('SELECT * FROM main_df ORDER BY "index"')
+                    while rows := cursor.fetchmany(chunk_rows):
+                        yield _build_df(rows, names)
+
+                return export.export(fmt, columns, chunks(), max_size)
+            finally:
+                conn.close()
+
+        return await asyncio.get_event_loop().run_in_executor(None, _export)
 
     async def write(self, df: pd.DataFrame) -> None:
         """Write a DataFrame to the database. This is a write operation, so it will **replace**
@@ -99,34 +365,171 @@ class StatTrackSQLiteDriver:
             DataFrame to write
         """
 
-        # yes im crazy mixing aiosqlite and sqlite3 :aha:
-        # writes do block all other operations on the database
-        def _write():
-            connection = sqlite3.connect(self.sql_path)
-            try:
-                df.to_sql("main_df", con=connection, if_exists="replace")
-                connection.commit()
-            finally:
-                connection.close()
+        def _write(conn: sqlite3.Connection) -> None:
+            self._columns = None
+            conn.execute("DROP TABLE IF EXISTS main_df")
+            conn.execute(_create_table_query("main_df", df))
+            _insert(conn, "main_df", df)
+            # the rollups get rebuilt from the new data by the next call to rollup()
+            rollups.drop_rollups(conn)
+            rollups.ensure_schema(conn)
+            conn.commit()
 
-        await asyncio.get_event_loop().run_in_executor(self.sql_write_executor, _write)
+        await self._run_write(_write)
 
     async def append(self, df: pd.DataFrame) -> None:
         """Append a DataFrame to the database.
 
+        Any columns in ``df`` which aren't yet in the table are added with ``ALTER TABLE``
+        first, which only touches the schema so costs the same whatever the size of the table.
+        Existing rows will have ``NULL`` for the new columns.
+
         Parameters
         ----------
         df : pd.DataFrame
             DataFrame to append
         """
 
-        # see comments above in write()
-        def _append():
-            connection = sqlite3.connect(self.sql_path)
-            try:
-                df.to_sql("main_df", con=connection, if_exists="append")
-                connection.commit()
-            finally:
-                connection.close()
+        def _append(conn: sqlite3.Connection) -> None:
+            if self._columns is None:
+                self._columns = {row[1] for row in conn.execute("PRAGMA table_info(main_df)")}
+            new_cols = [str(col) for col in df.columns if col not in self._columns]
+            for col in new_cols:
+                conn.execute(f'ALTER TABLE main_df ADD COLUMN "{col}" {_sql_type(df[col].dtype)}')
+                self._columns.add(col)
+            if new_cols:
+                rollups.ensure_schema(conn, new_cols)
+            _insert(conn, "main_df", df)
+            conn.commit()
+
+        await self._run_write(_append)
+
+    async def migrate_to_epoch_index(self) -> bool:
+        """Migrate a table created by ``DataFrame.to_sql``, with ISO 8601 text timestamps and no
+        index, to one keyed by an integer epoch-minute primary key.
+
+        This is a no-op if the table has already been migrated.
+
+        Returns
+        -------
+        bool
+            Whether a migration actually happened.
+        """
+
+        def _migrate(conn: sqlite3.Connection) -> bool:
+            self._columns = None
+            table_info = conn.execute("PRAGMA table_info(main_df)").fetchall()
+            if not table_info:  # no table at all
+                conn.execute(_create_table_query("main_df", pd.DataFrame()))
+                conn.commit()
+                return False
+
+            # (cid, name, type, notnull, dflt_value, pk)
+            index_col = next(row for row in table_info if row[1] == "index")
+            if index_col[2].upper() == "INTEGER" and index_col[5]:
+                return False
+
+            columns = [row for row in table_info if row[1] != "index"]
+            col_defs = "".join(f', "{row[1]}" {row[2] or "REAL"}' for row in columns)
+            col_names = "".join(f', "{row[1]}"' for row in columns)
+
+            conn.execute("DROP TABLE IF EXISTS main_df_new")
+            conn.execute(f'CREATE TABLE main_df_new ("index" INTEGER PRIMARY KEY{col_defs})')
+            # "OR REPLACE" as the old table had no uniqueness constraint, so it is possible for
+            # there to be duplicate minutes. rows with a timestamp that can't be parsed are
+            # dropped, as a NULL key would be given a rowid and end up as a minute in 1970
+            conn.execute(
+                f'INSERT OR REPLACE INTO main_df_new ("index"{col_names}) '
+                f"SELECT CAST(strftime('%s', \"index\") AS INTEGER) / 60{col_names} "
+                'FROM main_df WHERE strftime(\'%s\', "index") IS NOT NULL ORDER BY "index"'
+            )
+            conn.execute("DROP TABLE main_df")
+            conn.execute("ALTER TABLE main_df_new RENAME TO main_df")
+            rollups.ensure_schema(conn)
+            conn.commit()
+            conn.execute("VACUUM")
+            return True
+
+        return await self._run_write(_migrate)
+
+    async def rollup(self) -> None:
+        """Roll up any complete hours and days of data which haven't been yet.
+
+        This is cheap if there's nothing to do. A big backlog, for example on the first run
+        with an existing database, is split up into several write jobs so appends can still
+        happen in between.
+        """
+        now = to_epoch_minute(datetime.datetime.utcnow())
+
+        for tier in range(1, len(rollups.TIERS)):
+
+            def _rollup(conn: sqlite3.Connection, tier: int = tier) -> bool:
+                more = rollups.rollup(conn, tier, now, ROLLUP_CHUNK_MINUTES)
+                conn.commit()
+                return more
+
+            while await self._run_write(_rollup):
+                pass
+
+    async def prune(self, raw_days: int, hourly_days: int) -> int:
+        """Delete minute data older than ``raw_days`` and hourly rollups older than
+        ``hourly_days``. Daily rollups are always kept.
+
+        Data is only ever deleted once it has been rolled up, and -1 means keep forever.
+
+        Returns
+        -------
+        int
+            The number of rows deleted.
+        """
+        now = to_epoch_minute(datetime.datetime.utcnow())
+
+        def _prune(conn: sqlite3.Connection) -> int:
+            deleted = 0
+            for tier, days in enumerate((raw_days, hourly_days)):
+                if days != -1:
+                    deleted += rollups.prune(conn, tier, now - days * 1440)
+            conn.commit()
+            return deleted
+
+        return await self._run_write(_prune)
+
+
+def to_epoch_minute(dt: datetime.datetime) -> int:
+    """Convert a naive UTC datetime to whole minutes since the Unix epoch."""
+    return int(dt.replace(tzinfo=datetime.timezone.utc).timestamp()) // 60
+
+
+def _build_df(data: list, columns: list[str]) -> pd.DataFrame:
+    df = pd.DataFrame(data, columns=columns)
+    df.set_index("index", inplace=True)
+    df.index = pd.to_datetime(df.index.to_numpy(dtype="int64"), unit="m")
+    df.index.name = "index"
+    return df
+
+
+def _sql_type(dtype) -> str:
+    if dtype.kind in "iub":
+        return "INTEGER"
+    if dtype.kind == "f":
+        return "REAL"
+    return "TEXT"
+
+
+def _create_table_query(table: str, df: pd.DataFrame) -> str:
+    col_defs = "".join(f', "{col}" {_sql_type(dtype)}' for col, dtype in df.dtypes.items())
+    return f'CREATE TABLE {table} ("index" INTEGER PRIMARY KEY{col_defs})'
+
 
-        await asyncio.get_event_loop().run_in_executor(self.sql_write_executor, _append)
+def _insert(conn: sqlite3.Connection, table: str, df: pd.DataFrame) -> None:
+    if df.empty:
+        return
+    index = pd.DatetimeIndex(df.index).values.astype("datetime64[m]").astype("int64").tolist()
+    # sqlite3 can't bind numpy types, object dtype gives native ints/floats (and None for NaN)
+    values = df.astype(object).where(df.notna(), None).values.tolist()
+    cols = "".join(f', "{col}"' for col in df.columns)
+    placeholders = ",?" * len(df.columns)
+    conn.executemany(
+        f'INSERT OR REPLACE INTO {table} ("index"{cols}) VALUES (?{placeholders})',
+        [[i, *row] for i, row in zip(index, values)],
+    )
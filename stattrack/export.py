@@ -0,0 +1,119 @@
+"""Exporting the whole database in chunks, so large databases never need to be fully in memory
+as a DataFrame. Everything in here is blocking."""
+
+from __future__ import annotations
+
+import gzip
+import io
+from typing import Iterator
+
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None  # type:ignore
+
+
+class ExportTooLarge(Exception):
+    """The export went over the maximum size."""
+
+
+# format: (file extension, needs pyarrow)
+FORMATS = {
+    "parquet": ("parquet", True),
+    "feather": ("feather", True),
+    "csvgz": ("csv.gz", False),
+}
+
+
+def pyarrow_available() -> bool:
+    return pyarrow is not None
+
+
+def _arrow_schema(columns: list[tuple[str, str]]) -> pyarrow.Schema:
+    fields = [pyarrow.field("index", pyarrow.timestamp("s"))]
+    for name, sql_type in columns:
+        arrow_type = pyarrow.int64() if sql_type.upper() == "INTEGER" else pyarrow.float64()
+        fields.append(pyarrow.field(name, arrow_type))
+    # go through an empty frame to get the pandas metadata, so "index" is read back as the index
+    empty = pd.DataFrame(
+        columns=[name for name, _ in columns], index=pd.DatetimeIndex([], name="index")
+    )
+    return pyarrow.Table.from_pandas(
+        empty, schema=pyarrow.schema(fields), preserve_index=True
+    ).schema
+
+
+def export(
+    fmt: str,
+    columns: list[tuple[str, str]],
+    chunks: Iterator[pd.DataFrame],
+    max_size: int,
+) -> io.BytesIO:
+    """Write ``chunks`` into an in-memory file of the given format.
+
+    Parameters
+    ----------
+    fmt : str
+        One of the keys of ``FORMATS``
+    columns : list[tuple[str, str]]
+        (name, declared SQL type) of each metric column, used to build a fixed schema so a chunk
+        that happens to be all nulls doesn't change the types
+    chunks : Iterator[pd.DataFrame]
+        The data, in order
+    max_size : int
+        Give up once the file is bigger than this many bytes
+
+    Returns
+    -------
+    io.BytesIO
+        The file, seeked to the start
+
+    Raises
+    ------
+    ExportTooLarge
+        If the file got bigger than ``max_size``
+    RuntimeError
+        If the format needs pyarrow and it isn't installed
+    """
+    if FORMATS[fmt][1] and pyarrow is None:
+        raise RuntimeError("pyarrow is needed for this format.")
+
+    fp = io.BytesIO()
+
+    def check_size() -> None:
+        if fp.tell() > max_size:
+            raise ExportTooLarge
+
+    if fmt == "csvgz":
+        with gzip.GzipFile(fileobj=fp, mode="wb", filename="stattrack.csv") as gz:
+            with io.TextIOWrapper(gz, encoding="utf-8", newline="") as text:
+                for i, chunk in enumerate(chunks):
+                    chunk.to_csv(text, header=i == 0)
+                    text.flush()
+                    check_size()
+        fp.seek(0)
+        return fp
+
+    schema = _arrow_schema(columns)
+    if fmt == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(fp, schema, compression="zstd")
+    else:  # feather v2 is the arrow IPC file format
+        writer = pyarrow.ipc.new_file(
+            fp, schema, options=pyarrow.ipc.IpcWriteOptions(compression="zstd")
+        )
+
+    try:
+        for chunk in chunks:
+            table = pyarrow.Table.from_pandas(chunk, schema=schema, preserve_index=True)
+            writer.write_table(table)
+            check_size()
+    finally:
+        writer.close()
+    check_size()  # footer
+
+    fp.seek(0)
+    return fp
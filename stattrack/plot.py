@@ -3,15 +3,17 @@ from __future__ import annotations
 import functools
 import io
 from concurrent.futures.thread import ThreadPoolExecutor
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Hashable
 
 import discord
 import pandas as pd
 from choreographer.errors import BrowserDepsError, BrowserFailedError
 from plotly import express as px
+from plotly import graph_objects as go
 
 from .abc import MixinMeta
 from .consts import TRACE_FRIENDLY_NAMES
+from .plotcache import PlotCache
 
 if TYPE_CHECKING:
     from plotly.graph_objs._figure import Figure
@@ -21,31 +23,53 @@ else:
 # supported by mypy
 
 from .vexutils import get_vex_logger, kaleido_setup
+from .vexutils.render import PRIORITY_HIGH, get_render_pool
 
 log = get_vex_logger(__name__)
 
 
 ONE_DAY_SECONDS = 86400
 
+PLOT_CACHE_BYTES = 32 * 1024 * 1024  # 32MB, several hundred plots
+
 
 class StatPlot(MixinMeta):
     def __init__(self) -> None:
         self.plot_executor = ThreadPoolExecutor(5, "stattrack_plot")
+        self.plot_cache = PlotCache(PLOT_CACHE_BYTES)
 
     async def plot(
-        self, df: pd.DataFrame, ylabel: str, status_colours: bool
+        self,
+        df: pd.DataFrame,
+        ylabel: str,
+        status_colours: bool,
+        bands: tuple[pd.DataFrame, pd.DataFrame] | None = None,
+        cache_key: Hashable | None = None,
     ) -> discord.File | str:
-        """Plot the standard dataframe to the specified parameters. Returns a discord file"""
+        """Plot the standard dataframe to the specified parameters. Returns a discord file
+
+        If ``bands`` is given, it should be a tuple of (min, max) DataFrames with the same index
+        and columns as ``df``, which will be shaded around each line.
+
+        If ``cache_key`` is given, a previously rendered image with the same key will be used
+        if there is one."""
+        if cache_key is not None:
+            image = self.plot_cache.get(cache_key)
+            if image is not None:
+                log.trace("Using cached plot for %s", cache_key)
+                return discord.File(io.BytesIO(image), filename="plot.png")
+
         func = functools.partial(
             self._plot,
             df=df,
             ylabel=ylabel,
             status_colours=status_colours,
+            bands=bands,
         )
 
         try:
-            file = await self.bot.loop.run_in_executor(self.plot_executor, func)
-            return file
+            figure = await self.bot.loop.run_in_executor(self.plot_executor, func)
+            image = await get_render_pool().render(figure, priority=PRIORITY_HIGH)
         except BrowserDepsError as e:
             log.error(
                 "Failed to generate plot image due to missing browser dependencies. "
@@ -72,13 +96,18 @@ class StatPlot(MixinMeta):
                 "fix this, so please try again. If the issue persists, please check the logs."
             )
 
+        if cache_key is not None:
+            self.plot_cache.put(cache_key, image)
+        return discord.File(io.BytesIO(image), filename="plot.png")
+
     def _plot(
         self,
         df: pd.DataFrame,
         ylabel: str,
         status_colours: bool,
-    ) -> discord.File | str:
-        """Do not use on own - blocking."""
+        bands: tuple[pd.DataFrame, pd.DataFrame] | None = None,
+    ) -> dict:
+        """Do not use on own - blocking. Returns the figure's dict, ready for rendering."""
         colour_map = (
             {
                 "status_online": "#3ba55d",
@@ -111,10 +140,45 @@ class StatPlot(MixinMeta):
         for trace in fig.data:
             trace.name = TRACE_FRIENDLY_NAMES[trace.name]  # type:ignore
 
-        bytes = fig.to_image(format="png", width=800, height=500, scale=1)
-
-        buffer = io.BytesIO(bytes)
-        buffer.seek(0)
-        file = discord.File(buffer, filename="plot.png")
-        buffer.close()
-        return file
+        if bands is not None:
+            _add_bands(fig, *bands)
+
+        return fig.to_dict()
+
+
+def _add_bands(fig: Figure, min_df: pd.DataFrame, max_df: pd.DataFrame) -> None:
+    """Shade between the min and max of each metric, behind its line."""
+    line_traces = list(fig.data)
+    band_traces = []
+    for metric, trace in zip(min_df.columns, line_traces):
+        colour = trace.line.color  # type:ignore
+        if isinstance(colour, str) and colour.startswith("#") and len(colour) == 7:
+            r, g, b = (int(colour[i : i + 2], 16) for i in (1, 3, 5))
+            fill = f"rgba({r},{g},{b},0.25)"
+        else:
+            fill = "rgba(255,255,255,0.15)"
+        band_traces.append(
+            go.Scatter(
+                x=max_df.index,
+                y=max_df[metric],
+                mode="lines",
+                line={"width": 0},
+                hoverinfo="skip",
+                showlegend=False,
+            )
+        )
+        band_traces.append(
+            go.Scatter(
+                x=min_df.index,
+                y=min_df[metric],
+                mode="lines",
+                line={"width": 0},
+                fill="tonexty",
+                fillcolor=fill,
+                hoverinfo="skip",
+                showlegend=False,
+            )
+        )
+    fig.add_traces(band_traces)
+    # bands go first so the lines are drawn on top
+    fig.data = fig.data[len(line_traces) :] + fig.data[: len(line_traces)]
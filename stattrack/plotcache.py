@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Hashable
+
+
+class PlotCache:
+    """An LRU cache of rendered plot images, limited by the total size of the images.
+
+    Keys should include something that changes when new data is saved (eg the latest index) so
+    old entries just stop being used and fall out of the cache.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, bytes] = OrderedDict()
+
+    def __repr__(self) -> str:
+        return (
+            f"<PlotCache entries={len(self._data)} size={self.size} max_bytes={self.max_bytes} "
+            f"hits={self.hits} misses={self.misses}>"
+        )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> bytes | None:
+        image = self._data.get(key)
+        if image is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return image
+
+    def put(self, key: Hashable, image: bytes) -> None:
+        if len(image) > self.max_bytes:
+            return
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._data[key] = image
+        self.size += len(image)
+        while self.size > self.max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.size = 0
@@ -0,0 +1,185 @@
+"""SQL for rolling the minute data in main_df up into hourly and daily tables.
+
+Each rollup table stores, per metric, the count of non-null values, their sum, min and max, so
+rollups can themselves be rolled up and any bucket size can be built from them exactly.
+Everything in here is blocking and should only be used with the driver's writer connection,
+except for the query builders which only return strings.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Iterable
+
+RAW_TABLE = "main_df"
+HOURLY_TABLE = "rollup_hourly"
+DAILY_TABLE = "rollup_daily"
+
+# (table, resolution in minutes), finest first. each tier is built from the one before it
+TIERS = ((RAW_TABLE, 1), (HOURLY_TABLE, 60), (DAILY_TABLE, 1440))
+
+AGGREGATES = ("count", "sum", "min", "max")
+
+
+def _source_columns(tier: int, metric: str) -> tuple[str, str, str, str]:
+    """Expressions for (count, sum, min, max) of a metric in the given tier's table."""
+    if tier == 0:
+        return (f'("{metric}" IS NOT NULL)', f'"{metric}"', f'"{metric}"', f'"{metric}"')
+    return tuple(f'"{metric}_{agg}"' for agg in AGGREGATES)  # type:ignore
+
+
+def get_metrics(conn: sqlite3.Connection) -> list[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({RAW_TABLE})") if row[1] != "index"]
+
+
+def ensure_schema(conn: sqlite3.Connection, metrics: Iterable[str] | None = None) -> None:
+    """Create the rollup tables if needed and make sure they have columns for every metric.
+
+    If ``metrics`` isn't given, the columns of main_df are used.
+    """
+    if metrics is None:
+        metrics = get_metrics(conn)
+    for table, _ in TIERS[1:]:
+        conn.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} ("index" INTEGER PRIMARY KEY, samples INTEGER)'
+        )
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for metric in metrics:
+            for agg in AGGREGATES:
+                if f"{metric}_{agg}" not in existing:
+                    sql_type = "INTEGER" if agg == "count" else "REAL"
+                    conn.execute(f'ALTER TABLE {table} ADD COLUMN "{metric}_{agg}" {sql_type}')
+
+
+def drop_rollups(conn: sqlite3.Connection) -> None:
+    for table, _ in TIERS[1:]:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def rolled_up_until(conn: sqlite3.Connection, tier: int) -> int | None:
+    """The first minute which has not yet been rolled up into the given tier, or None if
+    nothing has been."""
+    table, resolution = TIERS[tier]
+    last = conn.execute(f'SELECT MAX("index") FROM {table}').fetchone()[0]
+    return None if last is None else last + resolution
+
+
+def rollup(conn: sqlite3.Connection, tier: int, now: int, max_minutes: int) -> bool:
+    """Roll up complete buckets from the tier below into ``tier``.
+
+    At most ``max_minutes`` of source data is processed, so a big backlog can be worked through
+    in several calls without holding the writer for too long.
+
+    Returns
+    -------
+    bool
+        Whether there is still more to roll up.
+    """
+    table, resolution = TIERS[tier]
+    source, _ = TIERS[tier - 1]
+
+    until = now // resolution * resolution  # only complete buckets
+    start = rolled_up_until(conn, tier)
+    if start is None:
+        first = conn.execute(f'SELECT MIN("index") FROM {source}').fetchone()[0]
+        if first is None:
+            return False
+        start = first // resolution * resolution
+    if start >= until:
+        return False
+    end = min(until, start + max(max_minutes // resolution, 1) * resolution)
+
+    metrics = get_metrics(conn)
+    cols = ",".join(f'"{m}_{agg}"' for m in metrics for agg in AGGREGATES)
+    selects = ["COUNT(*)" if tier == 1 else "SUM(samples)"]
+    for m in metrics:
+        count, sum_, min_, max_ = _source_columns(tier - 1, m)
+        selects += [f"SUM({count})", f"SUM({sum_})", f"MIN({min_})", f"MAX({max_})"]
+
+    conn.execute(
+        f'INSERT OR REPLACE INTO {table} ("index",samples{"," if cols else ""}{cols}) '
+        f'SELECT "index" / {resolution} * {resolution} AS bucket,{",".join(selects)} '
+        f'FROM {source} WHERE "index" >= ? AND "index" < ? GROUP BY bucket',
+        (start, end),
+    )
+    return end < until
+
+
+def prune(conn: sqlite3.Connection, tier: int, before: int) -> int:
+    """Delete rows older than ``before`` from ``tier``, but never rows which haven't been rolled
+    up into the next tier yet.
+
+    Returns
+    -------
+    int
+        The number of rows deleted.
+    """
+    table, _ = TIERS[tier]
+    done = rolled_up_until(conn, tier + 1)
+    if done is None:
+        return 0
+    cursor = conn.execute(f'DELETE FROM {table} WHERE "index" < ?', (min(before, done),))
+    return cursor.rowcount
+
+
+def downsample_query(metrics: list[str], tier: int, bucket: int) -> str:
+    """Build a query aggregating ``metrics`` into buckets of ``bucket`` minutes, reading mainly
+    from ``tier`` and topping it up with the newest data from the finer tiers which hasn't been
+    rolled up yet.
+
+    The query takes a single named parameter, ``:start``, the earliest minute to include.
+    Each row is the bucket followed by (mean, min, max, sum) for each metric in turn.
+    """
+    parts = []
+    for i in range(tier, -1, -1):
+        table, _ = TIERS[i]
+        cond = '"index" >= :start'
+        if i < tier:
+            next_table, next_res = TIERS[i + 1]
+            cond += (
+                f' AND "index" >= (SELECT COALESCE(MAX("index") + {next_res}, 0) '
+                f"FROM {next_table})"
+            )
+        cols = ",".join(
+            f'{expr} AS "{m}_{agg}"'
+            for m in metrics
+            for agg, expr in zip(AGGREGATES, _source_columns(i, m))
+        )
+        parts.append(f'SELECT "index",{cols} FROM {table} WHERE {cond}')
+
+    aggregates = ",".join(
+        f'CAST(SUM("{m}_sum") AS REAL) / SUM("{m}_count"),'
+        f'MIN("{m}_min"),MAX("{m}_max"),SUM("{m}_sum")'
+        for m in metrics
+    )
+    return (
+        f'SELECT "index" / {bucket:d} * {bucket:d} AS bucket,{aggregates} '
+        f'FROM ({" UNION ALL ".join(parts)}) GROUP BY bucket ORDER BY bucket'
+    )
+
+
+def first_indexes_query() -> str:
+    """Query for the earliest minute in each tier, finest first."""
+    return "SELECT " + ",".join(f'(SELECT MIN("index") FROM {table})' for table, _ in TIERS)
+
+
+def pick_tier(firsts: list[int | None], start: int, bucket: int) -> tuple[int, int]:
+    """Pick the coarsest tier that can serve buckets of ``bucket`` minutes, moving to a coarser
+    one if the data needed from ``start`` has been pruned from the finer one.
+
+    Returns
+    -------
+    tuple[int, int]
+        The tier, and the bucket size rounded up to a multiple of its resolution.
+    """
+    tier = max(i for i, (_, res) in enumerate(TIERS) if res <= max(bucket, 1))
+    while tier < len(TIERS) - 1:
+        first, next_first = firsts[tier], firsts[tier + 1]
+        if first is None or next_first is None or start >= first:
+            break
+        # a coarser bucket that ends before our first row means rows were pruned
+        if next_first + TIERS[tier + 1][1] > first:
+            break
+        tier += 1
+    resolution = TIERS[tier][1]
+    return tier, -(-max(bucket, 1) // resolution) * resolution
@@ -2,7 +2,7 @@ import asyncio
 import datetime
 import json
 import time
-from typing import Dict, Optional, Set
+from typing import Optional
 
 import discord
 import pandas
@@ -10,19 +10,30 @@ import psutil
 from redbot.core import Config, commands
 from redbot.core.bot import Red
 from redbot.core.data_manager import cog_data_path
-from redbot.core.utils import AsyncIter
 
 from stattrack.abc import CompositeMetaClass
+from stattrack.buffer import SampleBuffer
 from stattrack.commands import StatTrackCommands
-from stattrack.driver import StatTrackSQLiteDriver
+from stattrack.counters import GuildCounter
+from stattrack.driver import StatTrackSQLiteDriver, to_epoch_minute
 from stattrack.plot import StatPlot
 
 from .vexutils import format_help, format_info, get_vex_logger, kaleido_setup
 from .vexutils.chat import humanize_bytes
-from .vexutils.loop import VexLoop
+from .vexutils.loop import (
+    VexLoop,
+    add_loop_stats_dev_value,
+    get_runner,
+    remove_loop_stats_dev_value,
+)
+from .vexutils.render import add_render_pool_user, get_render_pool, release_render_pool
+from .vexutils.watchdog import add_watchdog_tools, remove_watchdog_tools
 
 log = get_vex_logger(__name__)
 
+RECONCILE_INTERVAL = 3600.0  # seconds between full recounts of members and channels
+BUFFER_DAYS = 7  # how much recent data to keep in memory
+
 
 def snapped_utcnow():
     return datetime.datetime.utcnow().replace(microsecond=0, second=0)
@@ -41,6 +52,7 @@ class StatTrack(commands.Cog, StatTrackCommands, StatPlot, metaclass=CompositeMe
     __author__ = "@vexingvexed"
 
     def __init__(self, bot: Red) -> None:
+        super().__init__()
         self.bot = bot
 
         self.cmd_count = 0
@@ -48,6 +60,7 @@ class StatTrack(commands.Cog, StatTrackCommands, StatPlot, metaclass=CompositeMe
 
         self.config = Config.get_conf(self, identifier=418078199982063626, force_registration=True)
         self.config.register_global(version=1, maxpoints=25_000)
+        self.config.register_global(retention_raw=-1, retention_hourly=-1)  # days
         self.config.register_global(main_df={})  # deprecated
 
         self.last_loop_time = "Loop not ran yet"
@@ -58,8 +71,13 @@ class StatTrack(commands.Cog, StatTrackCommands, StatPlot, metaclass=CompositeMe
         self.plot_backend_ready = False
 
         self.driver = StatTrackSQLiteDriver()
+        self.counter = GuildCounter()
+        self.buffer = SampleBuffer(BUFFER_DAYS * 1440)
 
         bot.add_dev_env_value("stattrack", lambda _: self)
+        add_loop_stats_dev_value(bot, "StatTrack")
+        add_watchdog_tools(bot, "StatTrack")
+        add_render_pool_user("StatTrack")
 
     def format_help_for_context(self, ctx: commands.Context) -> str:
         """Thanks Sinbad."""
@@ -74,12 +92,15 @@ class StatTrack(commands.Cog, StatTrackCommands, StatPlot, metaclass=CompositeMe
             self.loop.cancel()
 
         self.plot_executor.shutdown(wait=False)
-        self.driver.sql_write_executor.shutdown(wait=False)
+        await self.driver.close()
+        await release_render_pool("StatTrack")
 
         try:
             self.bot.remove_dev_env_value("stattrack")
         except KeyError:
             pass
+        remove_watchdog_tools(self.bot, "StatTrack")
+        remove_loop_stats_dev_value(self.bot, "StatTrack")
 
     async def cog_load(self) -> None:
         self.bot.loop.create_task(self.kaleido_check())
@@ -97,8 +118,28 @@ class StatTrack(commands.Cog, StatTrackCommands, StatPlot, metaclass=CompositeMe
             await self.config.version.set(2)
             log.info("Done.")
 
-        self.loop = self.bot.loop.create_task(self.stattrack_loop())
-        self.loop_meta = VexLoop("StatTrack loop", 60.0)
+        if await self.config.version() < 3:
+            log.info(
+                "Migrating StatTrack database from 2 to 3. This could take a little while for "
+                "large databases."
+            )
+            await self.driver.migrate_to_epoch_index()
+            await self.config.version.set(3)
+            log.info("Done.")
+
+        await self.load_buffer()
+
+        # on the minute, but not at the same time as every other loop on the bot
+        self.loop_meta = VexLoop("StatTrack loop", 60.0, jitter=15.0)
+        self.loop = get_runner().register(
+            self.loop_meta, self.stattrack_iteration, wait_for=self.bot.wait_until_red_ready
+        )
+
+    async def load_buffer(self) -> None:
+        """(Re)load the in-memory buffer of recent data from the database."""
+        delta = datetime.timedelta(days=BUFFER_DAYS)
+        complete_from = to_epoch_minute(datetime.datetime.utcnow() - delta)
+        self.buffer.load(await self.driver.read_all(delta), complete_from)
 
     async def kaleido_check(self) -> None:
         self.plot_backend_ready = await kaleido_setup()
@@ -127,6 +168,11 @@ class StatTrack(commands.Cog, StatTrackCommands, StatPlot, metaclass=CompositeMe
                 extras={
                     "Loop time": f"{self.last_loop_time}",
                     "Plot backend ready": str(self.plot_backend_ready),
+                    "Render pool": get_render_pool().summary(),
+                    "Plot cache": (
+                        f"{len(self.plot_cache)} plots, {humanize_bytes(self.plot_cache.size)}, "
+                        f"{self.plot_cache.hits} hits, {self.plot_cache.misses} misses"
+                    ),
                 },
             )
             + f"\nDisk usage (SQLite database): {humanize_bytes(self.driver.storage_usage())}"
@@ -148,25 +194,52 @@ class StatTrack(commands.Cog, StatTrackCommands, StatPlot, metaclass=CompositeMe
         if ctx.author != self.bot.user:
             self.cmd_count += 1
 
-    async def stattrack_loop(self):
-        await asyncio.sleep(1)
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        self.counter.add_member(member)
 
-        await self.bot.wait_until_red_ready()
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        self.counter.remove_member(member)
 
-        while True:
-            log.verbose("StatTrack loop has started next iteration")
-            try:
-                self.loop_meta.iter_start()
-                await self.update_stats()
-                self.loop_meta.iter_finish()
-            except Exception as e:
-                self.loop_meta.iter_error(e)
-                log.exception(
-                    "Something went wrong in the StatTrack loop. The loop will try again shortly.",
-                    exc_info=e,
-                )
+    # there's no on_member_update, as nothing counted can change with it: since discord.py 2
+    # statuses only change in on_presence_update, and whether a user is a bot never changes
+    @commands.Cog.listener()
+    async def on_presence_update(self, before: discord.Member, after: discord.Member):
+        if before.raw_status != after.raw_status:
+            self.counter.set_status(after.id, after.raw_status)
 
-            await self.loop_meta.sleep_until_next()
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        await self.counter.add_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        await self.counter.remove_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        self.counter.add_channels([channel])
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.counter.remove_channels([channel])
+
+    async def stattrack_iteration(self):
+        log.verbose("StatTrack loop has started next iteration")
+        await self.update_stats()
+        with self.loop_meta.span("rollup"):
+            await self.rollup_and_prune()
+
+    async def rollup_and_prune(self):
+        start = time.monotonic()
+        await self.driver.rollup()
+        deleted = await self.driver.prune(
+            await self.config.retention_raw(), await self.config.retention_hourly()
+        )
+        if deleted:
+            log.debug(f"Pruned {deleted} rows of old data")
+        log.verbose(f"SQLite rollup and prune took {round(time.monotonic() - start, 3)} seconds")
 
     async def update_stats(self):
         psutil.cpu_percent(interval=None, percpu=True)  # force update before we start
@@ -193,47 +266,22 @@ class StatTrack(commands.Cog, StatTrackCommands, StatPlot, metaclass=CompositeMe
             return
         if self.last_loop_raw:
             data["loop_time_s"] = round(self.last_loop_raw, 3)
-        # data["users_unique"] = len(self.bot.users)
-        # discord cache is broken, has been for a while. got to manually count users from guilds
         data["guilds"] = len(self.bot.guilds)
-        data["users_total"] = 0
-        data["channels_total"] = 0
-        data["channels_text"] = 0
-        data["channels_voice"] = 0
-        data["channels_cat"] = 0
-        data["channels_stage"] = 0
         data["sys_mem"] = psutil.virtual_memory().percent
         data["sys_cpu"] = cpu
         data["command_count"] = self.cmd_count
         data["message_count"] = self.msg_count
         self.cmd_count, self.msg_count = 0, 0
 
-        count: Dict[str, Set[int]] = {  # can't use defaultdict, got to have these set
-            "status_online": set(),
-            "status_idle": set(),
-            "status_offline": set(),
-            "status_dnd": set(),
-            "users_humans": set(),
-            "users_bots": set(),
-            "users_unique": set(),
-        }
-        guild: discord.Guild
-        member: discord.Member
-        async for guild in AsyncIter(self.bot.guilds, steps=50):
-            async for member in AsyncIter(guild.members, steps=50):
-                data["users_total"] += 1
-                id = member.id
-                count[f"status_{member.raw_status}"].add(id)
-                count["users_bots"].add(id) if member.bot else count["users_humans"].add(id)
-                count["users_unique"].add(id)
-            data["channels_total"] += len(guild.channels)
-            data["channels_text"] += len(guild.text_channels)
-            data["channels_voice"] += len(guild.voice_channels)
-            data["channels_cat"] += len(guild.categories)
-            data["channels_stage"] += len(guild.stage_channels)
-
-        count_lens = {k: len(v) for k, v in count.items()}
-        data.update(count_lens)
+        # discord cache is broken, has been for a while. got to manually count users from guilds
+        # (but that's done as events come in, with a full recount every so often)
+        if self.counter.reconcile_due(RECONCILE_INTERVAL):
+            reconcile_start = time.monotonic()
+            with self.loop_meta.span("reconcile"):
+                await self.counter.reconcile(self.bot.guilds)
+            log.verbose(f"Recounted members in {round(time.monotonic() - reconcile_start, 3)}s")
+        with self.loop_meta.span("collect"):
+            data.update(self.counter.sample())
 
         df = pandas.DataFrame(data, index=[snapped_utcnow()])
 
@@ -243,20 +291,13 @@ class StatTrack(commands.Cog, StatTrackCommands, StatPlot, metaclass=CompositeMe
         main_time = round((end - start), 3)
         log.trace(f"Loop finished in {main_time} seconds")
 
-        try:
-            start = time.monotonic()
+        start = time.monotonic()
+        with self.loop_meta.span("db"):
             await self.driver.append(df)
-            end = time.monotonic()
-            save_time = round(end - start, 3)
-            log.verbose(f"SQLite append operation took {save_time} seconds")
-        except Exception:  # could be new schema (columns)
-            start = time.monotonic()
-            old_df = await self.driver.read_all()
-            df = pandas.concat([old_df, df], sort=False)
-            await self.driver.write(df)
-            end = time.monotonic()
-            save_time = round(end - start, 3)
-            log.verbose(f"SQLite write operation took {save_time} seconds")
+        self.buffer.append(df)
+        end = time.monotonic()
+        save_time = round(end - start, 3)
+        log.verbose(f"SQLite append operation took {save_time} seconds")
 
         total_time = main_time + save_time
         self.last_loop_raw = total_time
@@ -64,6 +64,7 @@ class StatusDevCom(MixinMeta):
             SendCache(update, service.name),
             True,
             True,
+            self.webhook_cache,
         ).send({ctx.channel.id: {"mode": mode, "webhook": webhook, "edit_id": {}}})
 
         json_resp, _, _ = await self.statusapi.scheduled_maintenance(service.id)
@@ -83,6 +84,7 @@ class StatusDevCom(MixinMeta):
             SendCache(update, service.name),
             True,
             True,
+            self.webhook_cache,
         ).send({ctx.channel.id: {"mode": mode, "webhook": webhook, "edit_id": {}}})
 
     @commands.before_invoke(unsupported)  # type:ignore
@@ -107,6 +109,7 @@ class StatusDevCom(MixinMeta):
             SendCache(update, service.name),
             True,
             True,
+            self.webhook_cache,
         ).send({ctx.channel.id: {"mode": "all", "webhook": False, "edit_id": {}}})
 
     @commands.before_invoke(unsupported)  # type:ignore
@@ -185,8 +185,11 @@ class StatusSetCom(MixinMeta):
                 return await ctx.send(
                     f"It looks like I don't send {service.friendly} updates in {channel.mention}."
                 )
+            last_feed = not feeds
 
         self.used_feeds.remove_feed(service.name)
+        if last_feed:
+            await self._forget_unused_webhook(channel)
 
         sr: dict[str, list[int]]
         async with self.config.guild(ctx.guild).service_restrictions() as sr:
@@ -201,6 +204,22 @@ class StatusSetCom(MixinMeta):
 
         await ctx.send(f"Removed {service.friendly} status updated from {channel.mention}")
 
+    async def _forget_unused_webhook(self, channel: GuildChannel | discord.Thread) -> None:
+        """Forget the saved webhook for a channel, or a thread's parent, if nothing using it
+        still has feeds."""
+        webhook_channel_id = (
+            channel.parent_id if isinstance(channel, discord.Thread) else channel.id
+        )
+        for c_id, data in (await self.config.all_channels()).items():
+            if not data.get("feeds"):
+                continue
+            if c_id == webhook_channel_id:
+                return
+            thread = channel.guild.get_thread(c_id)
+            if thread is not None and thread.parent_id == webhook_channel_id:
+                return
+        await self.webhook_cache.invalidate(webhook_channel_id)
+
     @statusset.command(name="list", aliases=["show", "settings"])
     async def statusset_list(self, ctx: commands.Context, service: Optional[ServiceConverter]):
         """
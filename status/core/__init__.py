@@ -2,9 +2,14 @@ from .consts import (
     ALL,
     EDIT,
     FEEDS,
+    FETCH_CONCURRENCY,
+    FETCH_TIMEOUT,
     LATEST,
     LINK_RE,
     MODES_LITERAL,
+    SEND_CONCURRENCY,
+    SEND_GUILD_CONCURRENCY,
+    SEND_RETRIES,
     SERVICE_LITERAL,
     SPECIAL_INFO,
     TYPES_LITERAL,
@@ -12,9 +12,11 @@ from ..core.statusapi import StatusAPI
 from ..objects import (
     ConfigWrapper,
     LastChecked,
+    SeenIDs,
     ServiceCooldown,
     ServiceRestrictionsCache,
     UsedFeeds,
+    WebhookCache,
 )
 from ..vexutils.loop import VexLoop
 
@@ -41,6 +43,8 @@ class MixinMeta(ABC):
     last_checked: LastChecked
     service_cooldown: ServiceCooldown
     service_restrictions_cache: ServiceRestrictionsCache
+    seen_ids: SeenIDs
+    webhook_cache: WebhookCache
 
     session: ClientSession
     statusapi: StatusAPI
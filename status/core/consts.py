@@ -38,6 +38,17 @@ UPDATE_NAME = "{} Status Update"
 
 ICON_BASE = "https://static.vexcodes.com/v1/status_icons/{}.png"
 
+# the update loop fetches feeds at the same time, up to this many at once
+FETCH_CONCURRENCY = 6
+FETCH_TIMEOUT = 10.0  # seconds for each request, so one slow host can't hold up the rest
+
+# updates are sent to this many channels at once, and this many at once in the same guild.
+# discord.py waits for each route's rate limit bucket, so this mostly stops one guild hogging it.
+# each route (a channel, or a webhook which its threads share) is only sent to one at a time
+SEND_CONCURRENCY = 10
+SEND_GUILD_CONCURRENCY = 2
+SEND_RETRIES = 2  # for each channel, if it couldn't connect to discord
+
 FEEDS = {
     "discord": {
         "url": "https://discordstatus.com/",
@@ -3,8 +3,10 @@ from copy import deepcopy
 from typing import Optional
 
 import aiohttp
+import discord
 from redbot.core import Config, commands
 from redbot.core.bot import Red
+from redbot.core.data_manager import cog_data_path
 
 from ..commands.status_com import StatusCom
 from ..commands.statusdev_com import StatusDevCom
@@ -12,16 +14,19 @@ from ..commands.statusset_com import StatusSetCom
 from ..core import FEEDS
 from ..core.abc import CompositeMetaClass
 from ..core.consts import SERVICE_LITERAL
-from ..core.statusapi import StatusAPI
+from ..core.statusapi import StatusAPI, ValidatorStore
 from ..objects import (
     ConfigWrapper,
     LastChecked,
+    SeenIDs,
     ServiceCooldown,
     ServiceRestrictionsCache,
     UsedFeeds,
+    WebhookCache,
 )
 from ..updateloop import SendUpdate, StatusLoop
 from ..vexutils import format_help, format_info, get_vex_logger
+from ..vexutils.watchdog import add_watchdog_tools, remove_watchdog_tools
 
 log = get_vex_logger(__name__)
 
@@ -58,7 +63,7 @@ class Status(
             old_ids=[],
             migrated_identifier=False,
         )
-        self.config.register_channel(feeds=default)
+        self.config.register_channel(feeds=default, webhook={})
         self.config.register_guild(service_restrictions=default)
 
         # other stuff
@@ -67,7 +72,9 @@ class Status(
         self.config_wrapper = ConfigWrapper(self.config, self.last_checked)
         self.service_cooldown = ServiceCooldown()
 
-        self.statusapi = StatusAPI(self.session)
+        validators = ValidatorStore(cog_data_path(self) / "http_validators.json")
+        self.statusapi = StatusAPI(self.session, validators)
+        self.seen_ids = SeenIDs(cog_data_path(self) / "seen_ids.db")
 
         self.ready = asyncio.Event()
 
@@ -80,6 +87,8 @@ class Status(
             except Exception:
                 log.debug("Unable to add dev env vars.", exc_info=True)
 
+        add_watchdog_tools(self.bot, "Status")
+
     def format_help_for_context(self, ctx: commands.Context) -> str:
         """Thanks Sinbad."""
         return format_help(self, ctx)
@@ -91,6 +100,7 @@ class Status(
     async def cog_unload(self) -> None:
         self.loop.cancel()
         await self.session.close()
+        await self.seen_ids.close()
 
         try:
             self.bot.remove_dev_env_value("status")
@@ -98,10 +108,14 @@ class Status(
             self.bot.remove_dev_env_value("sendupdate")
         except KeyError:
             log.debug("Unable to remove dev env vars. They probably weren't added.")
+        remove_watchdog_tools(self.bot, "Status")
 
         log.info("Status unloaded.")
 
     async def cog_load(self) -> None:
+        await self.seen_ids.load()
+        await self.migrate_old_ids()
+
         if await self.config.version() == 2:
             await self.migrate_to_v3()
             await self.config.incidents.clear()
@@ -127,7 +141,11 @@ class Status(
         else:
             self.actually_send = True
 
-        self.used_feeds = UsedFeeds(await self.config.all_channels())
+        self.statusapi.validators.load()
+
+        all_channels = await self.config.all_channels()
+        self.used_feeds = UsedFeeds(all_channels)
+        self.webhook_cache = WebhookCache(self.bot, self.config, all_channels)
         self.service_restrictions_cache = ServiceRestrictionsCache(await self.config.all_guilds())
 
         # this will start the loop
@@ -135,6 +153,16 @@ class Status(
 
         log.trace("status ready")
 
+    @commands.Cog.listener()
+    async def on_webhooks_update(self, channel: discord.abc.GuildChannel) -> None:
+        # the cached webhook may have been deleted or changed, it'll be looked up again if needed
+        await self.webhook_cache.invalidate(channel.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel) -> None:
+        # its webhooks are deleted with it, so there's no need to keep the ID and token
+        await self.webhook_cache.invalidate(channel.id)
+
     async def get_initial_data(self, specific_service: Optional[SERVICE_LITERAL] = None) -> None:
         """Start with initial data from services."""
         old_ids = []
@@ -169,7 +197,15 @@ class Status(
                 log.warning(f"Unable to get initial data from {service}.", exc_info=True)
                 continue
 
-        await self.config.old_ids.set(old_ids)
+        await self.seen_ids.add(old_ids)
+
+    async def migrate_old_ids(self) -> None:
+        """Move seen IDs from config to SeenIDs"""
+        if old_ids := await self.config.old_ids():
+            # these used to be a list in config, which was rewritten for every new update
+            await self.seen_ids.add(old_ids)
+            await self.config.old_ids.clear()
+            log.info(f"Moved {len(old_ids)} seen update IDs out of config.")
 
     async def migrate_to_v3(self) -> None:
         """Set up conifg for version 3"""
@@ -1,12 +1,26 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
+import os
+from pathlib import Path
 from typing import NamedTuple
 
 from aiohttp import ClientSession
 from asyncache import cached
 from cachetools import TTLCache
 
-from ..core import FEEDS
+from ..core import FEEDS, FETCH_TIMEOUT
+from ..core.consts import TYPES_LITERAL
+from ..vexutils import get_vex_logger
+
+log = get_vex_logger(__name__)
+
+FEED_ENDPOINTS: dict[TYPES_LITERAL, str] = {
+    "incidents": "incidents.json",
+    "scheduled": "scheduled-maintenances.json",
+}
 
 
 class APIResp(NamedTuple):
@@ -15,6 +29,12 @@ class APIResp(NamedTuple):
     status: int
 
 
+class Validator(NamedTuple):
+    etag: str
+    last_modified: str
+    body_hash: str
+
+
 def get_base(service_id: str) -> str:
     if service_id != FEEDS["statuspage"]["id"]:
         return f"https://{service_id}.statuspage.io/api/v2"
@@ -22,13 +42,84 @@ def get_base(service_id: str) -> str:
         return f"https://{service_id}.metastatuspage.com/api/v2"
 
 
+def _conditional_headers(validator: Validator | None) -> dict[str, str]:
+    headers = {}
+    if validator is not None:
+        if validator.etag:
+            headers["If-None-Match"] = validator.etag
+        if validator.last_modified:
+            headers["If-Modified-Since"] = validator.last_modified
+    return headers
+
+
+class ValidatorStore:
+    """The ETag, Last-Modified and body hash of the last response from each feed, saved to
+    disk so a restart doesn't mean downloading and processing every feed again."""
+
+    def __init__(self, path: Path | None) -> None:
+        self.path = path
+        self._data: dict[str, Validator] = {}
+        self._dirty = False
+
+    def __repr__(self) -> str:
+        return f"<ValidatorStore feeds={len(self._data)} dirty={self._dirty}>"
+
+    def get(self, url: str) -> Validator | None:
+        return self._data.get(url)
+
+    def set(self, url: str, validator: Validator) -> None:
+        if self._data.get(url) != validator:
+            self._data[url] = validator
+            self._dirty = True
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._dirty = True
+
+    def load(self) -> None:
+        if self.path is None:
+            return
+        try:
+            with open(self.path) as fp:
+                raw: dict[str, list[str]] = json.load(fp)
+            self._data = {url: Validator(*v) for url, v in raw.items()}
+        except FileNotFoundError:
+            pass
+        except Exception:  # corrupt, just start again
+            log.warning("Unable to read saved feed validators, feeds will be re-downloaded.")
+
+    async def save(self) -> None:
+        """Save to disk, if anything has changed."""
+        if self.path is None or not self._dirty:
+            return
+        raw = json.dumps({url: list(v) for url, v in self._data.items()})
+        self._dirty = False
+        await asyncio.get_running_loop().run_in_executor(None, self._write, raw)
+
+    def _write(self, raw: str) -> None:
+        assert self.path is not None
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as fp:
+            fp.write(raw)
+        os.replace(tmp, self.path)
+
+
 class StatusAPI:
-    """Interact with the Status API. Includes a cache with a TTL of 90 seconds."""
+    """Interact with the Status API.
+
+    Feeds checked by the update loop use `check_feed`, which sends conditional requests using
+    validators saved between restarts. Everything else includes a cache with a TTL of 90
+    seconds, and after that is revalidated with a conditional request against the response
+    held in memory.
+    """
 
     # loop is every 120 seconds, so a 90 sec TTL means it *will* refresh each time
 
-    def __init__(self, session: ClientSession):
+    def __init__(self, session: ClientSession, validators: ValidatorStore | None = None):
         self.session = session
+        self.validators = validators or ValidatorStore(None)
+        # url: (validator, response), for revalidating the TTL cached endpoints
+        self._responses: dict[str, tuple[Validator, dict]] = {}
 
     # these endpoints are documented at /api/v2/ of every statuspage domain/subdomain
     # example: https://discordstatus.com/api/v2/
@@ -41,42 +132,70 @@ class StatusAPI:
 
     # you'll see this doesn't implement the whole 8 endpoints of the API, im lazy
 
+    async def _get(
+        self, url: str, validator: Validator | None, timeout: float
+    ) -> tuple[int, Validator, bytes]:
+        headers = _conditional_headers(validator)
+        async with self.session.get(url, headers=headers, timeout=timeout) as resp:
+            body = await resp.read() if resp.status == 200 else b""
+        new_validator = Validator(
+            resp.headers.get("Etag", ""),
+            resp.headers.get("Last-Modified", ""),
+            hashlib.sha1(body).hexdigest() if body else "",
+        )
+        return resp.status, new_validator, body
+
+    async def check_feed(
+        self, service_id: str, type: TYPES_LITERAL, timeout: float = FETCH_TIMEOUT
+    ) -> APIResp:
+        """Check a feed for changes since it was last checked with this.
+
+        The status is 304 if nothing has changed, either because the server said so or because
+        the response is the same as last time. Otherwise it's the real status, with the JSON
+        if that's 200.
+        """
+        url = f"{get_base(service_id)}/{FEED_ENDPOINTS[type]}"
+        validator = self.validators.get(url)
+        status, new_validator, body = await self._get(url, validator, timeout)
+
+        if status != 200:
+            return APIResp({}, new_validator.etag, status)
+
+        self.validators.set(url, new_validator)
+        if validator is not None and validator.body_hash == new_validator.body_hash:
+            log.trace(f"Body of {url} unchanged despite a 200, treating as 304")
+            return APIResp({}, new_validator.etag, 304)
+        return APIResp(json.loads(body), new_validator.etag, status)
+
+    async def _revalidate(self, url: str, timeout: float) -> APIResp:
+        cached_validator, cached_json = self._responses.get(url, (None, {}))
+        status, validator, body = await self._get(url, cached_validator, timeout)
+
+        if status == 304 and cached_validator is not None:
+            return APIResp(cached_json, cached_validator.etag, 200)
+        if status != 200:
+            return APIResp({}, validator.etag, status)
+
+        resp_json = json.loads(body)
+        if validator.etag or validator.last_modified:
+            self._responses[url] = (validator, resp_json)
+        return APIResp(resp_json, validator.etag, status)
+
     @cached(TTLCache(maxsize=64, ttl=90))
     async def components(self, service_id: str) -> APIResp:
-        base = get_base(service_id)
-
-        resp = await self.session.get(f"{base}/components.json")
-
-        respo_json = await resp.json() if resp.status == 200 else {}
-        return APIResp(respo_json, resp.headers.get("Etag", ""), resp.status)
+        return await self._revalidate(f"{get_base(service_id)}/components.json", FETCH_TIMEOUT)
 
     @cached(TTLCache(maxsize=64, ttl=90))
     async def summary(self, service_id: str) -> APIResp:
-        base = get_base(service_id)
-
-        resp = await self.session.get(f"{base}/summary.json", timeout=10)
-
-        resp_json = await resp.json() if resp.status == 200 else {}
-        return APIResp(resp_json, resp.headers.get("Etag", ""), resp.status)
+        return await self._revalidate(f"{get_base(service_id)}/summary.json", FETCH_TIMEOUT)
 
     @cached(TTLCache(maxsize=64, ttl=90))
-    async def scheduled_maintenance(self, service_id: str, etag: str = "") -> APIResp:
-        headers = {"If-None-Match": etag}
-        base = get_base(service_id)
-
-        resp = await self.session.get(
-            f"{base}/scheduled-maintenances.json", headers=headers, timeout=10
-        )
-
-        resp_json = await resp.json() if resp.status == 200 else {}
-        return APIResp(resp_json, resp.headers.get("Etag", ""), resp.status)
+    async def scheduled_maintenance(self, service_id: str) -> APIResp:
+        url = f"{get_base(service_id)}/{FEED_ENDPOINTS['scheduled']}"
+        return await self._revalidate(url, FETCH_TIMEOUT)
 
     @cached(TTLCache(maxsize=64, ttl=90))
-    async def incidents(self, service_id: str, etag: str = "") -> APIResp:
-        headers = {"If-None-Match": etag}
-        base = get_base(service_id)
-
-        resp = await self.session.get(f"{base}/incidents.json", headers=headers, timeout=10)
-
-        resp_json = await resp.json() if resp.status == 200 else {}
-        return APIResp(resp_json, resp.headers.get("Etag", ""), resp.status)
+    async def incidents(self, service_id: str) -> APIResp:
+        return await self._revalidate(
+            f"{get_base(service_id)}/{FEED_ENDPOINTS['incidents']}", FETCH_TIMEOUT
+        )
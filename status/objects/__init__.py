@@ -1,6 +1,13 @@
-from .caches import LastChecked, ServiceCooldown, ServiceRestrictionsCache, UsedFeeds
+from .caches import (
+    LastChecked,
+    ServiceCooldown,
+    ServiceRestrictionsCache,
+    UsedFeeds,
+    WebhookCache,
+)
 from .channel import ChannelData, CogDisabled, InvalidChannel, NoPermission, NotFound
 from .configwrapper import ConfigWrapper
 from .incidentdata import IncidentData, Update, UpdateField
+from .seenids import SeenIDs
 from .sendcache import SendCache
 from .typeddict import ConfChannelSettings, ConfFeeds, IncidentDataDict
@@ -4,6 +4,10 @@ from collections import defaultdict, deque
 from time import time
 from typing import Literal
 
+from discord import Webhook
+from redbot.core.bot import Red
+from redbot.core.config import Config
+
 from ..core import FEEDS, SERVICE_LITERAL
 
 
@@ -125,3 +129,38 @@ class ServiceCooldown:
 
     def get_from_id(self, user_id: int) -> dict:
         return self.__data.get(user_id, {})
+
+
+class WebhookCache:
+    """Webhooks used for sending updates, by channel ID, so they don't need looking up for every
+    update. Kept in config (as the ID and token) so this lasts over restarts."""
+
+    def __init__(self, bot: Red, config: Config, all_channels: dict[int, dict]):
+        self.bot = bot
+        self.config = config
+        self.__data: dict[int, tuple[int, str]] = {
+            c_id: (data["webhook"]["id"], data["webhook"]["token"])
+            for c_id, data in all_channels.items()
+            if data.get("webhook")
+        }
+
+    def __repr__(self):
+        return f"<WebhookCache channels={len(self.__data)}>"
+
+    def get(self, channel_id: int) -> Webhook | None:
+        if cached := self.__data.get(channel_id):
+            return Webhook.partial(*cached, client=self.bot)
+        return None
+
+    async def set(self, channel_id: int, webhook: Webhook) -> None:
+        if webhook.token is None:  # can't be used without a token, so nothing to save
+            return
+        self.__data[channel_id] = (webhook.id, webhook.token)
+        await self.config.channel_from_id(channel_id).webhook.set(
+            {"id": webhook.id, "token": webhook.token}
+        )
+
+    async def invalidate(self, channel_id: int) -> None:
+        """Forget the webhook for a channel, eg if it's been deleted."""
+        if self.__data.pop(channel_id, None) is not None:
+            await self.config.channel_from_id(channel_id).webhook.clear()
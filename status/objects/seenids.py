@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import monotonic, time
+from typing import Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+
+SEEN_ID_MAX_AGE = 180 * 86400  # seconds since an ID was last in a feed before it's forgotten
+PRUNE_INTERVAL = 86400
+
+
+class SeenIDs:
+    """Every incident and update ID that has been seen, so each update is only sent once.
+
+    Held in memory as a dict of ID to when it was last in a feed, and in SQLite on disk.
+    Only new IDs are written as they're added. When they were last seen is updated in memory
+    and written when pruning, which forgets IDs that haven't been in a feed for ``max_age``.
+    """
+
+    def __init__(self, path: Path, max_age: float = SEEN_ID_MAX_AGE) -> None:
+        self.path = path
+        self.max_age = max_age
+
+        self._ids: dict[str, float] = {}
+        self._touched: set[str] = set()
+        self._last_prune = monotonic()
+
+        self._executor = ThreadPoolExecutor(1, "status_seen_ids")
+        self._connection: sqlite3.Connection | None = None  # only used from the executor
+
+    def __repr__(self) -> str:
+        return f"<SeenIDs ids={len(self._ids)} touched={len(self._touched)}>"
+
+    def __contains__(self, id: object) -> bool:
+        return id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    async def _run(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        def run() -> T:
+            if self._connection is None:
+                self._connection = sqlite3.connect(self.path, check_same_thread=False)
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS seen_ids (id TEXT PRIMARY KEY, last_seen REAL)"
+                )
+            with self._connection:  # commits, or rolls back if there's an exception
+                return func(self._connection)
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, run)
+
+    async def load(self) -> None:
+        """Load the IDs from disk."""
+
+        def load(connection: sqlite3.Connection) -> dict[str, float]:
+            return dict(connection.execute("SELECT id, last_seen FROM seen_ids"))
+
+        self._ids = await self._run(load)
+
+    async def add(self, ids: Iterable[str]) -> None:
+        """Add IDs, writing those which are new to disk."""
+        now = time()
+        new = [(id, now) for id in set(ids) if id not in self._ids]
+        if not new:
+            return
+        self._ids.update(new)
+
+        def add(connection: sqlite3.Connection) -> None:
+            connection.executemany("INSERT OR IGNORE INTO seen_ids VALUES (?, ?)", new)
+
+        await self._run(add)
+
+    def touch(self, ids: Iterable[str]) -> None:
+        """Mark IDs which have already been seen as still being in a feed."""
+        now = time()
+        for id in ids:
+            if id in self._ids:
+                self._ids[id] = now
+                self._touched.add(id)
+
+    async def prune(self) -> int:
+        """Forget IDs which haven't been in a feed for ``max_age``, returning how many."""
+        self._last_prune = monotonic()
+        cutoff = time() - self.max_age
+        touched = [(self._ids[id], id) for id in self._touched if id in self._ids]
+        self._touched.clear()
+        old = [id for id, last_seen in self._ids.items() if last_seen < cutoff]
+        for id in old:
+            del self._ids[id]
+
+        def prune(connection: sqlite3.Connection) -> None:
+            connection.executemany("UPDATE seen_ids SET last_seen = ? WHERE id = ?", touched)
+            connection.executemany("DELETE FROM seen_ids WHERE id = ?", [(id,) for id in old])
+
+        await self._run(prune)
+        return len(old)
+
+    async def maybe_prune(self) -> None:
+        """Prune if it's been ``PRUNE_INTERVAL`` since the last time."""
+        if monotonic() - self._last_prune > PRUNE_INTERVAL:
+            await self.prune()
+
+    async def close(self) -> None:
+        """Write when IDs were last seen and close the database. Can't be used after."""
+        await self.prune()
+
+        def close() -> None:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+        await asyncio.get_running_loop().run_in_executor(self._executor, close)
+        self._executor.shutdown(wait=False)
@@ -1,14 +1,15 @@
 from __future__ import annotations
 
 import asyncio
-from math import floor
+from collections import defaultdict
 from time import monotonic
 
+import aiohttp
 import discord
-from discord import Embed, Message, TextChannel, Thread
+from discord import Embed, Message, Thread, Webhook
 from redbot.core.bot import Red
 
-from ..core import FEEDS, UPDATE_NAME
+from ..core import FEEDS, SEND_CONCURRENCY, SEND_GUILD_CONCURRENCY, SEND_RETRIES, UPDATE_NAME
 from ..core.consts import ICON_BASE, SERVICE_LITERAL
 from ..objects import (
     ChannelData,
@@ -17,12 +18,19 @@ from ..objects import (
     InvalidChannel,
     SendCache,
     Update,
+    WebhookCache,
 )
 from ..vexutils import get_vex_logger
+from ..vexutils.loop import DurationHistogram
 from .utils import get_channel_data, get_webhook
 
 log = get_vex_logger(__name__)
 
+# only errors where the request never reached discord, so trying again can't send twice.
+# timeouts and other errors could be after discord got the message, and discord.py has already
+# retried 5xx responses itself
+NOT_SENT_ERRORS = (aiohttp.ClientConnectorError,)
+
 
 class SendUpdate:
     """Send an update."""
@@ -36,6 +44,7 @@ class SendUpdate:
         sendcache: SendCache,
         dispatch: bool = True,
         force: bool = False,
+        webhook_cache: WebhookCache | None = None,
     ):
         self.bot = bot
         self.config_wrapper = config_wrapper
@@ -46,7 +55,16 @@ class SendUpdate:
         self.sendcache = sendcache
         self.dispatch = dispatch
         self.force = force
-        self.channeldata: ChannelData
+        self.webhook_cache = webhook_cache
+
+        self.concurrency = SEND_CONCURRENCY
+        self.guild_concurrency = SEND_GUILD_CONCURRENCY
+
+        # delivery latency is from when sending started to when a channel had been sent to
+        self.latency = DurationHistogram()
+        self.sent = 0
+        self.skipped = 0  # eg channel deleted or no permissions
+        self.failed = 0
 
     def __repr__(self):
         return (
@@ -70,19 +88,81 @@ class SendUpdate:
         start = monotonic()
         log.info(f"Sending update for {self.service} to {len(channels)} channels...")
 
+        semaphore = asyncio.Semaphore(self.concurrency)
+        guild_semaphores: defaultdict[int, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.guild_concurrency)
+        )
+        route_locks: defaultdict[tuple[str, int], asyncio.Lock] = defaultdict(asyncio.Lock)
+        sends = []
         for c_id, settings in channels.items():
-            try:
-                await self._send_updated_feed(c_id, settings)
-            except Exception:
-                return log.warning(
-                    f"Something went wrong sending to {c_id} - skipping.", exc_info=True
+            channel = self.bot.get_channel(c_id)
+            guild_id = getattr(getattr(channel, "guild", None), "id", c_id)
+            sends.append(
+                self._deliver(
+                    c_id,
+                    settings,
+                    start,
+                    semaphore,
+                    guild_semaphores[guild_id],
+                    route_locks[self._route(c_id, channel, settings)],
                 )
+            )
+        await asyncio.gather(*sends)
 
-        end = monotonic()
-        time = floor(end - start) or "under a"
-        log.verbose(f"Sending update for {self.service} took {time} second(s).")
+        log.verbose(
+            f"Sending update for {self.service} took {monotonic() - start:.1f}s: "
+            f"{self.sent} sent, {self.skipped} skipped, {self.failed} failed. "
+            f"Delivery latency p50 {self.latency.percentile(50) or 0:.2f}s, "
+            f"p95 {self.latency.percentile(95) or 0:.2f}s, max {self.latency.max or 0:.2f}s."
+        )
 
-    async def _send_updated_feed(self, c_id: int, settings: ConfChannelSettings) -> None:
+    async def _deliver(
+        self,
+        c_id: int,
+        settings: ConfChannelSettings,
+        start: float,
+        semaphore: asyncio.Semaphore,
+        guild_semaphore: asyncio.Semaphore,
+        route_lock: asyncio.Lock,
+    ) -> None:
+        """Send to a channel, retrying if it couldn't connect to Discord. Never raises, so one
+        channel can't stop the others."""
+        # narrowest first, so waiting for a busy route or guild doesn't take a place from others
+        async with route_lock, guild_semaphore, semaphore:
+            for attempt in range(SEND_RETRIES + 1):
+                try:
+                    sent = await self._send_updated_feed(c_id, settings)
+                    break
+                except NOT_SENT_ERRORS as e:
+                    if attempt == SEND_RETRIES:
+                        self.failed += 1
+                        return log.warning(
+                            f"Unable to send to {c_id} after {attempt + 1} tries - skipping.",
+                            exc_info=e,
+                        )
+                    log.debug(f"Error sending to {c_id}, will retry.", exc_info=e)
+                    await asyncio.sleep(2**attempt)
+                except Exception:
+                    self.failed += 1
+                    return log.warning(
+                        f"Something went wrong sending to {c_id} - skipping.", exc_info=True
+                    )
+
+        if sent:
+            self.sent += 1
+            self.latency.record(monotonic() - start)
+        else:
+            self.skipped += 1
+
+    @staticmethod
+    def _route(c_id: int, channel: object, settings: ConfChannelSettings) -> tuple[str, int]:
+        """The rate limit route a channel is sent on. Threads share their parent's webhook, so
+        they share its route too."""
+        if settings.get("webhook"):
+            return "webhook", channel.parent_id if isinstance(channel, Thread) else c_id
+        return "channel", c_id
+
+    async def _send_updated_feed(self, c_id: int, settings: ConfChannelSettings) -> bool:
         """Send feed decalred in init to a channel.
 
         Parameters
@@ -91,13 +171,16 @@ class SendUpdate:
             Channel ID
         settings : ConfChannelSettings
             Settings for channel.
+
+        Returns
+        -------
+        bool
+            Whether it was sent, False if the channel couldn't be used
         """
         try:
             channeldata = await get_channel_data(self.bot, c_id, settings)
         except InvalidChannel:
-            return
-
-        self.channeldata = channeldata
+            return False
 
         if channeldata.embed:
             if channeldata.mode in ["all", "edit"]:
@@ -106,9 +189,9 @@ class SendUpdate:
                 embed = self.sendcache.embed_latest
 
             if channeldata.webhook:
-                await self._send_webhook(channeldata.channel, embed)
+                await self._send_webhook(channeldata, embed)
             else:
-                await self._send_embed(channeldata.channel, embed)
+                await self._send_embed(channeldata, embed)
 
         else:
             if channeldata.mode in ["all", "edit"]:
@@ -116,32 +199,49 @@ class SendUpdate:
             else:
                 msg = self.sendcache.plain_latest
 
-            await self._send_plain(channeldata.channel, msg)
+            await self._send_plain(channeldata, msg)
 
         if self.dispatch:
             self._dispatch_channel(channeldata)
+        return True
 
     # TODO: maybe try to do some DRY on the next 3
 
-    async def _send_webhook(self, channel: TextChannel | Thread, embed: Embed) -> None:
+    async def _send_webhook(self, channeldata: ChannelData, embed: Embed) -> None:
         """Send a webhook to the specified channel
 
         Parameters
         ----------
-        channel : TextChannel | Thread
-            Channel to send to
+        channeldata : ChannelData
+            Channel to send to, with its settings
         embed : Embed
             Embed to use
         """
+        channel = channeldata.channel
+        embed = embed.copy()  # shared with channels being sent to at the same time
         embed.set_footer(text=f"Powered by {channel.guild.me.name}")
-        webhook = await get_webhook(channel)
-
+        webhook = await get_webhook(channel, self.webhook_cache)
+        try:
+            await self._execute_webhook(channeldata, webhook, embed)
+        except discord.NotFound:
+            if self.webhook_cache is None:
+                raise
+            # likely the cached webhook has been deleted, so get it again
+            parent_id = channel.parent_id if isinstance(channel, Thread) else channel.id
+            await self.webhook_cache.invalidate(parent_id)
+            webhook = await get_webhook(channel, self.webhook_cache)
+            await self._execute_webhook(channeldata, webhook, embed)
+
+    async def _execute_webhook(
+        self, channeldata: ChannelData, webhook: Webhook, embed: Embed
+    ) -> None:
+        channel = channeldata.channel
         sanitised_name = UPDATE_NAME.format(FEEDS[self.service]["friendly"])
         if "Discord" in sanitised_name:
             sanitised_name = "Status Update"
 
-        if self.channeldata.mode == "edit":
-            if edit_id := self.channeldata.edit_id.get(self.incidentdata.incident_id):
+        if channeldata.mode == "edit":
+            if edit_id := channeldata.edit_id.get(self.incidentdata.incident_id):
                 try:
                     await webhook.edit_message(edit_id, embed=embed, content=None)
                 except discord.HTTPException:  # eg message deleted
@@ -166,23 +266,25 @@ class SendUpdate:
                 thread=channel if isinstance(channel, Thread) else discord.utils.MISSING,
             )
 
-    async def _send_embed(self, channel: TextChannel | Thread, embed: Embed) -> None:
+    async def _send_embed(self, channeldata: ChannelData, embed: Embed) -> None:
         """Send an embed to the specified channel
 
         Parameters
         ----------
-        channel : TextChannel | Thread
-            Channel to send to
+        channeldata : ChannelData
+            Channel to send to, with its settings
         embed : Embed
             Embed to use
         """
+        channel = channeldata.channel
+        embed = embed.copy()
         embed.set_author(
             name=UPDATE_NAME.format(FEEDS[self.service]["friendly"]),
             icon_url=ICON_BASE.format(self.service),
         )
 
-        if self.channeldata.mode == "edit":
-            if edit_id := self.channeldata.edit_id.get(self.incidentdata.incident_id):
+        if channeldata.mode == "edit":
+            if edit_id := channeldata.edit_id.get(self.incidentdata.incident_id):
                 try:
                     message = channel.get_partial_message(edit_id)
                     await message.edit(embed=embed, content=None)
@@ -196,18 +298,19 @@ class SendUpdate:
         else:
             await channel.send(embed=embed)
 
-    async def _send_plain(self, channel: TextChannel | Thread, msg: str) -> None:
+    async def _send_plain(self, channeldata: ChannelData, msg: str) -> None:
         """Send a plain message to the specified channel
 
         Parameters
         ----------
-        channel : TextChannel | Thread
-            Channel to send to
+        channeldata : ChannelData
+            Channel to send to, with its settings
         msg : str
             Message to send
         """
-        if self.channeldata.mode == "edit":
-            if edit_id := self.channeldata.edit_id.get(self.incidentdata.incident_id):
+        channel = channeldata.channel
+        if channeldata.mode == "edit":
+            if edit_id := channeldata.edit_id.get(self.incidentdata.incident_id):
                 try:
                     message = channel.get_partial_message(edit_id)
                     await message.edit(embed=None, content=None)
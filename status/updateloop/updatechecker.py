@@ -1,16 +1,18 @@
 from __future__ import annotations
 
 import asyncio
+import datetime
 from time import monotonic
 
 import aiohttp
 from aiohttp.client_exceptions import ClientOSError
 
-from ..core import FEEDS, SERVICE_LITERAL, TYPES_LITERAL
+from ..core import FEEDS, FETCH_CONCURRENCY, FETCH_TIMEOUT, SERVICE_LITERAL, TYPES_LITERAL
 from ..core.abc import MixinMeta
+from ..core.statusapi import APIResp
 from ..objects import IncidentData, SendCache, Update
 from ..vexutils import get_vex_logger
-from ..vexutils.loop import VexLoop
+from ..vexutils.loop import VexLoop, get_runner
 from .processfeed import process_json
 from .sendupdate import SendUpdate
 
@@ -21,133 +23,112 @@ class StatusLoop(MixinMeta):
     """Loop for checking for updates."""
 
     def __init__(self) -> None:
-        self.etags: dict[str, str] = {}
+        # can be changed at runtime, eg with [p]eval, and used from the next loop
+        self.fetch_concurrency = FETCH_CONCURRENCY
+        self.fetch_timeout = FETCH_TIMEOUT
 
-        self.loop_meta = VexLoop("Status Loop", 120.0)
-        self.loop = self.bot.loop.create_task(self.status_loop())
+        # every 2 mins, but not at the same time as every other loop on the bot
+        self.loop_meta = VexLoop("Status Loop", 120.0, jitter=30.0)
+        self.loop = get_runner().register(
+            self.loop_meta, self.status_iteration, wait_for=self.before_status_loop
+        )
 
-    async def status_loop(self):
+    async def before_status_loop(self) -> None:
         await self.ready.wait()
-
-        await asyncio.sleep(1)
-
         await self.bot.wait_until_red_ready()
 
-        while True:
-            self.loop_meta.iter_start()
-            log.debug("Update loop started.")
-            if not self.used_feeds.get_list():
-                return log.verbose("Nothing to do - no channels have registered for auto updates.")
-            start = monotonic()
-
-            try:
-                await asyncio.wait_for(self._check_for_updates(), timeout=245)  # 4 min and a bit
-
-                self.loop_meta.iter_finish()
-            except asyncio.TimeoutError as e:
-                self.loop_meta.iter_error(e)
-                log.warning(
-                    "Update checking timed out after 4 minutes. If this happens a lot contact "
-                    "Vexed."
-                )
-            except Exception as e:
-                self.loop_meta.iter_error(e)
-                log.error(
-                    "Unable to check and send updates. Some services were likely missed. The "
-                    "might be picked up on the next loop. You may want to report this to Vexed.",
-                    exc_info=e,
-                )
-            end = monotonic()
-            total = round(end - start, 1)
-
-            log.debug(f"Update loop finished in {total}s.")
-
+    async def status_iteration(self) -> None:
+        log.debug("Update loop started.")
+        if not self.used_feeds.get_list():
+            return log.verbose("Nothing to do - no channels have registered for auto updates.")
+        start = monotonic()
+
+        try:
+            await asyncio.wait_for(self._check_for_updates(), timeout=245)  # 4 min and a bit
+        except asyncio.TimeoutError as e:
+            raise asyncio.TimeoutError(
+                "Update checking timed out after 4 minutes. If this happens a lot contact Vexed."
+            ) from e
+        finally:
+            log.debug(f"Update loop finished in {round(monotonic() - start, 1)}s.")
             self.actually_send = True
 
-            await self.loop_meta.sleep_until_next()
-
     async def _check_for_updates(self) -> None:
-        # ############################ INCIDENTS ############################
-        for service in self.used_feeds.get_list():
+        # every feed is fetched at once (up to fetch_concurrency at a time), then each is
+        # processed as soon as it arrives, so a slow host only delays itself.
+        # the limit is global, not per host: every feed is served by Statuspage, so they all
+        # end up at the same provider anyway
+        semaphore = asyncio.Semaphore(self.fetch_concurrency)
+        fetches = [
+            asyncio.create_task(self._fetch_feed(service, type, semaphore))
+            for service in self.used_feeds.get_list()
+            for type in ("incidents", "scheduled")
+        ]
+        start = monotonic()
+        try:
+            for fetch in asyncio.as_completed(fetches):
+                service, type, resp = await fetch
+                if resp is not None:
+                    await self._handle_feed(service, type, resp)
+        finally:
+            # eg if the loop's timeout is hit, as_completed won't cancel anything left itself
+            for fetch in fetches:
+                fetch.cancel()
+            await asyncio.gather(*fetches, return_exceptions=True)
+        log.trace(f"Fetched and processed {len(fetches)} feeds in {monotonic() - start:.2f}s")
+
+        await self.statusapi.validators.save()
+        await self.seen_ids.maybe_prune()
+
+    async def _fetch_feed(
+        self, service: SERVICE_LITERAL, type: TYPES_LITERAL, semaphore: asyncio.Semaphore
+    ) -> tuple[SERVICE_LITERAL, TYPES_LITERAL, APIResp | None]:
+        """Get a feed, returning None for the response if it couldn't be fetched."""
+        async with semaphore:
             try:
-                resp_json, new_etag, status = await self.statusapi.incidents(
-                    FEEDS[service]["id"], self.etags.get(f"incidents-{service}", "")
+                resp = await asyncio.wait_for(
+                    self.statusapi.check_feed(FEEDS[service]["id"], type, self.fetch_timeout),
+                    timeout=self.fetch_timeout,
                 )
             except asyncio.TimeoutError:
                 log.warning(
                     f"Timeout checking {service}. Any missed updates will be caught on the next "
                     "loop."
                 )
-                continue
+                return service, type, None
             except (aiohttp.ClientError, ClientOSError):
                 log.warning(
                     f"Unable to check {service}. Any missed updates will be caught on the next "
                     "loop."
                 )
-                continue
+                return service, type, None
             except Exception:  # want to catch everything and anything
                 log.error(f"Something unexpected went wrong checking {service}.", exc_info=True)
-                continue
-
-            if status == 304:
-                log.trace(f"Incidents: no update for {service} - 304")
-                self.last_checked.update_time(service)
-            elif status == 200:
-                log.trace(f"Incidents: update detected for {service} - 200")
-                self.etags[f"incidents-{service}"] = new_etag
-                # dont need to update checked time as above because _maybe_send_update does it
-                await self._maybe_send_update(resp_json, service, "incidents")
-            elif str(status)[0] == "5":
-                log.debug(
-                    f"I was unable to get an update for {service} due to problems on their side. "
-                    f"(HTTP error {status})"
-                )
-            else:
-                log.warning(
-                    f"Unexpected status code received from {service}: {status}. Please report "
-                    "this to Vexed."
-                )
+                return service, type, None
+        return service, type, resp
 
-        # ############################ SCHEDULED ############################
-        for service in self.used_feeds.get_list():
-            try:
-                resp_json, new_etag, status = await self.statusapi.scheduled_maintenance(
-                    FEEDS[service]["id"], self.etags.get(f"scheduled-{service}", "")
-                )
-            except asyncio.TimeoutError:
-                log.warning(
-                    f"Timeout checking {service}. Any missed updates will be caught on the next "
-                    "loop."
-                )
-                continue
-            except (aiohttp.ClientError, ClientOSError):
-                log.warning(
-                    f"Unable to check {service}. Any missed updates will be caught on the next "
-                    "loop."
-                )
-                continue
-            except Exception:  # want to catch everything and anything
-                log.error(f"Something unexpected went wrong checking {service}.", exc_info=True)
-                continue
-
-            if status == 304:
-                log.trace(f"Scheduled: no update for {service} - 304")
-                self.last_checked.update_time(service)
-            elif status == 200:
-                log.trace(f"Scheduled: update detected for {service} - 200")
-                self.etags[f"scheduled-{service}"] = new_etag
-                # dont need to update checked time as above because _maybe_send_update does it
-                await self._maybe_send_update(resp_json, service, "scheduled")
-            elif str(status)[0] == "5":
-                log.debug(
-                    f"I was unable to get an update for {service} due to problems on their side. "
-                    f"(HTTP error {status})"
-                )
-            else:
-                log.warning(
-                    f"Unexpected status code received from {service}: {status}. Please report "
-                    "this to Vexed."
-                )
+    async def _handle_feed(
+        self, service: SERVICE_LITERAL, type: TYPES_LITERAL, resp: APIResp
+    ) -> None:
+        resp_json, _, status = resp
+        friendly_type = "Incidents" if type == "incidents" else "Scheduled"
+        if status == 304:
+            log.trace(f"{friendly_type}: no update for {service} - 304")
+            self.last_checked.update_time(service)
+        elif status == 200:
+            log.trace(f"{friendly_type}: update detected for {service} - 200")
+            # dont need to update checked time as above because _maybe_send_update does it
+            await self._maybe_send_update(resp_json, service, type)
+        elif str(status)[0] == "5":
+            log.debug(
+                f"I was unable to get an update for {service} due to problems on their side. "
+                f"(HTTP error {status})"
+            )
+        else:
+            log.warning(
+                f"Unexpected status code received from {service}: {status}. Please report "
+                "this to Vexed."
+            )
 
     async def _maybe_send_update(
         self, resp_json: dict, service: SERVICE_LITERAL, type: TYPES_LITERAL
@@ -174,6 +155,7 @@ class StatusLoop(MixinMeta):
                 update=update,
                 service=service,
                 sendcache=sendcache,
+                webhook_cache=self.webhook_cache,
             ).send(channels)
 
             await asyncio.sleep(5)
@@ -184,24 +166,33 @@ class StatusLoop(MixinMeta):
     async def _check_real_update(
         self, incidentdata_list: list[IncidentData], service: str
     ) -> list[Update]:
-        stored_ids: list = await self.config.old_ids()
+        # anything older than this could have been pruned from seen_ids, so isn't really new
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+            seconds=self.seen_ids.max_age
+        )
+        new_ids: set[str] = set()
         valid_updates: list[Update] = []
         for incidentdata in incidentdata_list:
+            self.seen_ids.touch(incidentdata.get_update_ids())
             new_fields = []
             for field in incidentdata.fields:
-                if field.update_id not in stored_ids:
-                    log.trace(
-                        f"New field detected with ID {field.update_id} on incident "
-                        f"{incidentdata.incident_id}"
-                    )
-                    stored_ids.append(field.update_id)
-                    new_fields.append(field)
+                if field.update_id is None or field.update_id in self.seen_ids:
+                    continue
+                new_ids.add(field.update_id)
+                if incidentdata.actual_time and incidentdata.actual_time < cutoff:
+                    continue
+                log.trace(
+                    f"New field detected with ID {field.update_id} on incident "
+                    f"{incidentdata.incident_id}"
+                )
+                new_fields.append(field)
 
             if new_fields:
                 valid_updates.append(Update(incidentdata, new_fields))
 
+        if new_ids:
+            await self.seen_ids.add(new_ids)
         if valid_updates:
-            await self.config.old_ids.set(stored_ids)
             await self.config_wrapper.update_incidents(service, valid_updates[0].incidentdata)
             # update_incidents will update the checked time
         else:
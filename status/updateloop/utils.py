@@ -5,19 +5,28 @@ from typing import TYPE_CHECKING
 from discord import TextChannel, Thread, Webhook
 from redbot.core.bot import Red
 
-from ..objects import ChannelData, CogDisabled, ConfChannelSettings, NoPermission, NotFound
+from ..objects import (
+    ChannelData,
+    CogDisabled,
+    ConfChannelSettings,
+    NoPermission,
+    NotFound,
+    WebhookCache,
+)
 from ..vexutils import get_vex_logger
 
 _log = get_vex_logger(__name__)
 
 
-async def get_webhook(channel: TextChannel | Thread) -> Webhook:
+async def get_webhook(channel: TextChannel | Thread, cache: WebhookCache | None = None) -> Webhook:
     """Get, or create, a webhook for the specified channel and return it.
 
     Parameters
     ----------
     channel : TextChannel | Thread
         Target channel
+    cache : WebhookCache, optional
+        Cache to use, and add to if the webhook isn't already in it
 
     Returns
     -------
@@ -29,13 +38,20 @@ async def get_webhook(channel: TextChannel | Thread) -> Webhook:
             raise ValueError("Thread does not have a parent; cannot have webhooks")
         channel = channel.parent
 
+    if cache is not None and (webhook := cache.get(channel.id)):
+        return webhook
+
     for webhook in await channel.webhooks():
         if webhook.name == channel.guild.me.name:
-            return webhook
+            break
+    else:
+        webhook = await channel.create_webhook(
+            name=channel.guild.me.name, reason="Created for status updates"
+        )
 
-    return await channel.create_webhook(
-        name=channel.guild.me.name, reason="Created for status updates"
-    )
+    if cache is not None:
+        await cache.set(channel.id, webhook)
+    return webhook
 
 
 async def get_channel_data(bot: Red, c_id: int, settings: ConfChannelSettings) -> ChannelData:
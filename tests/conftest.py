@@ -0,0 +1,4 @@
+from red_commons.logging import maybe_update_logger_class
+
+# red does this on startup, and the cogs' loggers need it for the verbose and trace levels
+maybe_update_logger_class()
@@ -0,0 +1,176 @@
+import asyncio
+import sqlite3
+
+import pandas as pd
+
+from stattrack import rollups
+from stattrack.buffer import SampleBuffer
+from stattrack.driver import StatTrackSQLiteDriver
+
+
+def _old_table(path, rows):
+    """Create a main_df the way DataFrame.to_sql used to, with text timestamps."""
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE main_df ("index" TIMESTAMP, "ping" REAL, "guilds" REAL)')
+    conn.executemany("INSERT INTO main_df VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def _rows(path, table="main_df"):
+    conn = sqlite3.connect(path)
+    rows = conn.execute(f'SELECT * FROM {table} ORDER BY "index"').fetchall()
+    conn.close()
+    return rows
+
+
+def test_migrate_to_epoch_index(tmp_path):
+    path = str(tmp_path / "timeseries.db")
+    _old_table(
+        path,
+        [
+            ("2022-01-01 00:01:00", 51.0, 10.0),
+            ("2022-01-01 00:00:00", 50.0, 10.0),
+            ("2022-01-01 00:01:00", 52.0, 11.0),  # duplicate minute, last one wins
+            ("not a timestamp", 1.0, 1.0),
+            (None, 2.0, 2.0),
+        ],
+    )
+
+    async def run():
+        driver = StatTrackSQLiteDriver(sql_path=path)
+        try:
+            return await driver.migrate_to_epoch_index(), await driver.migrate_to_epoch_index()
+        finally:
+            await driver.close()
+
+    assert asyncio.run(run()) == (True, False)  # and doesn't run again
+    minute = 1640995200 // 60  # 2022-01-01 00:00 UTC
+    assert _rows(path) == [(minute, 50.0, 10.0), (minute + 1, 52.0, 11.0)]
+
+
+def _minute_data(minutes):
+    """An in-memory main_df with ping equal to the minute, and guilds NULL on odd minutes."""
+    conn = sqlite3.connect(":memory:")
+    conn.execute('CREATE TABLE main_df ("index" INTEGER PRIMARY KEY, "ping" REAL, "guilds" REAL)')
+    conn.executemany(
+        "INSERT INTO main_df VALUES (?, ?, ?)",
+        [(m, float(m), None if m % 2 else 1.0) for m in minutes],
+    )
+    rollups.ensure_schema(conn)
+    return conn
+
+
+def test_rollup_complete_buckets_only():
+    conn = _minute_data(range(180))
+
+    # the hour starting at 120 isn't over yet
+    assert rollups.rollup(conn, 1, 179, 7 * 1440) is False
+    rows = conn.execute(
+        'SELECT "index", samples, ping_count, ping_sum, ping_min, ping_max, guilds_count '
+        "FROM rollup_hourly"
+    ).fetchall()
+    assert rows == [
+        (0, 60, 60, sum(range(60)), 0, 59, 30),
+        (60, 60, 60, sum(range(60, 120)), 60, 119, 30),
+    ]
+    assert rollups.rolled_up_until(conn, 1) == 120
+
+    assert rollups.rollup(conn, 1, 180, 7 * 1440) is False
+    assert rollups.rolled_up_until(conn, 1) == 180
+
+
+def test_rollup_chunked():
+    conn = _minute_data(range(180))
+    assert rollups.rollup(conn, 1, 180, 60) is True
+    assert rollups.rolled_up_until(conn, 1) == 60
+    assert rollups.rollup(conn, 1, 180, 60) is True
+    assert rollups.rollup(conn, 1, 180, 60) is False
+    assert rollups.rolled_up_until(conn, 1) == 180
+
+
+def test_rollup_daily_from_hourly():
+    conn = _minute_data(range(1440 + 60))
+    while rollups.rollup(conn, 1, 1500, 1440):
+        pass
+    assert rollups.rollup(conn, 2, 1500, 7 * 1440) is False
+    row = conn.execute(
+        "SELECT samples, ping_count, ping_sum, ping_max FROM rollup_daily"
+    ).fetchall()
+    assert row == [(1440, 1440, sum(range(1440)), 1439)]
+
+
+def test_prune_never_deletes_unrolled_data():
+    conn = _minute_data(range(180))
+    assert rollups.prune(conn, 0, 1000) == 0  # nothing rolled up yet
+
+    rollups.rollup(conn, 1, 150, 7 * 1440)  # rolled up until 120
+    assert rollups.prune(conn, 0, 1000) == 120
+    assert conn.execute('SELECT MIN("index") FROM main_df').fetchone()[0] == 120
+
+    assert rollups.prune(conn, 0, 130) == 0  # not yet rolled up, so still kept
+    rollups.rollup(conn, 1, 180, 7 * 1440)
+    assert rollups.prune(conn, 0, 130) == 10
+    assert conn.execute('SELECT MIN("index") FROM main_df').fetchone()[0] == 130
+
+
+def test_downsample_query_tops_up_from_finer_tier():
+    conn = _minute_data(range(180))
+    rollups.rollup(conn, 1, 150, 7 * 1440)  # hourly has 0 and 60, 120 is only in main_df
+
+    def query():
+        sql = rollups.downsample_query(["ping"], 1, 60)
+        return conn.execute(sql, {"start": 0}).fetchall()
+
+    expected = [
+        (0, 29.5, 0, 59, sum(range(60))),
+        (60, 89.5, 60, 119, sum(range(60, 120))),
+        (120, 149.5, 120, 179, sum(range(120, 180))),
+    ]
+    assert query() == expected  # nothing counted twice
+    rollups.prune(conn, 0, 1000)
+    assert query() == expected  # and the same once the minute data is pruned
+
+
+def test_pick_tier_by_bucket():
+    firsts = [0, 0, 0]
+    assert rollups.pick_tier(firsts, 0, 0) == (0, 1)
+    assert rollups.pick_tier(firsts, 0, 1) == (0, 1)
+    assert rollups.pick_tier(firsts, 0, 59) == (0, 59)
+    assert rollups.pick_tier(firsts, 0, 60) == (1, 60)
+    assert rollups.pick_tier(firsts, 0, 61) == (1, 120)
+    assert rollups.pick_tier(firsts, 0, 1439) == (1, 1440)
+    assert rollups.pick_tier(firsts, 0, 1440) == (2, 1440)
+    assert rollups.pick_tier(firsts, 0, 1441) == (2, 2880)
+
+
+def test_pick_tier_after_pruning():
+    # minute data starts at 120, with the hours before it only in the hourly rollup
+    assert rollups.pick_tier([120, 0, None], 0, 1) == (1, 60)
+    assert rollups.pick_tier([120, 0, None], 119, 1) == (1, 60)
+    assert rollups.pick_tier([120, 0, None], 120, 1) == (0, 1)  # nothing needed was pruned
+
+    # the data just starts at 120, nothing was pruned
+    assert rollups.pick_tier([120, 120, None], 0, 1) == (0, 1)
+    # an hour that ends after the first minute means nothing before it was pruned either
+    assert rollups.pick_tier([130, 120, None], 0, 1) == (0, 1)
+
+    # nothing rolled up yet
+    assert rollups.pick_tier([120, None, None], 0, 1) == (0, 1)
+    assert rollups.pick_tier([None, None, None], 0, 1) == (0, 1)
+
+    # and up to daily when the hourly data has been pruned too
+    assert rollups.pick_tier([3000, 2880, 0], 0, 1) == (2, 1440)
+
+
+def test_buffer_last_index():
+    buffer = SampleBuffer(3)
+    assert buffer.last_index is None  # not loaded
+
+    index = pd.to_datetime([60, 61], unit="m")
+    buffer.load(pd.DataFrame({"ping": [1, 2]}, index=index), 60)
+    assert buffer.last_index == 61
+
+    for minute in (62, 63, 64):  # wraps around
+        buffer.append(pd.DataFrame({"ping": [minute]}, index=pd.to_datetime([minute], unit="m")))
+        assert buffer.last_index == minute
@@ -1,6 +1,15 @@
-from status.objects import SendCache, UpdateField
+import asyncio
+from types import SimpleNamespace
+
+import aiohttp
+import discord
+
+from status.core.core import Status
+from status.objects import SeenIDs, SendCache, UpdateField
+from status.objects import seenids as seenids_module
 from status.objects.incidentdata import Update
-from status.updateloop import processfeed
+from status.updateloop import processfeed, sendupdate
+from status.updateloop.sendupdate import SendUpdate
 
 from .consts import (
     STATUS_EXPECTED_EMBED_INCIDENTS_ALL,
@@ -63,3 +72,208 @@ def test_example_incident():
     assert sc_sch.embed_all.to_dict() == STATUS_EXPECTED_EMBED_SCHEDULED_ALL
     assert sc_inc.plain_all == STATUS_EXPECTED_PLAIN_INCIDENTS_ALL
     assert sc_sch.plain_all == STATUS_EXPECTED_PLAIN_SCHEDULED_ALL
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_seen_ids(tmp_path, monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(seenids_module, "time", clock)
+    path = tmp_path / "seen_ids.db"
+
+    async def first():
+        seen = SeenIDs(path, max_age=100)
+        await seen.load()
+        await seen.add(["a", "b", "a"])
+        clock.now += 10
+        await seen.add(["b", "c"])  # b isn't new, so keeps when it was first seen
+        assert len(seen) == 3 and "a" in seen and "d" not in seen
+
+        clock.now += 95  # a and b are past max_age, but b is still in a feed
+        seen.touch(["b", "d"])  # d was never added so isn't touched
+        assert "d" not in seen
+        assert await seen.prune() == 1
+        assert "a" not in seen and "b" in seen and "c" in seen
+        await seen.close()
+
+    async def second():
+        seen = SeenIDs(path, max_age=100)
+        await seen.load()
+        ids = dict(seen._ids)
+        await seen.close()
+        return ids
+
+    asyncio.run(first())
+    assert asyncio.run(second()) == {"b": 1_000_105.0, "c": 1_000_010.0}  # touch was saved
+
+
+def test_seen_ids_close_saves_touched(tmp_path, monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(seenids_module, "time", clock)
+    path = tmp_path / "seen_ids.db"
+
+    async def run():
+        seen = SeenIDs(path, max_age=100)
+        await seen.add(["a"])
+        clock.now += 50
+        seen.touch(["a"])
+        await seen.close()
+
+        seen = SeenIDs(path, max_age=100)
+        await seen.load()
+        await seen.close()
+        return seen._ids
+
+    assert asyncio.run(run()) == {"a": 1_000_050.0}
+
+
+class _ConfigValue:
+    def __init__(self, value) -> None:
+        self.value = value
+
+    async def __call__(self):
+        return self.value
+
+    async def clear(self) -> None:
+        self.value = []
+
+
+def test_migrate_old_ids(tmp_path):
+    async def run(old_ids):
+        seen = SeenIDs(tmp_path / "seen_ids.db")
+        await seen.load()
+        cog = SimpleNamespace(config=SimpleNamespace(old_ids=_ConfigValue(old_ids)), seen_ids=seen)
+        await Status.migrate_old_ids(cog)
+        await seen.close()
+        return set(seen._ids), cog.config.old_ids.value
+
+    assert asyncio.run(run(["a", "b"])) == ({"a", "b"}, [])
+    assert asyncio.run(run([])) == ({"a", "b"}, [])  # already migrated, and saved to disk
+
+
+def _connector_error():
+    key = SimpleNamespace(host="discord.com", port=443, ssl=True)
+    return aiohttp.ClientConnectorError(key, OSError("nope"))
+
+
+class _FakeSends:
+    """Stands in for SendUpdate._send_updated_feed, returning or raising the next outcome for
+    each channel and keeping track of how many are being sent to at once."""
+
+    def __init__(self, outcomes, guilds=None, routes=None) -> None:
+        self.outcomes = {c_id: list(o) for c_id, o in outcomes.items()}
+        self.guilds = guilds or {}
+        self.routes = routes or {}
+        self.calls = {c_id: 0 for c_id in outcomes}
+        self.active: dict = {}
+        self.max_active: dict = {}
+
+    def _change(self, keys, by):
+        for key in keys:
+            self.active[key] = self.active.get(key, 0) + by
+            self.max_active[key] = max(self.max_active.get(key, 0), self.active[key])
+
+    async def __call__(self, c_id, settings):
+        keys = ["all", ("guild", self.guilds.get(c_id)), ("route", self.routes.get(c_id, c_id))]
+        self.calls[c_id] += 1
+        self._change(keys, 1)
+        try:
+            for _ in range(3):
+                await asyncio.sleep(0)
+            outcome = self.outcomes[c_id].pop(0)
+        finally:
+            self._change(keys, -1)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def _send(fake, settings, channels=None):
+    """Send to every channel in settings with the fake, returning the SendUpdate."""
+    bot = SimpleNamespace(get_channel=lambda c_id: (channels or {}).get(c_id))
+    update = Update(SimpleNamespace(), [])
+    sender = SendUpdate(bot, None, update, "discord", None, dispatch=False)  # type:ignore
+    sender._send_updated_feed = fake  # type:ignore
+    asyncio.run(sender.send(settings))
+    return sender
+
+
+def _no_backoff(monkeypatch):
+    sleep = asyncio.sleep
+    monkeypatch.setattr(sendupdate.asyncio, "sleep", lambda delay: sleep(0))
+
+
+def _settings(*c_ids, webhook=False):
+    return {c_id: {"mode": "all", "webhook": webhook, "edit_id": {}} for c_id in c_ids}
+
+
+def test_deliver_retries_connection_errors(monkeypatch):
+    _no_backoff(monkeypatch)
+    retries = sendupdate.SEND_RETRIES
+    fake = _FakeSends(
+        {
+            1: [_connector_error(), _connector_error(), True],
+            2: [_connector_error()] * (retries + 1),
+        }
+    )
+    sender = _send(fake, _settings(1, 2))
+
+    assert fake.calls == {1: 3, 2: retries + 1}
+    assert (sender.sent, sender.skipped, sender.failed) == (1, 0, 1)
+    assert sender.latency.count == 1
+
+
+def test_deliver_only_retries_connection_errors(monkeypatch):
+    _no_backoff(monkeypatch)
+    # a timeout could be after discord got the message, so isn't tried again
+    fake = _FakeSends({1: [asyncio.TimeoutError(), True], 2: [RuntimeError(), True]})
+    sender = _send(fake, _settings(1, 2))
+
+    assert fake.calls == {1: 1, 2: 1}
+    assert (sender.sent, sender.skipped, sender.failed) == (0, 0, 2)
+
+
+def test_deliver_continues_after_exceptions(monkeypatch):
+    _no_backoff(monkeypatch)
+    fake = _FakeSends({1: [RuntimeError()], 2: [True], 3: [False], 4: [KeyError()], 5: [True]})
+    sender = _send(fake, _settings(1, 2, 3, 4, 5))
+
+    assert all(calls == 1 for calls in fake.calls.values())
+    assert (sender.sent, sender.skipped, sender.failed) == (2, 1, 2)
+
+
+def test_send_concurrency_limits():
+    guild_a, guild_b = SimpleNamespace(id=100), SimpleNamespace(id=200)
+    channels = {c_id: SimpleNamespace(guild=guild_a) for c_id in range(1, 7)}
+    channels.update({c_id: SimpleNamespace(guild=guild_b) for c_id in range(7, 13)})
+    guilds = {c_id: channel.guild.id for c_id, channel in channels.items()}
+    fake = _FakeSends({c_id: [True] for c_id in channels}, guilds=guilds)
+    sender = _send(fake, _settings(*channels), channels)
+
+    assert sender.sent == 12
+    assert fake.max_active[("guild", 100)] == sendupdate.SEND_GUILD_CONCURRENCY
+    assert fake.max_active[("guild", 200)] == sendupdate.SEND_GUILD_CONCURRENCY
+    assert fake.max_active["all"] == 2 * sendupdate.SEND_GUILD_CONCURRENCY
+
+
+def test_send_one_at_a_time_per_route():
+    guild = SimpleNamespace(id=100)
+    parent = SimpleNamespace(id=1, guild=guild)
+    channels: dict = {1: parent}
+    for c_id in (2, 3):  # threads in the parent channel, which use its webhook
+        thread = discord.Thread.__new__(discord.Thread)
+        thread.id, thread.parent_id, thread.guild = c_id, 1, guild
+        channels[c_id] = thread
+    assert SendUpdate._route(2, channels[2], _settings(2, webhook=True)[2]) == ("webhook", 1)
+    assert SendUpdate._route(2, channels[2], _settings(2)[2]) == ("channel", 2)
+
+    fake = _FakeSends({1: [True], 2: [True], 3: [True]}, routes={1: 1, 2: 1, 3: 1})
+    sender = _send(fake, _settings(1, 2, 3, webhook=True), channels)
+    assert sender.sent == 3
+    assert fake.max_active[("route", 1)] == 1
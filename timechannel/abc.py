@@ -27,3 +27,7 @@ class MixinMeta(ABC):
     @abstractmethod
     async def maybe_migrate(self) -> None:
         raise NotImplementedError()
+
+    @abstractmethod
+    def start_loop(self) -> None:
+        raise NotImplementedError()
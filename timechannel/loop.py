@@ -1,7 +1,3 @@
-import asyncio
-import datetime
-import math
-
 from discord.channel import VoiceChannel
 from discord.errors import HTTPException
 
@@ -9,44 +5,18 @@ from timechannel.utils import gen_replacements
 
 from .abc import MixinMeta
 from .vexutils import get_vex_logger
-from .vexutils.loop import VexLoop
+from .vexutils.loop import VexLoop, get_runner
 
 _log = get_vex_logger(__name__)
 
 
 class TCLoop(MixinMeta):
-    def __init__(self) -> None:
-        self.loop_meta = VexLoop("TimeChannel Loop", 900)  # 15 mins
-        self.loop = self.bot.loop.create_task(self.timechannel_loop())
-
-    async def wait_until_iter(self) -> None:
-        now = datetime.datetime.utcnow()
-        time = now.timestamp()
-        time = math.ceil(time / 900) * 900
-        next_iter = datetime.datetime.fromtimestamp(time) - now
-        seconds_to_sleep = (next_iter).total_seconds()
-
-        _log.verbose(f"Sleeping for {seconds_to_sleep} seconds until next iter...")
-        await asyncio.sleep(seconds_to_sleep)
-
-    async def timechannel_loop(self) -> None:
-        await self.bot.wait_until_red_ready()
-        await asyncio.sleep(1)
-        _log.debug("Timechannel loop has started.")
-        while True:
-            try:
-                self.loop_meta.iter_start()
-                await self.maybe_update_channels()
-                self.loop_meta.iter_finish()
-
-                _log.debug("Timechannel iteration finished")
-            except Exception as e:
-                _log.exception(
-                    "Something went wrong in the timechannel loop. Some channels may have been "
-                    "missed. The loop will run again at the next hour.",
-                    exc_info=e,
-                )
-            await self.wait_until_iter()
+    def start_loop(self) -> None:
+        # every 15 mins, but not at the same time as every other loop on the bot
+        self.loop_meta = VexLoop("TimeChannel Loop", 900, jitter=30.0)
+        self.loop = get_runner().register(
+            self.loop_meta, self.maybe_update_channels, wait_for=self.bot.wait_until_red_ready
+        )
 
     async def maybe_update_channels(self) -> None:
         all_guilds: dict[int, dict[str, dict[int, str]]] = await self.config.all_guilds()
@@ -18,6 +18,7 @@ from .data import ZONE_KEYS
 from .loop import TCLoop
 from .vexutils import format_help, format_info, get_vex_logger
 from .vexutils.chat import datetime_to_timestamp
+from .vexutils.watchdog import add_watchdog_tools, remove_watchdog_tools
 
 log = get_vex_logger(__name__)
 
@@ -46,6 +47,8 @@ class TimeChannel(commands.Cog, TCLoop, metaclass=CompositeMetaClass):
         self.config.register_global(version=1)
         self.config.register_guild(timechannels={})
 
+        add_watchdog_tools(bot, "TimeChannel")
+
     def format_help_for_context(self, ctx: commands.Context) -> str:
         """Thanks Sinbad."""
         return format_help(self, ctx)
@@ -57,9 +60,11 @@ class TimeChannel(commands.Cog, TCLoop, metaclass=CompositeMetaClass):
     async def cog_unload(self) -> None:
         self.loop.cancel()
         log.verbose("Loop stopped as cog unloaded.")
+        remove_watchdog_tools(self.bot, "TimeChannel")
 
     async def cog_load(self) -> None:
         await self.maybe_migrate()
+        self.start_loop()
 
     async def maybe_migrate(self) -> None:
         if await self.config.version() == 2: